@@ -0,0 +1,49 @@
+"""Per-image header encoding, pydantic models against pre-encoded templates.
+
+Run with ``pytest benchmarks --benchmark-only``; headers per second is three times
+the reported OPS.
+"""
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from tickit_devices.eiger.data.dummy_image import Image
+from tickit_devices.eiger.data.schema import (
+    ImageCharacteristicsHeader,
+    ImageConfigHeader,
+    ImageHeader,
+)
+from tickit_devices.eiger.data.templates import ImageHeaderTemplates
+
+SERIES_ID = 1
+SHAPE = (4148, 4362)
+IMAGE = Image.create_dummy_image(0, SHAPE)
+
+
+def encode_headers_with_models(image: Image) -> None:
+    ImageHeader(frame=image.index, hash=image.hash, series=SERIES_ID).json()
+    ImageCharacteristicsHeader(
+        encoding=image.encoding,
+        shape=image.shape,
+        size=len(image.data),
+        type=image.dtype,
+    ).json()
+    ImageConfigHeader(real_time=0.0, start_time=0.0, stop_time=0.0).json()
+
+
+def encode_headers_with_templates(
+    templates: ImageHeaderTemplates, image: Image
+) -> None:
+    templates.image.render(frame=image.index, hash=image.hash)
+    templates.characteristics.render(size=len(image.data))
+    templates.config.render(real_time=0.0, start_time=0.0, stop_time=0.0)
+
+
+def test_image_headers_from_models(benchmark: BenchmarkFixture) -> None:
+    benchmark(encode_headers_with_models, IMAGE)
+
+
+def test_image_headers_from_templates(benchmark: BenchmarkFixture) -> None:
+    templates = ImageHeaderTemplates.for_series(
+        SERIES_ID, IMAGE.shape, IMAGE.encoding, IMAGE.dtype
+    )
+    benchmark(encode_headers_with_templates, templates, IMAGE)
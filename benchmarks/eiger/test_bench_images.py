@@ -0,0 +1,40 @@
+"""Synthetic image generation and compression for a full size 16M frame.
+
+Run with ``pytest benchmarks --benchmark-only``.
+"""
+
+import numpy as np
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from tickit_devices.eiger.data.compression import compress
+from tickit_devices.eiger.data.frame_pool import FramePool
+from tickit_devices.eiger.data.generators import GENERATORS, PoissonImageGenerator
+from tickit_devices.eiger.eiger_settings import FRAME_HEIGHT, FRAME_WIDTH
+
+SHAPE = (FRAME_HEIGHT, FRAME_WIDTH)
+
+
+@pytest.mark.parametrize("name", list(GENERATORS))
+def test_generate_image(benchmark: BenchmarkFixture, name: str) -> None:
+    generator = GENERATORS[name]()
+    benchmark(generator.generate, 0, SHAPE, "uint16")
+
+
+@pytest.mark.parametrize("compression", ["bslz4", "lz4"])
+def test_compress_image(benchmark: BenchmarkFixture, compression: str) -> None:
+    image = PoissonImageGenerator().generate(0, SHAPE, "uint16")
+    benchmark(compress, image, compression)
+
+
+def test_frame_pool_image(benchmark: BenchmarkFixture) -> None:
+    pool = FramePool(PoissonImageGenerator(), size=2)
+    pool.prepare((FRAME_WIDTH, FRAME_HEIGHT), "uint16", "bslz4")
+    pool.image(0)
+    benchmark(pool.image, 1)
+    pool.close()
+
+
+def test_compress_flat_image(benchmark: BenchmarkFixture) -> None:
+    image = np.zeros(SHAPE, dtype="uint16")
+    benchmark(compress, image, "bslz4")
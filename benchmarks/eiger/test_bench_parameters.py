@@ -0,0 +1,33 @@
+"""Parameter GETs across every Eiger setting, as served by the REST adapter.
+
+Run with ``pytest benchmarks --benchmark-only``; each round reads every setting
+once, so GETs per second is the number of settings times the reported OPS.
+"""
+
+from dataclasses import fields
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from tickit_devices.eiger.eiger_schema import construct_value
+from tickit_devices.eiger.eiger_settings import EigerSettings
+
+SETTINGS = EigerSettings()
+NAMES = [field_.name for field_ in fields(SETTINGS)]
+
+
+def get_every_parameter() -> None:
+    for name in NAMES:
+        SETTINGS[name]
+
+
+def construct_every_value() -> None:
+    for name in NAMES:
+        construct_value(SETTINGS, name)
+
+
+def test_getitem(benchmark: BenchmarkFixture) -> None:
+    benchmark(get_every_parameter)
+
+
+def test_construct_value(benchmark: BenchmarkFixture) -> None:
+    benchmark(construct_every_value)
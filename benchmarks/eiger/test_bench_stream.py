@@ -0,0 +1,209 @@
+"""End to end streaming of an acquisition series to a local ZeroMQ PULL consumer.
+
+Each round acquires a series through the real device, stream, adapter and socket,
+the path from ``EigerDevice._acquire_frame`` through ``EigerStream.insert_image``
+and ``drain`` to ``EigerZMQAdapter.after_update``. The reported OPS is
+series per second, the sustained frame rate, data rate, latency percentiles and
+peak RSS of the last round are recorded in the extra info of the results.
+
+Run with ``pytest benchmarks --benchmark-only``, adding ``--benchmark-json`` to keep
+the extra info. Latency is from the update acquiring a frame to the consumer
+receiving its image header. Peak RSS is the high water mark of the simulation
+process, the consumer runs in a process of its own.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import resource
+import socket
+import time
+from dataclasses import dataclass, field
+from multiprocessing.synchronize import Event as EventType
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pytest
+import zmq
+from pytest_benchmark.fixture import BenchmarkFixture
+from tickit.core.typedefs import SimTime
+from zmq.utils.monitor import recv_monitor_message
+
+from tickit_devices.eiger.data.frame_pool import FramePool
+from tickit_devices.eiger.data.generators import PoissonImageGenerator
+from tickit_devices.eiger.eiger import EigerDevice
+from tickit_devices.eiger.eiger_adapters import EigerZMQAdapter
+from tickit_devices.eiger.eiger_zmq_io import EigerZeroMqPushIo
+
+NIMAGES = 200
+SHAPES = {
+    "1M": (1028, 1062),
+    "4M": (2068, 2162),
+    "16M": (4148, 4362),
+}
+HEADER_DETAILS = ["none", "basic", "all"]
+
+_IMAGE_HTYPE = b'"htype": "dimage-1.0"'
+_END_HTYPE = b'"htype": "dseries_end-1.0"'
+_MAX_HEADER_SIZE = 256
+
+
+@dataclass
+class StreamResult:
+    """Timings of a streamed series, times are from time.perf_counter_ns."""
+
+    nbytes: int = 0
+    acquired: Dict[int, int] = field(default_factory=dict)
+    received: Dict[int, int] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, float]:
+        """Rates and latencies over the series."""
+        start = min(self.acquired.values())
+        seconds = (max(self.received.values()) - start) / 1e9
+        latencies = np.array(
+            [self.received[frame] - self.acquired[frame] for frame in self.received]
+        )
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) / 1e6
+        return {
+            "frames_per_second": len(self.received) / seconds,
+            "megabytes_per_second": self.nbytes / seconds / 1e6,
+            "latency_p50_ms": p50,
+            "latency_p90_ms": p90,
+            "latency_p99_ms": p99,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3,
+        }
+
+
+def consume(
+    port: int, connected: EventType, results: "multiprocessing.Queue[Any]"
+) -> None:
+    """Receive a series, sending back the bytes and when each image header arrived.
+
+    Runs in its own process, so the consumer does not compete with the simulation
+    for the GIL.
+    """
+    nbytes = 0
+    received: Dict[int, int] = {}
+    with zmq.Context() as context, context.socket(zmq.PULL) as pull:
+        monitor = pull.get_monitor_socket(zmq.EVENT_HANDSHAKE_SUCCEEDED)
+        pull.connect(f"tcp://127.0.0.1:{port}")
+        recv_monitor_message(monitor)
+        pull.disable_monitor()
+        monitor.close()
+        connected.set()
+
+        while True:
+            parts = pull.recv_multipart(copy=False)
+            now = time.perf_counter_ns()
+            for part in parts:
+                nbytes += len(part)
+                if len(part) > _MAX_HEADER_SIZE:
+                    continue
+                header = part.bytes
+                if _IMAGE_HTYPE in header:
+                    received[json.loads(header)["frame"]] = now
+                elif _END_HTYPE in header:
+                    results.put((nbytes, received))
+                    return
+
+
+async def acquire(
+    device: EigerDevice, adapter: EigerZMQAdapter, result: StreamResult
+) -> None:
+    """Drive the device through a series, sending data after every update."""
+    await device.initialize()
+    await device.arm()
+    await device.trigger()
+
+    sim_time = SimTime(0)
+    while True:
+        acquired = device.status.frames_acquired
+        now = time.perf_counter_ns()
+        update = device.update(sim_time, {})
+        for frame in range(acquired, device.status.frames_acquired):
+            result.acquired[frame] = now
+        adapter.after_update()
+        await asyncio.sleep(0)
+        if update.call_at is None:
+            break
+        sim_time = update.call_at
+
+
+async def stream_series(
+    frame_pool: FramePool, shape: Tuple[int, int], header_detail: str
+) -> StreamResult:
+    """Acquire a series and stream it to a consumer in another process."""
+    port = free_port()
+    device = EigerDevice(frame_pool=frame_pool)
+    device.settings.x_pixels_in_detector, device.settings.y_pixels_in_detector = shape
+    device.settings.trigger_mode = "ints"
+    device.settings.nimages = NIMAGES
+    device.settings.frame_time = 0.001
+    device.stream.config.header_detail = header_detail
+    device.stream.callback_period = SimTime(int(1e6))
+
+    adapter = EigerZMQAdapter(device)
+    io = EigerZeroMqPushIo("127.0.0.1", port)
+    await io.setup(adapter, raise_interrupt)
+
+    result = StreamResult()
+    processes = multiprocessing.get_context("fork")
+    connected = processes.Event()
+    results = processes.Queue()
+    consumer = processes.Process(target=consume, args=(port, connected, results))
+    consumer.start()
+    loop = asyncio.get_running_loop()
+    try:
+        # Wait for the consumer, so latencies do not include connecting
+        await loop.run_in_executor(None, connected.wait, 10.0)
+        await acquire(device, adapter, result)
+        result.nbytes, result.received = await loop.run_in_executor(
+            None, results.get, True, 60.0
+        )
+    finally:
+        consumer.join(10.0)
+        await io.shutdown()
+    assert len(result.received) == NIMAGES
+    return result
+
+
+async def raise_interrupt() -> None:
+    """Interrupts are not needed as the benchmark drives the updates itself."""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module", params=list(SHAPES))
+def shape(request: pytest.FixtureRequest) -> Tuple[int, int]:
+    return SHAPES[request.param]
+
+
+@pytest.fixture(scope="module")
+def frame_pool(shape: Tuple[int, int]):
+    pool = FramePool(PoissonImageGenerator(), size=8)
+    pool.prepare(shape, "uint16", "bslz4")
+    # Wait for every frame to be rendered, so rendering is not measured
+    images: List = []
+    while len({image.hash for image in images}) < pool.size:
+        images = [pool.image(index) for index in range(pool.size)]
+        time.sleep(0.01)
+    yield pool
+    pool.close()
+
+
+@pytest.mark.parametrize("header_detail", HEADER_DETAILS)
+def test_stream_series(
+    benchmark: BenchmarkFixture,
+    frame_pool: FramePool,
+    shape: Tuple[int, int],
+    header_detail: str,
+) -> None:
+    def run() -> StreamResult:
+        return asyncio.run(stream_series(frame_pool, shape, header_detail))
+
+    result = benchmark.pedantic(run, rounds=3, iterations=1, warmup_rounds=1)
+    benchmark.extra_info.update(result.summary())
@@ -1,42 +1,254 @@
+from dataclasses import dataclass, fields
+from functools import partial
+from typing import Dict, List, Optional, cast
+
 import pydantic.v1.dataclasses
-from tickit.adapters.io import HttpIo, ZeroMqPushIo
+from tickit.adapters.io import HttpIo
 from tickit.core.adapter import AdapterContainer
 from tickit.core.components.component import Component, ComponentConfig
 from tickit.core.components.device_component import DeviceComponent
+from tickit.core.components.system_component import SystemComponent
+from tickit.core.typedefs import ComponentID, ComponentPort, PortID, SimTime
 
+from tickit_devices.eiger.data.frame_pool import (
+    FramePool,
+    FrameSource,
+    MappedFramePool,
+    SharedFramePool,
+)
+from tickit_devices.eiger.data.generators import GENERATORS
+from tickit_devices.eiger.data.templates import HeaderTemplateCache
+from tickit_devices.eiger.dcu_buffer import DCU_BUFFER_SIZE
 from tickit_devices.eiger.eiger import EigerDevice
 from tickit_devices.eiger.eiger_adapters import EigerRESTAdapter, EigerZMQAdapter
+from tickit_devices.eiger.eiger_zmq_io import (
+    DEFAULT_HWM,
+    EigerZeroMqBroadcastIo,
+    EigerZeroMqPushIo,
+    bind_zmq_push_socket,
+)
+from tickit_devices.eiger.filewriter.eiger_filewriter import EigerFileWriter
+from tickit_devices.eiger.frame_trace import FrameTrace
+from tickit_devices.eiger.metrics import EigerMetrics
+from tickit_devices.eiger.stream.eiger_stream import EigerStream
+from tickit_devices.eiger.stream.replay import StreamReplay
 
 
 @pydantic.v1.dataclasses.dataclass
 class Eiger(ComponentConfig):
-    """Eiger simulation with HTTP adapter."""
+    """Eiger simulation with HTTP adapter.
+
+    batch_period is in seconds, when the frame time is shorter than it every frame
+    within the period is acquired in one update.
+
+    images selects the frames sent, "sample" for a sample from a real detector or
+    the name of a synthetic image generator ("flat", "poisson" or "rings").
+    image_pool_size distinct synthetic frames are rendered and cycled through.
+    Alternatively frames_path gives a frame container, directory of frames or single
+    frame file to memory map and cycle through.
+
+    If filewriter_path is given the filewriter writes HDF5 files to that directory.
+
+    With async_trigger the trigger command responds as soon as acquisition starts,
+    with the ID of the series as its sequence id, rather than once the series is
+    acquired.
+
+    If network_bandwidth (in Gbit/s) is given, frames are held in a DCU buffer of
+    dcu_buffer_size MiB which drains at that bandwidth, acquisition waits while it
+    is full.
+
+    zmq_mode "push" load balances the stream between the consumers connected to
+    zmq_port. "broadcast" sends every message to each of zmq_subscribers consumers,
+    on consecutive ports from zmq_port. zmq_hwm messages are queued for each
+    consumer, beyond that a push waits and a broadcast drops the message for that
+    consumer. The images of a broadcast drop are counted once in the dropped stream
+    status, and for each consumer in the metrics, while a port with no consumer
+    connected simply misses the messages.
+
+    If trace_frames is given, the timings of each stage of the last trace_frames
+    frames are recorded, see the trace status parameters and trace endpoint. With
+    metrics, counters of the work done are served at /metrics for Prometheus.
+
+    If replay_path is given, the stream sends the series recorded in that capture
+    file in place of the images acquired, with its series and frame numbers
+    rewritten. replay_cadence "recorded" sends the images at the times they were
+    captured, "fast" as fast as possible.
+    """
 
     host: str = "0.0.0.0"
     port: int = 8081
     zmq_host: str = "127.0.0.1"
     zmq_port: int = 9999
+    batch_period: float = 0.0
+    images: str = "sample"
+    image_pool_size: int = 16
+    frames_path: Optional[str] = None
+    filewriter_path: Optional[str] = None
+    async_trigger: bool = False
+    network_bandwidth: Optional[float] = None
+    dcu_buffer_size: int = DCU_BUFFER_SIZE // 2**20
+    zmq_mode: str = "push"
+    zmq_subscribers: int = 2
+    zmq_hwm: int = DEFAULT_HWM
+    trace_frames: int = 0
+    metrics: bool = False
+    replay_path: Optional[str] = None
+    replay_cadence: str = "recorded"
 
     def __call__(self) -> Component:  # noqa: D102
-        device = EigerDevice()
+        frame_pool: Optional[FrameSource] = None
+        if self.frames_path is not None:
+            frame_pool = MappedFramePool(self.frames_path)
+        elif self.images != "sample":
+            frame_pool = FramePool(GENERATORS[self.images](), self.image_pool_size)
+        return self.build(frame_pool)
+
+    def build(
+        self,
+        frame_pool: Optional[FrameSource],
+        header_templates: Optional[HeaderTemplateCache] = None,
+    ) -> Component:
+        """Create the component with frames and header templates it may share.
+
+        Args:
+            frame_pool: Source of the frames, None for the sample image.
+            header_templates: Cache of image header templates. Defaults to None,
+                the stream has a cache of its own.
+
+        Returns:
+            Component: The Eiger component.
+        """
+        trace = FrameTrace(self.trace_frames) if self.trace_frames > 0 else None
+        replay = (
+            StreamReplay(self.replay_path, self.replay_cadence)
+            if self.replay_path is not None
+            else None
+        )
+        device = EigerDevice(
+            stream=EigerStream(
+                header_templates=header_templates, trace=trace, replay=replay
+            ),
+            batch_period=SimTime(int(self.batch_period * 1e9)),
+            frame_pool=frame_pool,
+            filewriter=(
+                EigerFileWriter(self.filewriter_path)
+                if self.filewriter_path is not None
+                else None
+            ),
+            network_bandwidth=(
+                self.network_bandwidth * 1e9 / 8
+                if self.network_bandwidth is not None
+                else None
+            ),
+            dcu_buffer_size=self.dcu_buffer_size * 2**20,
+            trace=trace,
+            metrics=EigerMetrics() if self.metrics else None,
+        )
+        zmq_adapter = EigerZMQAdapter(device)
+        zmq_io: EigerZeroMqPushIo
+        if self.zmq_mode == "broadcast":
+            zmq_io = EigerZeroMqBroadcastIo(
+                self.zmq_host,
+                self.zmq_port,
+                subscribers=self.zmq_subscribers,
+                hwm=self.zmq_hwm,
+                on_drop=zmq_adapter.message_dropped,
+            )
+        elif self.zmq_mode == "push":
+            zmq_io = EigerZeroMqPushIo(
+                self.zmq_host,
+                self.zmq_port,
+                partial(bind_zmq_push_socket, hwm=self.zmq_hwm),
+            )
+        else:
+            raise ValueError(f"Unknown zmq_mode: {self.zmq_mode}")
         adapters = [
             AdapterContainer(
-                EigerRESTAdapter(device),
+                EigerRESTAdapter(device, self.async_trigger),
                 HttpIo(
                     self.host,
                     self.port,
                 ),
             ),
-            AdapterContainer(
-                EigerZMQAdapter(device),
-                ZeroMqPushIo(
-                    self.zmq_host,
-                    self.zmq_port,
-                ),
-            ),
+            AdapterContainer(zmq_adapter, zmq_io),
         ]
         return DeviceComponent(
             name=self.name,
             device=device,
             adapters=adapters,
         )
+
+
+@pydantic.v1.dataclasses.dataclass
+class EigerFarm(Eiger):
+    """A number of Eiger simulations configured as one.
+
+    Each of the detectors is configured as an Eiger named "<name>_<index>", with
+    consecutive HTTP ports from port and ZeroMQ ports from zmq_port (each taking
+    zmq_subscribers ports in "broadcast" mode). The detectors share the trigger
+    input of the farm, one read only pool of frames and one cache of image header
+    templates, so adding a detector adds little memory or startup time.
+    """
+
+    detectors: int = 2
+
+    def __call__(self) -> Component:  # noqa: D102
+        frames: Optional[SharedFramePool] = None
+        mapped: Optional[MappedFramePool] = None
+        if self.frames_path is not None:
+            mapped = MappedFramePool(self.frames_path)
+        elif self.images != "sample":
+            frames = SharedFramePool(GENERATORS[self.images](), self.image_pool_size)
+        header_templates = HeaderTemplateCache()
+
+        zmq_stride = self.zmq_subscribers if self.zmq_mode == "broadcast" else 1
+        inputs: Dict[PortID, ComponentPort] = {
+            PortID(port): ComponentPort(ComponentID("external"), PortID(port))
+            for port in EigerDevice.Inputs.__annotations__
+        }
+        settings = {
+            fld.name: getattr(self, fld.name)
+            for fld in fields(Eiger)
+            if fld.name != "type"
+        }
+        members = [
+            _FarmMember(
+                Eiger(
+                    **{
+                        **settings,
+                        "name": ComponentID(f"{self.name}_{index}"),
+                        "inputs": inputs,
+                        "port": self.port + index,
+                        "zmq_port": self.zmq_port + index * zmq_stride,
+                    }
+                ),
+                frames.source() if frames is not None else mapped,
+                header_templates,
+            )
+            for index in range(self.detectors)
+        ]
+        return SystemComponent(
+            name=self.name,
+            components=cast(List[ComponentConfig], members),
+            expose={},
+        )
+
+
+@dataclass
+class _FarmMember:
+    """The config of a detector in a farm, built with the farm's shared state."""
+
+    config: Eiger
+    frame_pool: Optional[FrameSource]
+    header_templates: HeaderTemplateCache
+
+    @property
+    def name(self) -> ComponentID:
+        return self.config.name
+
+    @property
+    def inputs(self) -> Dict[PortID, ComponentPort]:
+        return self.config.inputs
+
+    def __call__(self) -> Component:
+        return self.config.build(self.frame_pool, self.header_templates)
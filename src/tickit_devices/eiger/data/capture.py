@@ -0,0 +1,180 @@
+import struct
+from pathlib import Path
+from time import perf_counter_ns
+from types import TracebackType
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Sequence, Type, Union
+
+#: Magic bytes at the start of a stream capture file
+CAPTURE_MAGIC = b"TICKITCAPTURE\x00\x01"
+#: Size of the reads made from a capture file while replaying it
+CAPTURE_BUFFER_SIZE = 1 << 20
+
+# Each message is its receive time in nanoseconds and the number of its parts, then
+# each part is its length followed by its bytes
+_RECORD = struct.Struct("<qI")
+_PART = struct.Struct("<Q")
+
+
+class CaptureRecord(NamedTuple):
+    """A message received from a detector stream."""
+
+    #: Time the message was received, in nanoseconds since the first message
+    timestamp: int
+    #: The parts of the message
+    parts: List[bytes]
+
+
+class CaptureWriter:
+    """Records the messages received from a detector stream to a capture file.
+
+    Each message is written as it is received with the time since the first, e.g.
+    from a ZeroMQ PULL socket connected to a real detector::
+
+        with CaptureWriter("series.capture") as capture:
+            while True:
+                capture.write(socket.recv_multipart(copy=False))
+    """
+
+    _file: BinaryIO
+    _start: Optional[int]
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """A CaptureWriter constructor.
+
+        Args:
+            path: The capture file to write.
+        """
+        self._file = Path(path).open("wb")
+        self._file.write(CAPTURE_MAGIC)
+        self._start = None
+
+    def write(
+        self,
+        parts: Sequence[Union[bytes, memoryview]],
+        timestamp: Optional[int] = None,
+    ) -> None:
+        """Write a message to the capture.
+
+        Args:
+            parts: The parts of the message.
+            timestamp: Time the message was received in nanoseconds, on any clock
+                consistent between messages. Defaults to None, now.
+        """
+        timestamp = perf_counter_ns() if timestamp is None else timestamp
+        if self._start is None:
+            self._start = timestamp
+        self._file.write(_RECORD.pack(timestamp - self._start, len(parts)))
+        for part in parts:
+            view = memoryview(part)
+            self._file.write(_PART.pack(view.nbytes))
+            self._file.write(view)
+
+    def close(self) -> None:
+        """Flush and close the capture file."""
+        self._file.close()
+
+    def __enter__(self) -> "CaptureWriter":  # noqa: D105
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:  # noqa: D105
+        self.close()
+
+
+class CaptureReader:
+    """Reads the messages of a capture file sequentially, through a buffer.
+
+    Captures of long series are far larger than memory, so they are never mapped or
+    read whole. The messages are read in order through a large buffer, and the
+    reader can seek back to a message it has passed to read on from there again.
+    """
+
+    path: Path
+
+    _file: BinaryIO
+
+    def __init__(
+        self, path: Union[str, Path], buffer_size: int = CAPTURE_BUFFER_SIZE
+    ) -> None:
+        """A CaptureReader constructor.
+
+        Args:
+            path: The capture file to read.
+            buffer_size: Size of the reads made from the file. Defaults to
+                CAPTURE_BUFFER_SIZE.
+
+        Raises:
+            ValueError: If the file is not a capture.
+        """
+        self.path = Path(path)
+        self._file = self.path.open("rb", buffering=buffer_size)
+        if self._file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            self._file.close()
+            raise ValueError(f"{self.path} is not a stream capture")
+
+    def tell(self) -> int:
+        """The position of the next message in the file.
+
+        Returns:
+            int: The position, to seek back to.
+        """
+        return self._file.tell()
+
+    def seek(self, position: int) -> None:
+        """Read on from a message passed earlier.
+
+        Args:
+            position: The position of the message, given by tell.
+        """
+        self._file.seek(position)
+
+    def read(self) -> Optional[CaptureRecord]:
+        """Read the next message.
+
+        Returns:
+            Optional[CaptureRecord]: The message, or None at the end of the capture.
+        """
+        record = self._file.read(_RECORD.size)
+        if len(record) < _RECORD.size:
+            return None
+        timestamp, count = _RECORD.unpack(record)
+        parts = []
+        for _ in range(count):
+            (size,) = _PART.unpack(self._file.read(_PART.size))
+            parts.append(self._file.read(size))
+        return CaptureRecord(timestamp, parts)
+
+    def first_parts(self) -> Iterator[CaptureRecord]:
+        """Read every message from the next onwards, with only its first part.
+
+        The other parts are skipped over rather than read, so the messages can be
+        scanned quickly for their headers.
+
+        Returns:
+            Iterator[CaptureRecord]: The messages, holding at most their first part.
+        """
+        while True:
+            record = self._file.read(_RECORD.size)
+            if len(record) < _RECORD.size:
+                return
+            timestamp, count = _RECORD.unpack(record)
+            parts = []
+            for index in range(count):
+                (size,) = _PART.unpack(self._file.read(_PART.size))
+                if index == 0:
+                    parts.append(self._file.read(size))
+                else:
+                    self._file.seek(size, 1)
+            yield CaptureRecord(timestamp, parts)
+
+    def close(self) -> None:
+        """Close the capture file."""
+        self._file.close()
+
+    def __iter__(self) -> Iterator[CaptureRecord]:  # noqa: D105
+        while (record := self.read()) is not None:
+            yield record
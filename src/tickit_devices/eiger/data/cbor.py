@@ -0,0 +1,105 @@
+import struct
+from dataclasses import dataclass
+from typing import Any
+
+#: CBOR major types
+UNSIGNED_INT = 0
+NEGATIVE_INT = 1
+BYTE_STRING = 2
+TEXT_STRING = 3
+ARRAY = 4
+MAP = 5
+TAG = 6
+
+_FALSE = b"\xf4"
+_TRUE = b"\xf5"
+_NULL = b"\xf6"
+_FLOAT64 = b"\xfb"
+
+
+@dataclass(frozen=True)
+class Tag:
+    """A CBOR tagged value."""
+
+    tag: int
+    value: Any
+
+
+def encode(value: Any) -> bytes:
+    """Encode a value as CBOR (RFC 8949).
+
+    Supports None, bools, ints, floats, strings, bytes-like objects, lists, tuples,
+    dicts and Tags, which covers the messages of the stream2 interface.
+
+    Args:
+        value: The value to encode.
+
+    Returns:
+        bytes: The CBOR encoded value.
+    """
+    out = bytearray()
+    _encode(value, out)
+    return bytes(out)
+
+
+def encode_head(major_type: int, argument: int) -> bytes:
+    """Encode the initial bytes of a CBOR item.
+
+    Args:
+        major_type: The major type of the item.
+        argument: The value, length or tag number of the item.
+
+    Returns:
+        bytes: The encoded head.
+    """
+    initial = major_type << 5
+    if argument < 24:
+        return bytes((initial | argument,))
+    elif argument < 1 << 8:
+        return bytes((initial | 24, argument))
+    elif argument < 1 << 16:
+        return bytes((initial | 25,)) + struct.pack(">H", argument)
+    elif argument < 1 << 32:
+        return bytes((initial | 26,)) + struct.pack(">I", argument)
+    return bytes((initial | 27,)) + struct.pack(">Q", argument)
+
+
+def _encode(value: Any, out: bytearray) -> None:
+    if value is None:
+        out += _NULL
+    elif value is True:
+        out += _TRUE
+    elif value is False:
+        out += _FALSE
+    elif isinstance(value, int):
+        if value >= 0:
+            out += encode_head(UNSIGNED_INT, value)
+        else:
+            out += encode_head(NEGATIVE_INT, -1 - value)
+    elif isinstance(value, float):
+        out += _FLOAT64 + struct.pack(">d", value)
+    elif isinstance(value, str):
+        encoded = value.encode("utf_8")
+        out += encode_head(TEXT_STRING, len(encoded))
+        out += encoded
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        view = memoryview(value)
+        out += encode_head(BYTE_STRING, view.nbytes)
+        out += view
+    elif isinstance(value, (list, tuple)):
+        out += encode_head(ARRAY, len(value))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out += encode_head(MAP, len(value))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    elif isinstance(value, Tag):
+        out += encode_head(TAG, value.tag)
+        _encode(value.value, out)
+    elif hasattr(value, "item"):
+        # numpy scalars
+        _encode(value.item(), out)
+    else:
+        raise TypeError(f"Cannot encode {value!r} as CBOR")
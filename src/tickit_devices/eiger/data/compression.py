@@ -0,0 +1,203 @@
+import struct
+from typing import Tuple, Union
+
+import lz4.block
+import numpy as np
+
+#: Number of bitshuffle blocks transposed at once, bounds the size of the
+#: temporary arrays to a few megabytes.
+_BLOCKS_PER_CHUNK = 256
+_TARGET_BLOCK_BYTES = 8192
+_TRANSPOSE_STEPS = [
+    (np.uint64(7), np.uint64(0x00AA00AA00AA00AA)),
+    (np.uint64(14), np.uint64(0x0000CCCC0000CCCC)),
+    (np.uint64(28), np.uint64(0x00000000F0F0F0F0)),
+]
+
+COMPRESSIONS = ["bslz4", "lz4"]
+
+
+def encoding_for(compression: str, dtype: np.dtype) -> str:
+    """Get the Eiger stream encoding string for a compression of an image.
+
+    Args:
+        compression: The compression, one of COMPRESSIONS.
+        dtype: The data type of the image pixels.
+
+    Returns:
+        str: The encoding as sent in the dimage_d-1.0 header e.g. "bs16-lz4<".
+    """
+    if compression == "bslz4":
+        return f"bs{np.dtype(dtype).itemsize * 8}-lz4<"
+    elif compression == "lz4":
+        return "lz4<"
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def compress(image: np.ndarray, compression: str) -> Tuple[bytes, str]:
+    """Compress an image as the Eiger would before sending it.
+
+    Args:
+        image: The image to compress.
+        compression: The compression to apply, one of COMPRESSIONS.
+
+    Returns:
+        Tuple[bytes, str]: The compressed image and its encoding string.
+    """
+    encoding = encoding_for(compression, image.dtype)
+    if compression == "bslz4":
+        return bitshuffle_lz4_compress(image), encoding
+    return lz4.block.compress(_little_endian(image), store_size=False), encoding
+
+
+def decompress(
+    data: Union[bytes, memoryview],
+    encoding: str,
+    shape: Tuple[int, ...],
+    dtype: Union[str, np.dtype],
+) -> np.ndarray:
+    """Decompress an image sent with the given encoding.
+
+    Args:
+        data: The compressed image.
+        encoding: The encoding as sent in the dimage_d-1.0 header e.g. "bs16-lz4<".
+        shape: The shape of the decompressed image.
+        dtype: The data type of the image pixels.
+
+    Returns:
+        np.ndarray: The decompressed image.
+    """
+    if encoding.startswith("bs") and encoding.endswith("-lz4<"):
+        return bitshuffle_lz4_decompress(data, shape, dtype)
+    elif encoding == "lz4<":
+        little_endian = np.dtype(dtype).newbyteorder("<")
+        size = int(np.prod(shape)) * little_endian.itemsize
+        raw = lz4.block.decompress(data, uncompressed_size=size)
+        return np.frombuffer(raw, dtype=little_endian).reshape(shape)
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+
+def bitshuffle_lz4_compress(image: np.ndarray) -> bytes:
+    """Compress an image with bitshuffle and LZ4, as the bitshuffle HDF5 filter does.
+
+    The output starts with the uncompressed size (uint64, big endian) and the block
+    size in bytes (uint32, big endian), followed by each block's compressed size
+    (uint32, big endian) and LZ4 compressed bitshuffled data. Trailing elements
+    that do not fill a multiple of 8 are copied uncompressed to the end.
+
+    Args:
+        image: The image to compress.
+
+    Returns:
+        bytes: The compressed image.
+    """
+    data = _little_endian(image).reshape(-1)
+    elem_size = data.dtype.itemsize
+    block_size = default_block_size(elem_size)
+
+    parts = [struct.pack(">QI", data.nbytes, block_size * elem_size)]
+    full_blocks = data.size // block_size
+    for start in range(0, full_blocks, _BLOCKS_PER_CHUNK):
+        stop = min(start + _BLOCKS_PER_CHUNK, full_blocks)
+        blocks = data[start * block_size : stop * block_size].reshape(
+            stop - start, block_size
+        )
+        for block in _bitshuffle_blocks(blocks):
+            parts.extend(_lz4_block(block))
+
+    remainder = data[full_blocks * block_size :]
+    last_block = remainder.size - remainder.size % 8
+    if last_block:
+        parts.extend(_lz4_block(_bitshuffle_blocks(remainder[None, :last_block])[0]))
+    parts.append(remainder[last_block:].tobytes())
+    return b"".join(parts)
+
+
+def bitshuffle_lz4_decompress(
+    data: Union[bytes, memoryview], shape: Tuple[int, ...], dtype: Union[str, np.dtype]
+) -> np.ndarray:
+    """Decompress an image compressed by bitshuffle_lz4_compress or the Eiger.
+
+    Args:
+        data: The compressed image.
+        shape: The shape of the decompressed image.
+        dtype: The data type of the image pixels.
+
+    Returns:
+        np.ndarray: The decompressed image.
+    """
+    dtype = np.dtype(dtype).newbyteorder("<")
+    elem_size = dtype.itemsize
+    nbytes, block_bytes = struct.unpack_from(">QI", data)
+    block_size = block_bytes // elem_size
+    size = nbytes // elem_size
+
+    out = np.empty(size, dtype=dtype)
+    offset = 12
+    position = 0
+    while size - position >= 8:
+        this_block = min(block_size, size - position)
+        this_block -= this_block % 8
+        (compressed_size,) = struct.unpack_from(">I", data, offset)
+        offset += 4
+        shuffled = lz4.block.decompress(
+            data[offset : offset + compressed_size],
+            uncompressed_size=this_block * elem_size,
+        )
+        offset += compressed_size
+        out[position : position + this_block] = _bitunshuffle_block(
+            np.frombuffer(shuffled, dtype=np.uint8), this_block, dtype
+        )
+        position += this_block
+    out[position:] = np.frombuffer(data, dtype=dtype, offset=offset)
+    return out.reshape(shape)
+
+
+def default_block_size(elem_size: int) -> int:
+    """The number of elements bitshuffle puts in a block by default.
+
+    Args:
+        elem_size: The size of each element in bytes.
+
+    Returns:
+        int: The block size in elements.
+    """
+    block_size = _TARGET_BLOCK_BYTES // elem_size
+    return max(block_size - block_size % 8, 128)
+
+
+def _little_endian(image: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(image, dtype=image.dtype.newbyteorder("<"))
+
+
+def _bitshuffle_blocks(blocks: np.ndarray) -> np.ndarray:
+    # Gather bit k of byte j of every element of a block into row j * 8 + k
+    count, block_size = blocks.shape
+    elem_size = blocks.dtype.itemsize
+    by_byte = blocks.view(np.uint8).reshape(count, block_size, elem_size)
+    by_byte = np.ascontiguousarray(by_byte.transpose(0, 2, 1))
+    words = _transpose_bits(by_byte.reshape(count, elem_size, block_size // 8, 8))
+    rows = words.view(np.uint8).reshape(count, elem_size, block_size // 8, 8)
+    return np.ascontiguousarray(rows.transpose(0, 1, 3, 2)).reshape(count, -1)
+
+
+def _bitunshuffle_block(shuffled: np.ndarray, size: int, dtype: np.dtype) -> np.ndarray:
+    rows = shuffled.reshape(dtype.itemsize, 8, size // 8).transpose(0, 2, 1)
+    words = _transpose_bits(np.ascontiguousarray(rows))
+    by_byte = words.view(np.uint8).reshape(dtype.itemsize, size)
+    return np.ascontiguousarray(by_byte.T).view(dtype).reshape(size)
+
+
+def _transpose_bits(eights: np.ndarray) -> np.ndarray:
+    # Transpose each group of 8 bytes as an 8x8 bit matrix, so byte k of the
+    # result holds bit k of each input byte (Hacker's Delight, section 7-3)
+    x = eights.view("<u8")[..., 0]
+    for shift, mask in _TRANSPOSE_STEPS:
+        t = (x ^ (x >> shift)) & mask
+        x = x ^ t ^ (t << shift)
+    return x
+
+
+def _lz4_block(block: np.ndarray) -> Tuple[bytes, bytes]:
+    compressed = lz4.block.compress(block.tobytes(), store_size=False)
+    return struct.pack(">I", len(compressed)), compressed
@@ -0,0 +1,65 @@
+import base64
+from typing import Any, Dict
+
+import numpy as np
+
+#: Version of the typed array format given in its "__darray__" key
+DARRAY_VERSION = [1, 0, 0]
+
+
+def encode_darray(array: np.ndarray) -> Dict[str, Any]:
+    """Encode an array in the typed array form the Eiger API uses for arrays.
+
+    The data is sent base64 encoded with its type and shape, the shape is given as
+    (x, y) so it is the reverse of the array's (rows, columns).
+
+    Args:
+        array: The array to encode.
+
+    Returns:
+        Dict[str, Any]: The JSON serializable typed array.
+    """
+    array = np.ascontiguousarray(array)
+    return {
+        "__darray__": DARRAY_VERSION,
+        "type": array.dtype.str,
+        "shape": list(reversed(array.shape)),
+        "filters": ["base64"],
+        "data": base64.b64encode(array.data).decode("ascii"),
+    }
+
+
+def decode_darray(value: Any, dtype: str) -> np.ndarray:
+    """Decode an array given as a typed array or as nested lists.
+
+    Args:
+        value: The typed array, or a list of rows.
+        dtype: The data type to store the array as.
+
+    Returns:
+        np.ndarray: The C contiguous array, of shape (rows, columns).
+
+    Raises:
+        ValueError: If the typed array uses filters other than base64, its data is
+            not encoded as those filters give, or it does not match its shape.
+    """
+    if isinstance(value, np.ndarray):
+        return np.ascontiguousarray(value, dtype=dtype)
+    elif not isinstance(value, dict):
+        return np.ascontiguousarray(np.array(value, dtype=dtype))
+
+    filters = value.get("filters", [])
+    if filters not in ([], ["base64"]):
+        raise ValueError(f"Unsupported typed array filters: {filters}")
+    data = value["data"]
+    if filters and isinstance(data, (str, bytes)):
+        data = base64.b64decode(data)
+    elif not isinstance(data, bytes):
+        encoding = "a base64 string" if filters else "bytes"
+        raise ValueError(f"Typed array data must be {encoding}, not {type(data)}")
+    shape = tuple(reversed(value["shape"]))
+    try:
+        array = np.frombuffer(data, dtype=np.dtype(value["type"])).reshape(shape)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Typed array data does not match shape {shape}") from e
+    return np.ascontiguousarray(array, dtype=dtype)
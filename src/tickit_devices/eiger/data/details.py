@@ -0,0 +1,69 @@
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+from tickit_devices.eiger.eiger_settings import EigerSettings
+
+
+def flatfield(settings: EigerSettings) -> np.ndarray:
+    """Get the flatfield sent with a series, ones unless one has been set.
+
+    Args:
+        settings: Current detector configuration.
+
+    Returns:
+        np.ndarray: The read only flatfield of shape (y, x).
+    """
+    if settings.flatfield.size:
+        return settings.flatfield
+    return _filled(_detector_shape(settings), "float32", 1)
+
+
+def pixel_mask(settings: EigerSettings) -> np.ndarray:
+    """Get the pixel mask sent with a series, no pixels unless one has been set.
+
+    Args:
+        settings: Current detector configuration.
+
+    Returns:
+        np.ndarray: The read only pixel mask of shape (y, x).
+    """
+    if settings.pixel_mask.size:
+        return settings.pixel_mask
+    return _filled(_detector_shape(settings), "uint32", 0)
+
+
+def countrate_table(settings: EigerSettings) -> np.ndarray:
+    """Get the count rate correction table sent with a series.
+
+    The simulated detector does not saturate, so up to the cutoff the corrected
+    counts in the second row are the measured counts in the first.
+
+    Args:
+        settings: Current detector configuration.
+
+    Returns:
+        np.ndarray: The read only table of shape (2, cutoff + 1).
+    """
+    return _identity_table(settings.countrate_correction_count_cutoff)
+
+
+def _detector_shape(settings: EigerSettings) -> Tuple[int, int]:
+    return (settings.y_pixels_in_detector, settings.x_pixels_in_detector)
+
+
+# The defaults are large, so the last few are kept rather than made for each series
+@lru_cache(maxsize=4)
+def _filled(shape: Tuple[int, int], dtype: str, value: int) -> np.ndarray:
+    array = np.full(shape, value, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+@lru_cache(maxsize=1)
+def _identity_table(cutoff: int) -> np.ndarray:
+    counts = np.arange(cutoff + 1, dtype="float32")
+    table = np.stack([counts, counts])
+    table.flags.writeable = False
+    return table
@@ -1,19 +1,30 @@
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
-from typing import Tuple
+from typing import Tuple, Union
+
+from tickit_devices.eiger.data.compression import compress, decompress
+from tickit_devices.eiger.data.generators import centre_crop
 
 
 @dataclass
 class Image:
-    """Dataclass to create a basic Image object."""
+    """Dataclass to create a basic Image object.
+
+    The data may be a memoryview so that frames can be sent without copying. The
+    timing fields are in nanoseconds, start and stop times are relative to the start
+    of the acquisition.
+    """
 
     index: int
     hash: str
     dtype: str
-    data: bytes
+    data: Union[bytes, memoryview]
     encoding: str
     shape: Tuple[int, int]
+    real_time: float = 0.0
+    start_time: float = 0.0
+    stop_time: float = 0.0
 
     @classmethod
     def create_dummy_image(cls, index: int, shape: Tuple[int, int]) -> "Image":
@@ -31,8 +42,26 @@ class Image:
         encoding = "bs16-lz4<"
         return Image(index, hsh, dtype, data, encoding, shape)
 
+    @classmethod
+    def create_roi_image(cls, index: int, shape: Tuple[int, int]) -> "Image":
+        """Returns an Image object wrapping the centre of the dummy blob.
+
+        Args:
+            index (int): The index of the Image in the current acquisition.
+            shape (Tuple[int, int]): Shape of the region of interest as
+                (x pixels, y pixels), no larger than the dummy blob.
+
+        Returns:
+            Image: An Image object wrapping the region of the dummy blob.
+        """
+        data = dummy_image_roi_blob(shape)
+        hsh = str(hash(data))
+        return Image(index, hsh, "uint16", data, "bs16-lz4<", shape)
+
 
 DUMMY_IMAGE_BLOB_PATH: Path = Path(__file__).parent / "frame_sample"
+#: Shape of the dummy image as (x pixels, y pixels)
+DUMMY_IMAGE_SHAPE: Tuple[int, int] = (4148, 4362)
 
 
 @lru_cache(maxsize=1)
@@ -49,3 +78,22 @@ def dummy_image_blob() -> bytes:
     """
     with DUMMY_IMAGE_BLOB_PATH.open("rb") as frame_file:
         return frame_file.read()
+
+
+@lru_cache(maxsize=2)
+def dummy_image_roi_blob(shape: Tuple[int, int]) -> bytes:
+    """Crop the dummy image blob to a region of interest at its centre.
+
+    The blob is decompressed, cropped and compressed again once for each shape,
+    which takes a fraction of a second, so it is cached.
+
+    Args:
+        shape: Shape of the region as (x pixels, y pixels).
+
+    Returns:
+        The compressed region as a bytes object.
+    """
+    width, height = DUMMY_IMAGE_SHAPE
+    image = decompress(dummy_image_blob(), "bs16-lz4<", (height, width), "uint16")
+    data, _ = compress(centre_crop(image, (shape[1], shape[0])), "bslz4")
+    return data
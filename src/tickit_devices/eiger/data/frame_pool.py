@@ -0,0 +1,457 @@
+import json
+import logging
+import mmap
+import struct
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Protocol, Tuple, Union
+
+from tickit_devices.eiger.data.compression import compress
+from tickit_devices.eiger.data.dummy_image import DUMMY_IMAGE_BLOB_PATH, Image
+from tickit_devices.eiger.data.generators import ImageGenerator, centre_crop
+
+LOGGER = logging.getLogger(__name__)
+
+_PoolKey = Tuple[Tuple[int, int], str, str, Tuple[int, int]]
+
+#: Magic bytes at the start of a frame container file
+CONTAINER_MAGIC = b"TICKITFRAMES\x00\x01"
+_HEADER_SIZE = struct.Struct("<I")
+
+
+class FrameSource(Protocol):
+    """Supplies the frames sent during an acquisition."""
+
+    def prepare(
+        self,
+        shape: Tuple[int, int],
+        dtype: str,
+        compression: str,
+        sensor_shape: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """Get ready to supply frames for an acquisition.
+
+        Args:
+            shape: Shape of the frames as (x pixels, y pixels).
+            dtype: Data type of the frame pixels.
+            compression: Compression to apply to the frames.
+            sensor_shape: Shape of the whole sensor as (x pixels, y pixels), when
+                the frames are a region of interest at its centre. Defaults to None,
+                the shape of the frames.
+        """
+
+    def image(self, index: int) -> Image:
+        """Get a frame as an image with the given index.
+
+        Args:
+            index: The index of the image in the current acquisition.
+
+        Returns:
+            Image: An image wrapping a frame.
+        """
+
+    def close(self) -> None:
+        """Release any resources held by the source."""
+
+
+class FramePool:
+    """A pool of distinct, compressed frames cycled through during acquisition.
+
+    Frames are generated and compressed on a background thread when the pool is
+    prepared, so acquiring a frame only picks one which is ready. Until the whole
+    pool is rendered the frames that are ready are cycled through, the first
+    acquisition waits for the first frame only.
+
+    When the frames are a region of interest, images of the whole sensor are made
+    and the frames cut from their centre without copying, so they show the part of
+    the image the region sees.
+    """
+
+    generator: ImageGenerator
+    size: int
+
+    _key: Optional[_PoolKey]
+    _frames: List[Tuple[bytes, str, str]]
+    _first_frame: Optional[Future]
+
+    def __init__(self, generator: ImageGenerator, size: int = 16) -> None:
+        """A FramePool constructor.
+
+        Args:
+            generator: Makes the images in the pool.
+            size: Number of distinct frames in the pool. Defaults to 16.
+        """
+        self.generator = generator
+        self.size = size
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="EigerFramePool"
+        )
+        self._key = None
+        self._frames = []
+        self._first_frame = None
+
+    def prepare(
+        self,
+        shape: Tuple[int, int],
+        dtype: str,
+        compression: str,
+        sensor_shape: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """Start rendering frames for an acquisition, if not already rendered.
+
+        Args:
+            shape: Shape of the frames as (x pixels, y pixels).
+            dtype: Data type of the frame pixels.
+            compression: Compression to apply to the frames.
+            sensor_shape: Shape of the whole sensor as (x pixels, y pixels), when
+                the frames are a region of interest at its centre. Defaults to None,
+                the shape of the frames.
+        """
+        key = (shape, dtype, compression, _sensor_shape(shape, sensor_shape))
+        if key == self._key:
+            return
+
+        LOGGER.debug(f"Rendering {self.size} frames of {key}")
+        self._key = key
+        # Each render appends to the list of its own acquisition, so frames still
+        # rendering for an earlier one can never be taken for those of this one
+        frames: List[Tuple[bytes, str, str]] = []
+        self._frames = frames
+        futures = [
+            self._executor.submit(self._render, frames, index, key)
+            for index in range(self.size)
+        ]
+        self._first_frame = futures[0] if futures else None
+
+    def image(self, index: int) -> Image:
+        """Get a frame from the pool as an image with the given index.
+
+        Args:
+            index: The index of the image in the current acquisition.
+
+        Returns:
+            Image: An image wrapping one of the pool's frames.
+        """
+        if self._key is None or self._first_frame is None:
+            raise RuntimeError("Frame pool must be prepared before taking images")
+        if not self._frames:
+            self._first_frame.result()
+
+        frames = self._frames
+        data, encoding, hsh = frames[index % len(frames)]
+        shape, dtype, _, _ = self._key
+        return Image(index, hsh, dtype, data, encoding, shape)
+
+    def close(self) -> None:
+        """Stop rendering frames."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _render(
+        self, frames: List[Tuple[bytes, str, str]], index: int, key: _PoolKey
+    ) -> None:
+        if frames is not self._frames:
+            return
+        (x, y), dtype, compression, (sensor_x, sensor_y) = key
+        image = self.generator.generate(index, (sensor_y, sensor_x), dtype)
+        data, encoding = compress(centre_crop(image, (y, x)), compression)
+        frames.append((data, encoding, str(hash(data))))
+
+
+class SharedFramePool:
+    """Synthetic frames shared by several detectors, rendered once between them.
+
+    Each detector takes a source of its own from the pool, which is prepared and
+    cycled through independently. The frames of each configuration are rendered by
+    one FramePool, made when a detector is first prepared with the configuration,
+    so detectors configured alike share their frames.
+    """
+
+    generator: ImageGenerator
+    size: int
+
+    _pools: Dict[_PoolKey, FramePool]
+
+    def __init__(self, generator: ImageGenerator, size: int = 16) -> None:
+        """A SharedFramePool constructor.
+
+        Args:
+            generator: Makes the images in the pool.
+            size: Number of distinct frames of each configuration. Defaults to 16.
+        """
+        self.generator = generator
+        self.size = size
+        self._pools = {}
+
+    def source(self) -> FrameSource:
+        """Get a source of frames for one detector.
+
+        Returns:
+            FrameSource: A source taking its frames from the pool, closing it does
+                not close the pool.
+        """
+        return _SharedFrameSource(self)
+
+    def pool(
+        self,
+        shape: Tuple[int, int],
+        dtype: str,
+        compression: str,
+        sensor_shape: Optional[Tuple[int, int]] = None,
+    ) -> FramePool:
+        """Get the pool rendering the frames of a configuration.
+
+        Args:
+            shape: Shape of the frames as (x pixels, y pixels).
+            dtype: Data type of the frame pixels.
+            compression: Compression to apply to the frames.
+            sensor_shape: Shape of the whole sensor as (x pixels, y pixels), when
+                the frames are a region of interest at its centre. Defaults to None,
+                the shape of the frames.
+
+        Returns:
+            FramePool: The pool, prepared for the configuration.
+        """
+        shape = (shape[0], shape[1])
+        key: _PoolKey = (
+            shape,
+            dtype,
+            compression,
+            _sensor_shape(shape, sensor_shape),
+        )
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = FramePool(self.generator, self.size)
+            pool.prepare(shape, dtype, compression, sensor_shape)
+            self._pools[key] = pool
+        return pool
+
+    def close(self) -> None:
+        """Stop rendering frames of every configuration."""
+        for pool in self._pools.values():
+            pool.close()
+        self._pools = {}
+
+
+class _SharedFrameSource:
+    # One detector's view of a SharedFramePool
+    def __init__(self, shared: SharedFramePool) -> None:
+        self._shared = shared
+        self._pool: Optional[FramePool] = None
+
+    def prepare(
+        self,
+        shape: Tuple[int, int],
+        dtype: str,
+        compression: str,
+        sensor_shape: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        self._pool = self._shared.pool(shape, dtype, compression, sensor_shape)
+
+    def image(self, index: int) -> Image:
+        if self._pool is None:
+            raise RuntimeError("Frame pool must be prepared before taking images")
+        return self._pool.image(index)
+
+    def close(self) -> None:
+        self._pool = None
+
+
+class MappedFramePool:
+    """A pool of pre-compressed frames memory mapped from disk.
+
+    Frames are handed out as read-only memoryview slices of the mapping, so
+    thousands of frames cost no memory beyond the page cache. The frames can be:
+
+    - A container file written by write_frame_container, which records the shape,
+      data type and encoding of the frames.
+    - A directory where every file is one compressed frame, in name order.
+    - A single file holding one compressed frame, such as the detector sample.
+
+    For directories and single files the shape, data type and encoding must be given
+    and default to those of the detector sample.
+    """
+
+    shape: Tuple[int, int]
+    dtype: str
+    encoding: str
+
+    _frames: List[memoryview]
+    _hashes: List[str]
+    _mappings: List[mmap.mmap]
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DUMMY_IMAGE_BLOB_PATH,
+        shape: Tuple[int, int] = (4148, 4362),
+        dtype: str = "uint16",
+        encoding: str = "bs16-lz4<",
+    ) -> None:
+        """A MappedFramePool constructor.
+
+        Args:
+            path: Container file, directory or single frame file to map.
+                Defaults to the detector sample.
+            shape: Shape of the frames as (x pixels, y pixels), if not recorded in
+                a container. Defaults to the size of the Eiger 16M.
+            dtype: Data type of the frame pixels, if not recorded in a container.
+                Defaults to "uint16".
+            encoding: Encoding of the frames, if not recorded in a container.
+                Defaults to "bs16-lz4<".
+        """
+        path = Path(path)
+        self.shape = shape
+        self.dtype = dtype
+        self.encoding = encoding
+        self._frames = []
+        self._hashes = []
+        self._mappings = []
+
+        if path.is_dir():
+            for frame_path in sorted(p for p in path.iterdir() if p.is_file()):
+                self._add_file(frame_path)
+        elif _is_container(path):
+            self._add_container(path)
+        else:
+            self._add_file(path)
+
+        if not self._frames:
+            raise ValueError(f"No frames found in {path}")
+        LOGGER.debug(f"Mapped {len(self._frames)} frames from {path}")
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._frames)
+
+    def prepare(
+        self,
+        shape: Tuple[int, int],
+        dtype: str,
+        compression: str,
+        sensor_shape: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """Check the mapped frames against the detector configuration.
+
+        The frames are pre-compressed so cannot follow the configuration, a warning
+        is logged if they differ.
+
+        Args:
+            shape: Shape of the frames as (x pixels, y pixels).
+            dtype: Data type of the frame pixels.
+            compression: Compression to apply to the frames.
+            sensor_shape: Shape of the whole sensor, unused as the frames are not
+                cropped. Defaults to None.
+        """
+        if (tuple(shape), dtype) != (tuple(self.shape), self.dtype):
+            LOGGER.warning(
+                f"Mapped frames are {self.shape} {self.dtype}, "
+                f"detector is configured for {shape} {dtype}"
+            )
+
+    def image(self, index: int) -> Image:
+        """Get a mapped frame as an image with the given index.
+
+        Args:
+            index: The index of the image in the current acquisition.
+
+        Returns:
+            Image: An image wrapping a view of one of the mapped frames.
+        """
+        frame = index % len(self._frames)
+        return Image(
+            index,
+            self._hashes[frame],
+            self.dtype,
+            self._frames[frame],
+            self.encoding,
+            self.shape,
+        )
+
+    def close(self) -> None:
+        """Drop the frames, the mappings close once all views are released."""
+        self._frames = []
+        self._hashes = []
+        self._mappings = []
+
+    def _map(self, path: Path) -> Optional[memoryview]:
+        with path.open("rb") as frame_file:
+            if path.stat().st_size == 0:
+                return None
+            mapping = mmap.mmap(frame_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mappings.append(mapping)
+        return memoryview(mapping)
+
+    def _add_file(self, path: Path) -> None:
+        view = self._map(path)
+        if view is not None:
+            self._frames.append(view)
+            self._hashes.append(str(hash((str(path), 0))))
+
+    def _add_container(self, path: Path) -> None:
+        view = self._map(path)
+        if view is None:
+            return
+        start = len(CONTAINER_MAGIC)
+        (header_size,) = _HEADER_SIZE.unpack_from(view, start)
+        start += _HEADER_SIZE.size
+        header = json.loads(bytes(view[start : start + header_size]))
+        start += header_size
+
+        self.shape = tuple(header["shape"])  # type: ignore
+        self.dtype = header["dtype"]
+        self.encoding = header["encoding"]
+        for offset, size in zip(header["offsets"], header["sizes"]):
+            self._frames.append(view[start + offset : start + offset + size])
+            self._hashes.append(str(hash((str(path), offset))))
+
+
+def write_frame_container(
+    path: Union[str, Path],
+    frames: Iterable[Union[bytes, memoryview]],
+    shape: Tuple[int, int],
+    dtype: str,
+    encoding: str,
+) -> None:
+    """Write compressed frames to a container file for MappedFramePool.
+
+    Args:
+        path: The file to write.
+        frames: The compressed frames.
+        shape: Shape of the frames as (x pixels, y pixels).
+        dtype: Data type of the frame pixels.
+        encoding: Encoding of the frames e.g. "bs16-lz4<".
+    """
+    frames = list(frames)
+    offsets = []
+    position = 0
+    for frame in frames:
+        offsets.append(position)
+        position += len(frame)
+    header = json.dumps(
+        {
+            "shape": list(shape),
+            "dtype": dtype,
+            "encoding": encoding,
+            "offsets": offsets,
+            "sizes": [len(frame) for frame in frames],
+        }
+    ).encode("utf_8")
+    with Path(path).open("wb") as container:
+        container.write(CONTAINER_MAGIC)
+        container.write(_HEADER_SIZE.pack(len(header)))
+        container.write(header)
+        for frame in frames:
+            container.write(frame)
+
+
+def _sensor_shape(
+    shape: Tuple[int, int], sensor_shape: Optional[Tuple[int, int]]
+) -> Tuple[int, int]:
+    # Frames which do not fit in the sensor are made at their own shape
+    if sensor_shape is None or shape[0] > sensor_shape[0] or shape[1] > sensor_shape[1]:
+        return shape
+    return (sensor_shape[0], sensor_shape[1])
+
+
+def _is_container(path: Path) -> bool:
+    with path.open("rb") as frame_file:
+        return frame_file.read(len(CONTAINER_MAGIC)) == CONTAINER_MAGIC
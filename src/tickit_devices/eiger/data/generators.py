@@ -0,0 +1,150 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+
+class ImageGenerator(ABC):
+    """Makes synthetic detector images, one distinct image per index."""
+
+    @abstractmethod
+    def generate(self, index: int, shape: Tuple[int, int], dtype: str) -> np.ndarray:
+        """Make an image.
+
+        Args:
+            index: Index of the image, images with different indices should differ
+                where the generator allows.
+            shape: Shape of the image array (rows, columns).
+            dtype: Data type of the image pixels.
+
+        Returns:
+            np.ndarray: The image.
+        """
+
+
+class FlatImageGenerator(ImageGenerator):
+    """Makes images where every pixel has the same value."""
+
+    def __init__(self, value: int = 1) -> None:
+        """A FlatImageGenerator constructor.
+
+        Args:
+            value: The value of every pixel. Defaults to 1.
+        """
+        self.value = value
+
+    def generate(  # noqa: D102
+        self, index: int, shape: Tuple[int, int], dtype: str
+    ) -> np.ndarray:
+        return np.full(shape, self.value, dtype=dtype)
+
+
+class PoissonImageGenerator(ImageGenerator):
+    """Makes images of Poisson distributed counts, as from a uniform background."""
+
+    def __init__(self, mean: float = 1.0, seed: int = 0) -> None:
+        """A PoissonImageGenerator constructor.
+
+        Args:
+            mean: The mean count per pixel. Defaults to 1.0.
+            seed: Seed for the random numbers, combined with the image index.
+                Defaults to 0.
+        """
+        self.mean = mean
+        self.seed = seed
+
+    def generate(  # noqa: D102
+        self, index: int, shape: Tuple[int, int], dtype: str
+    ) -> np.ndarray:
+        rng = np.random.default_rng((self.seed, index))
+        return _clip_to(rng.poisson(self.mean, shape), dtype)
+
+
+class RingImageGenerator(ImageGenerator):
+    """Makes powder diffraction style images of rings around the beam centre.
+
+    The mean intensity is looked up by distance from the beam centre, so each image
+    costs one gather and one draw of Poisson noise.
+    """
+
+    def __init__(
+        self,
+        radii: Sequence[float] = (300.0, 550.0, 800.0, 1200.0, 1650.0),
+        width: float = 6.0,
+        peak: float = 200.0,
+        background: float = 0.5,
+        centre: Optional[Tuple[float, float]] = None,
+        seed: int = 0,
+    ) -> None:
+        """A RingImageGenerator constructor.
+
+        Args:
+            radii: Radii of the rings in pixels.
+            width: Standard deviation of the ring profile in pixels. Defaults to 6.0.
+            peak: Mean count at the peak of the innermost ring. Defaults to 200.0.
+            background: Mean count away from the rings. Defaults to 0.5.
+            centre: Beam centre as (column, row), defaults to the middle of the image.
+            seed: Seed for the random numbers, combined with the image index.
+                Defaults to 0.
+        """
+        self.radii = tuple(radii)
+        self.width = width
+        self.peak = peak
+        self.background = background
+        self.centre = centre
+        self.seed = seed
+
+    def generate(  # noqa: D102
+        self, index: int, shape: Tuple[int, int], dtype: str
+    ) -> np.ndarray:
+        centre = self.centre or ((shape[1] - 1) / 2, (shape[0] - 1) / 2)
+        radius = _radius_grid(shape, centre)
+        profile = self._profile(int(radius.max()) + 1)
+        rng = np.random.default_rng((self.seed, index))
+        return _clip_to(rng.poisson(profile[radius]), dtype)
+
+    def _profile(self, length: int) -> np.ndarray:
+        r = np.arange(length, dtype=np.float64)
+        profile = np.full(length, self.background)
+        for ring, ring_radius in enumerate(self.radii):
+            # Outer rings are weaker, as intensity spreads over a larger circle
+            amplitude = self.peak * self.radii[0] / ring_radius / (ring + 1)
+            profile += amplitude * np.exp(-0.5 * ((r - ring_radius) / self.width) ** 2)
+        return profile
+
+
+#: Generators which can be selected by name in the Eiger configuration.
+GENERATORS: Dict[str, Type[ImageGenerator]] = {
+    "flat": FlatImageGenerator,
+    "poisson": PoissonImageGenerator,
+    "rings": RingImageGenerator,
+}
+
+
+def centre_crop(image: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """Take the centre of an image, as a region of interest of a sensor reads out.
+
+    Args:
+        image: The image of the whole sensor.
+        shape: Shape of the region (rows, columns), no larger than the image.
+
+    Returns:
+        np.ndarray: The region, a view sharing the memory of the image.
+    """
+    rows, columns = shape
+    top = (image.shape[0] - rows) // 2
+    left = (image.shape[1] - columns) // 2
+    return image[top : top + rows, left : left + columns]
+
+
+@lru_cache(maxsize=4)
+def _radius_grid(shape: Tuple[int, int], centre: Tuple[float, float]) -> np.ndarray:
+    rows, columns = np.ogrid[: shape[0], : shape[1]]
+    radius = np.hypot(columns - centre[0], rows - centre[1]).astype(np.int32)
+    radius.flags.writeable = False
+    return radius
+
+
+def _clip_to(image: np.ndarray, dtype: str) -> np.ndarray:
+    return np.minimum(image, np.iinfo(dtype).max).astype(dtype)
@@ -0,0 +1,205 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from tickit_devices.eiger.data import cbor
+from tickit_devices.eiger.data.cbor import Tag
+from tickit_devices.eiger.data.dummy_image import Image
+from tickit_devices.eiger.eiger_settings import EigerSettings
+
+#: CBOR tags used by the stream2 interface
+DATE_TIME_TAG = 0
+MULTI_DIM_ARRAY_TAG = 40
+COMPRESSED_TAG = 56500
+#: Typed array tags (RFC 8746) of little endian pixel types
+TYPED_ARRAY_TAGS: Dict[str, int] = {
+    "uint8": 64,
+    "uint16": 69,
+    "uint32": 70,
+    "uint64": 71,
+    "int8": 72,
+    "int16": 77,
+    "int32": 78,
+    "int64": 79,
+    "float32": 85,
+    "float64": 86,
+}
+
+CHANNEL = "threshold_1"
+_NANOSECONDS = 1_000_000_000
+
+_IMAGE_ID = cbor.encode("image_id")
+_REAL_TIME = cbor.encode("real_time")
+_START_TIME = cbor.encode("start_time")
+_STOP_TIME = cbor.encode("stop_time")
+_NO_USER_DATA = cbor.encode("user_data") + cbor.encode({})
+
+
+def start_message(
+    settings: EigerSettings,
+    series_id: int,
+    series_unique_id: str,
+    arm_date: Optional[datetime] = None,
+) -> bytes:
+    """Encode the message sent at the start of a series.
+
+    Args:
+        settings: Current detector configuration.
+        series_id: ID of the acquisition series.
+        series_unique_id: ID of the series unique across detector restarts.
+        arm_date: When the detector was armed. Defaults to None, now.
+
+    Returns:
+        bytes: The CBOR encoded message.
+    """
+    arm_date = arm_date or datetime.now(timezone.utc)
+    message: Dict[str, Any] = {
+        "type": "start",
+        "series_id": series_id,
+        "series_unique_id": series_unique_id,
+        "arm_date": Tag(DATE_TIME_TAG, arm_date.isoformat()),
+        "beam_center_x": settings.beam_center_x,
+        "beam_center_y": settings.beam_center_y,
+        "channels": [CHANNEL],
+        "count_time": settings.count_time,
+        "countrate_correction_enabled": settings.countrate_correction_applied,
+        "detector_description": settings.description,
+        "detector_serial_number": settings.detector_number,
+        "flatfield_enabled": settings.flatfield_correction_applied,
+        "frame_time": settings.frame_time,
+        "image_dtype": f"uint{settings.bit_depth_image}",
+        "image_size_x": settings.x_pixels_in_detector,
+        "image_size_y": settings.y_pixels_in_detector,
+        "incident_energy": settings.photon_energy,
+        "incident_wavelength": settings.wavelength,
+        "number_of_images": settings.nimages * settings.ntrigger,
+        "pixel_mask_enabled": settings.pixel_mask_applied,
+        "pixel_size_x": settings.x_pixel_size,
+        "pixel_size_y": settings.y_pixel_size,
+        "sensor_material": settings.sensor_material,
+        "sensor_thickness": settings.sensor_thickness,
+        "threshold_energy": {CHANNEL: settings.threshold_energy},
+        "user_data": {},
+    }
+    return cbor.encode(message)
+
+
+def end_message(series_id: int, series_unique_id: str) -> bytes:
+    """Encode the message sent at the end of a series.
+
+    Args:
+        series_id: ID of the acquisition series.
+        series_unique_id: ID of the series unique across detector restarts.
+
+    Returns:
+        bytes: The CBOR encoded message.
+    """
+    return cbor.encode(
+        {"type": "end", "series_id": series_id, "series_unique_id": series_unique_id}
+    )
+
+
+class ImageMessageTemplate:
+    """The image message of a series, encoded once with the per-image fields left out.
+
+    The image is sent as a multi-dimensional array of a typed array, holding the
+    compressed data as it came from the detector. Only the image number, times and
+    the length of the data are encoded per image, and the data is written into the
+    message as it is.
+    """
+
+    _head: bytes
+    _data_head: bytes
+
+    def __init__(
+        self,
+        series_id: int,
+        series_unique_id: str,
+        shape: Tuple[int, int],
+        encoding: str,
+        dtype: str,
+    ) -> None:
+        """Build the template for the images of a series.
+
+        Args:
+            series_id: ID of the acquisition series.
+            series_unique_id: ID of the series unique across detector restarts.
+            shape: Shape of the images as (x pixels, y pixels).
+            encoding: Encoding of the image data e.g. "bs16-lz4<".
+            dtype: Data type of the image pixels.
+        """
+        # The map holds the fixed fields, then image_id, the times and user_data,
+        # then the data whose byte string comes last
+        self._head = cbor.encode_head(cbor.MAP, 9) + b"".join(
+            cbor.encode(item)
+            for pair in [
+                ("type", "image"),
+                ("series_id", series_id),
+                ("series_unique_id", series_unique_id),
+            ]
+            for item in pair
+        )
+        data = {
+            CHANNEL: Tag(
+                MULTI_DIM_ARRAY_TAG,
+                [
+                    [shape[1], shape[0]],
+                    Tag(
+                        TYPED_ARRAY_TAGS[dtype],
+                        Tag(
+                            COMPRESSED_TAG,
+                            [
+                                _compression_name(encoding),
+                                np.dtype(dtype).itemsize,
+                                b"",
+                            ],
+                        ),
+                    ),
+                ],
+            )
+        }
+        encoded = cbor.encode("data") + cbor.encode(data)
+        # Everything up to the length of the image data, an empty byte string
+        self._data_head = encoded[: -len(cbor.encode(b""))]
+
+    def render(self, image: Image) -> bytes:
+        """Encode the message for an image.
+
+        Args:
+            image: The image with associated metadata.
+
+        Returns:
+            bytes: The CBOR encoded message.
+        """
+        data = memoryview(image.data)
+        return b"".join(
+            (
+                self._head,
+                _IMAGE_ID,
+                cbor.encode(image.index),
+                _REAL_TIME,
+                cbor.encode(_rational(image.real_time)),
+                _START_TIME,
+                cbor.encode(_rational(image.start_time)),
+                _STOP_TIME,
+                cbor.encode(_rational(image.stop_time)),
+                _NO_USER_DATA,
+                self._data_head,
+                cbor.encode_head(cbor.BYTE_STRING, data.nbytes),
+                data,
+            )
+        )
+
+
+def _rational(nanoseconds: float) -> Tuple[int, int]:
+    # Times are sent as a numerator and denominator in seconds
+    return (int(round(nanoseconds)), _NANOSECONDS)
+
+
+def _compression_name(encoding: str) -> str:
+    if encoding.startswith("bs"):
+        return "bslz4"
+    elif encoding == "lz4<":
+        return "lz4"
+    raise ValueError(f"Unknown encoding: {encoding}")
@@ -0,0 +1,168 @@
+import json
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from json.encoder import encode_basestring_ascii
+from typing import Any, List, Sequence, Tuple
+
+from pydantic.v1 import BaseModel
+
+from tickit_devices.eiger.data.schema import (
+    ImageCharacteristicsHeader,
+    ImageConfigHeader,
+    ImageHeader,
+)
+
+
+class HeaderTemplate:
+    """A pre-encoded JSON header with a few fields left to fill in per message.
+
+    The template is made by encoding an example of the header once and cutting out
+    the variable fields, so rendering it is a string join rather than constructing
+    and serialising a model. The output is byte-for-byte identical to
+    ``model.json()`` with the same values.
+    """
+
+    _chunks: List[str]
+    _fields: List[str]
+
+    def __init__(self, model: BaseModel, variable_fields: Sequence[str]) -> None:
+        """Build a template from an example header.
+
+        Args:
+            model: An example of the header, all fields not in variable_fields are
+                fixed to the values in this example.
+            variable_fields: Names of fields to fill in when rendering.
+        """
+        markers = {name: json.dumps(f"\0{name}\0") for name in variable_fields}
+        encoded = model.copy(update={name: f"\0{name}\0" for name in markers}).json()
+        positions = sorted((encoded.index(markers[name]), name) for name in markers)
+
+        self._chunks = []
+        self._fields = []
+        start = 0
+        for position, name in positions:
+            self._chunks.append(encoded[start:position])
+            self._fields.append(name)
+            start = position + len(markers[name])
+        self._chunks.append(encoded[start:])
+
+    def render(self, **values: Any) -> bytes:
+        """Encode the header with the given values for the variable fields.
+
+        Args:
+            values: A value for every variable field of the template.
+
+        Returns:
+            bytes: The JSON encoded header.
+        """
+        parts = [self._chunks[0]]
+        for name, chunk in zip(self._fields, self._chunks[1:]):
+            parts.append(_encode_value(values[name]))
+            parts.append(chunk)
+        return "".join(parts).encode("utf_8")
+
+
+def _encode_value(value: Any) -> str:
+    # Shortcuts for the common header value types, equivalent to json.dumps
+    if type(value) is int:
+        return int.__repr__(value)
+    elif type(value) is float and math.isfinite(value):
+        return float.__repr__(value)
+    elif type(value) is str:
+        return encode_basestring_ascii(value)
+    return json.dumps(value)
+
+
+@dataclass(frozen=True)
+class ImageHeaderTemplates:
+    """Templates for the three headers sent with each image of a series."""
+
+    image: HeaderTemplate
+    characteristics: HeaderTemplate
+    config: HeaderTemplate
+
+    @classmethod
+    def for_series(
+        cls, series_id: int, shape: Tuple[int, int], encoding: str, dtype: str
+    ) -> "ImageHeaderTemplates":
+        """Build the image header templates for an acquisition series.
+
+        Args:
+            series_id: ID for the acquisition series.
+            shape: Shape of the images in the series.
+            encoding: Compression applied to the images.
+            dtype: Data type of the image pixels.
+
+        Returns:
+            ImageHeaderTemplates: Templates with the per-series fields filled in.
+        """
+        return cls(
+            image=HeaderTemplate(
+                ImageHeader(frame=0, hash="", series=series_id),
+                ["frame", "hash"],
+            ),
+            characteristics=HeaderTemplate(
+                ImageCharacteristicsHeader(
+                    encoding=encoding, shape=shape, size=0, type=dtype
+                ),
+                ["size"],
+            ),
+            config=HeaderTemplate(
+                ImageConfigHeader(real_time=0.0, start_time=0.0, stop_time=0.0),
+                ["real_time", "start_time", "stop_time"],
+            ),
+        )
+
+
+_TemplateKey = Tuple[int, Tuple[int, int], str, str]
+
+
+class HeaderTemplateCache:
+    """The image header templates of recent series, by series and image format.
+
+    A cache can be shared by the streams of several detectors, which then build
+    the templates of a series and format once between them. The least recently
+    used templates are dropped beyond the size of the cache.
+    """
+
+    size: int
+
+    _templates: "OrderedDict[_TemplateKey, ImageHeaderTemplates]"
+
+    def __init__(self, size: int = 16) -> None:
+        """A HeaderTemplateCache constructor.
+
+        Args:
+            size: The number of sets of templates kept. Defaults to 16.
+        """
+        self.size = size
+        self._templates = OrderedDict()
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._templates)
+
+    def get(
+        self, series_id: int, shape: Tuple[int, int], encoding: str, dtype: str
+    ) -> ImageHeaderTemplates:
+        """Get the templates for the images of a series, building them if needed.
+
+        Args:
+            series_id: ID for the acquisition series.
+            shape: Shape of the images in the series.
+            encoding: Compression applied to the images.
+            dtype: Data type of the image pixels.
+
+        Returns:
+            ImageHeaderTemplates: Templates with the per-series fields filled in.
+        """
+        key = (series_id, shape, encoding, dtype)
+        templates = self._templates.get(key)
+        if templates is None:
+            templates = ImageHeaderTemplates.for_series(*key)
+            self._templates[key] = templates
+            if len(self._templates) > self.size:
+                self._templates.popitem(last=False)
+        else:
+            self._templates.move_to_end(key)
+        return templates
@@ -0,0 +1,123 @@
+import struct
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+#: TIFF tags of a single channel, uncompressed image
+IMAGE_WIDTH = 256
+IMAGE_LENGTH = 257
+BITS_PER_SAMPLE = 258
+COMPRESSION = 259
+PHOTOMETRIC_INTERPRETATION = 262
+STRIP_OFFSETS = 273
+SAMPLES_PER_PIXEL = 277
+ROWS_PER_STRIP = 278
+STRIP_BYTE_COUNTS = 279
+SAMPLE_FORMAT = 339
+
+_SHORT = 3
+_LONG = 4
+_FIELD_FORMATS = {_SHORT: "H", _LONG: "I"}
+_SAMPLE_FORMATS = {"u": 1, "i": 2, "f": 3}
+_HEADER_SIZE = 8
+_ENTRY_SIZE = 12
+
+
+def write_tiff(array: np.ndarray) -> bytes:
+    """Encode a 2D array as a little endian, uncompressed, single strip TIFF.
+
+    Args:
+        array: The image, of shape (rows, columns).
+
+    Returns:
+        bytes: The TIFF file.
+    """
+    array = np.ascontiguousarray(array, dtype=np.dtype(array.dtype).newbyteorder("<"))
+    rows, columns = array.shape
+    entries = [
+        (IMAGE_WIDTH, _LONG, columns),
+        (IMAGE_LENGTH, _LONG, rows),
+        (BITS_PER_SAMPLE, _SHORT, array.dtype.itemsize * 8),
+        (COMPRESSION, _SHORT, 1),
+        (PHOTOMETRIC_INTERPRETATION, _SHORT, 1),
+        (STRIP_OFFSETS, _LONG, 0),
+        (SAMPLES_PER_PIXEL, _SHORT, 1),
+        (ROWS_PER_STRIP, _LONG, rows),
+        (STRIP_BYTE_COUNTS, _LONG, array.nbytes),
+        (SAMPLE_FORMAT, _SHORT, _SAMPLE_FORMATS[array.dtype.kind]),
+    ]
+    # The image data follows the header and the one directory
+    data_offset = _HEADER_SIZE + 2 + len(entries) * _ENTRY_SIZE + 4
+    directory = [struct.pack("<H", len(entries))]
+    for tag, field_type, value in entries:
+        if tag == STRIP_OFFSETS:
+            value = data_offset
+        directory.append(
+            struct.pack(
+                f"<HHI{_FIELD_FORMATS[field_type]}", tag, field_type, 1, value
+            ).ljust(_ENTRY_SIZE, b"\x00")
+        )
+    directory.append(struct.pack("<I", 0))
+    return b"".join(
+        [b"II", struct.pack("<HI", 42, _HEADER_SIZE), *directory, array.data]
+    )
+
+
+def read_tiff(data: bytes) -> np.ndarray:
+    """Decode the first image of an uncompressed, single channel TIFF.
+
+    Args:
+        data: The TIFF file.
+
+    Returns:
+        np.ndarray: The image, of shape (rows, columns).
+
+    Raises:
+        ValueError: If the data is not a TIFF of a form that can be read.
+    """
+    order = {b"II": "<", b"MM": ">"}.get(data[:2])
+    if order is None or struct.unpack_from(f"{order}H", data, 2)[0] != 42:
+        raise ValueError("Not a TIFF file")
+    (offset,) = struct.unpack_from(f"{order}I", data, 4)
+    tags = _read_directory(data, offset, order)
+
+    if tags.get(COMPRESSION, [1])[0] != 1:
+        raise ValueError("Only uncompressed TIFF images can be read")
+    if tags.get(SAMPLES_PER_PIXEL, [1])[0] != 1:
+        raise ValueError("Only single channel TIFF images can be read")
+    columns, rows = tags[IMAGE_WIDTH][0], tags[IMAGE_LENGTH][0]
+    bits = tags.get(BITS_PER_SAMPLE, [1])[0]
+    kinds = {code: kind for kind, code in _SAMPLE_FORMATS.items()}
+    kind = kinds.get(tags.get(SAMPLE_FORMAT, [1])[0])
+    if kind is None or bits % 8:
+        raise ValueError(f"Unsupported TIFF sample format of {bits} bits")
+    dtype = np.dtype(f"{order}{kind}{bits // 8}")
+
+    strips = zip(tags[STRIP_OFFSETS], tags[STRIP_BYTE_COUNTS])
+    pixels = b"".join(data[start : start + count] for start, count in strips)
+    if len(pixels) != rows * columns * dtype.itemsize:
+        raise ValueError("TIFF image data does not match its size")
+    return np.frombuffer(pixels, dtype=dtype).reshape(rows, columns)
+
+
+def _read_directory(data: bytes, offset: int, order: str) -> Dict[int, List[int]]:
+    (count,) = struct.unpack_from(f"{order}H", data, offset)
+    tags: Dict[int, List[int]] = {}
+    for index in range(count):
+        entry = offset + 2 + index * _ENTRY_SIZE
+        tag, field_type, values = struct.unpack_from(f"{order}HHI", data, entry)
+        if field_type not in _FIELD_FORMATS:
+            continue
+        tags[tag] = list(_read_values(data, entry, order, field_type, values))
+    return tags
+
+
+def _read_values(
+    data: bytes, entry: int, order: str, field_type: int, values: int
+) -> Tuple[int, ...]:
+    # Values which fit in four bytes are held in the entry, others are at an offset
+    value_format = f"{order}{values}{_FIELD_FORMATS[field_type]}"
+    if struct.calcsize(value_format) <= 4:
+        return struct.unpack_from(value_format, data, entry + 8)
+    (offset,) = struct.unpack_from(f"{order}I", data, entry + 8)
+    return struct.unpack_from(value_format, data, offset)
@@ -0,0 +1,77 @@
+from typing import Optional
+
+from tickit.core.typedefs import SimTime
+
+#: Bytes of frame data the detector control unit can hold, 4 GiB
+DCU_BUFFER_SIZE: int = 4 * 2**30
+
+
+class DCUBuffer:
+    """The detector control unit's buffer of frames waiting to go out on the network.
+
+    Frames fill the buffer as they are acquired and it drains at the network
+    bandwidth as simulation time passes. At frame rates the network cannot sustain
+    the buffer fills up, and acquisition has to wait for it to drain as on the real
+    detector.
+    """
+
+    size: int
+    bandwidth: float
+
+    _level: float
+    _time: Optional[SimTime]
+
+    def __init__(self, bandwidth: float, size: int = DCU_BUFFER_SIZE) -> None:
+        """A DCUBuffer constructor.
+
+        Args:
+            bandwidth: Rate the buffer drains at, in bytes per second.
+            size: Capacity of the buffer in bytes. Defaults to DCU_BUFFER_SIZE.
+        """
+        self.size = size
+        self.bandwidth = bandwidth
+        self._level = 0.0
+        self._time = None
+
+    def drain(self, time: SimTime) -> None:
+        """Send the data the network could have sent by a time.
+
+        Args:
+            time: The current simulation time (in nanoseconds), earlier times than
+                already drained to are ignored.
+        """
+        if self._time is not None and time > self._time:
+            sent = (time - self._time) * self.bandwidth / 1e9
+            self._level = max(self._level - sent, 0.0)
+        if self._time is None or time > self._time:
+            self._time = time
+
+    def fill(self, nbytes: int) -> None:
+        """Add a frame to the buffer.
+
+        Args:
+            nbytes: Size of the frame in bytes.
+        """
+        self._level += nbytes
+
+    @property
+    def full(self) -> bool:
+        """Whether the buffer is full and frames should wait until it drains."""
+        return self._level >= self.size
+
+    @property
+    def drain_time(self) -> SimTime:
+        """Time (in nanoseconds) until the buffer is no longer full, 0 if it is not."""
+        if not self.full:
+            return SimTime(0)
+        return SimTime(int((self._level - self.size) * 1e9 / self.bandwidth) + 1)
+
+    @property
+    def free(self) -> float:
+        """The fraction of the buffer that is free, between 0 and 1."""
+        return max(1.0 - self._level / self.size, 0.0)
+
+    @property
+    def pending(self) -> bool:
+        """Whether there is data in the buffer waiting to be sent."""
+        return self._level > 0
@@ -1,19 +1,29 @@
 import asyncio
 import logging
-from queue import Queue
 from typing import Optional
 
 from tickit.core.device import Device, DeviceUpdate
 from tickit.core.typedefs import SimTime
 from typing_extensions import TypedDict
 
-from tickit_devices.eiger.data.dummy_image import Image
+from tickit_devices.eiger.data.dummy_image import (
+    DUMMY_IMAGE_SHAPE,
+    Image,
+    dummy_image_roi_blob,
+)
+from tickit_devices.eiger.data.frame_pool import FrameSource
+from tickit_devices.eiger.dcu_buffer import DCU_BUFFER_SIZE, DCUBuffer
 from tickit_devices.eiger.eiger_settings import EigerSettings
+from tickit_devices.eiger.filewriter.eiger_filewriter import EigerFileWriter
 from tickit_devices.eiger.filewriter.filewriter_config import FileWriterConfig
 from tickit_devices.eiger.filewriter.filewriter_status import FileWriterStatus
+from tickit_devices.eiger.frame_trace import FrameTrace
+from tickit_devices.eiger.metrics import EigerMetrics
+from tickit_devices.eiger.monitor.eiger_monitor import EigerMonitor
 from tickit_devices.eiger.monitor.monitor_config import MonitorConfig
 from tickit_devices.eiger.monitor.monitor_status import MonitorStatus
 from tickit_devices.eiger.stream.eiger_stream import EigerStream
+from tickit_devices.eiger.trigger_schedule import TriggerSchedule
 
 from .eiger_status import EigerStatus, State
 
@@ -32,14 +42,51 @@ class EigerDevice(Device):
     READY -> ACQUIRING
     ACQUIRING -> READY
     ACQUIRING -> IDLE
+
+    A series is ntrigger triggers of nimages frames. Depending on trigger_mode a
+    trigger is:
+
+    ints: A trigger command, starting nimages frames every frame_time.
+    exts: A rising edge of the trigger input, starting nimages frames every
+        frame_time.
+    inte: A trigger command, taking one frame exposed for the value given with the
+        command, or count_time. The series is ntrigger x nimages such triggers.
+    exte: A pulse of the trigger input, taking one frame exposed for as long as the
+        input is high. The series is ntrigger x nimages such pulses.
+
+    The deadlines of the frames of a trigger are computed from when it starts, so
+    each update acquires the frames that are due. If a batch period is given, each
+    update also acquires the frames due within the batch period, so fast series
+    need far fewer updates. A trigger input which is already high when the detector
+    is armed counts as a rising edge.
+
+    Frames are copies of a sample image from a real detector, unless a frame pool is
+    given to supply synthetic frames matching the detector configuration or frames
+    mapped from disk. With a roi_mode the frames are the centre of the sample or of
+    the synthetic images of the whole sensor.
+
+    If a filewriter is given, each series is also written to HDF5 files as
+    configured through the filewriter API.
+
+    If a network bandwidth is given, acquired frames fill the DCU buffer which drains
+    at that bandwidth, and acquisition waits while it is full. dcu_buffer_free
+    reports the fuller of the DCU and stream buffers.
+
+    If a trace is given, the stages of each frame acquired are recorded in it. If
+    metrics are given, the frames and series are counted in them.
+
+    If the stream replays a capture, frames are acquired at the cadence of the
+    captured images rather than the frame time.
     """
 
     settings: EigerSettings
     status: EigerStatus
     stream: EigerStream
+    trace: Optional[FrameTrace]
+    metrics: Optional[EigerMetrics]
 
     _num_frames_left: int
-    _data_queue: Queue
+    _schedule: Optional[TriggerSchedule]
 
     class Inputs(TypedDict, total=False):
         trigger: bool
@@ -52,6 +99,13 @@ class EigerDevice(Device):
         settings: Optional[EigerSettings] = None,
         status: Optional[EigerStatus] = None,
         stream: Optional[EigerStream] = None,
+        batch_period: SimTime = SimTime(0),
+        frame_pool: Optional[FrameSource] = None,
+        filewriter: Optional[EigerFileWriter] = None,
+        network_bandwidth: Optional[float] = None,
+        dcu_buffer_size: int = DCU_BUFFER_SIZE,
+        trace: Optional[FrameTrace] = None,
+        metrics: Optional[EigerMetrics] = None,
     ) -> None:
         """Construct a new eiger.
 
@@ -59,30 +113,63 @@ class EigerDevice(Device):
             settings: Eiger settings. Defaults to None.
             status: Starting status. Defaults to None.
             stream: Data stream handler. Defaults to None.
+            batch_period: Simulation time (in nanoseconds) covered by a single
+                update while acquiring. Defaults to 0, one frame per update.
+            frame_pool: Source of synthetic or pre-recorded frames. Defaults to None,
+                the sample image is used.
+            filewriter: Writer of HDF5 files. Defaults to None, no files are
+                written.
+            network_bandwidth: Rate in bytes per second that the DCU buffer drains
+                at. Defaults to None, frames are not held in the DCU buffer.
+            dcu_buffer_size: Capacity of the DCU buffer in bytes. Defaults to
+                DCU_BUFFER_SIZE.
+            trace: Trace to record the stages of each frame in. Defaults to None,
+                frames are not traced.
+            metrics: Metrics to count the frames and series in. Defaults to None,
+                nothing is counted.
         """
         self.settings = settings or EigerSettings()
         self.status = status or EigerStatus()
 
         self.stream = stream or EigerStream(callback_period=SimTime(int(1e9)))
 
-        self.filewriter_status: FileWriterStatus = FileWriterStatus()
-        self.filewriter_config: FileWriterConfig = FileWriterConfig()
+        self.filewriter = filewriter
+        self.filewriter_status: FileWriterStatus = (
+            filewriter.status if filewriter else FileWriterStatus()
+        )
+        self.filewriter_config: FileWriterConfig = (
+            filewriter.config if filewriter else FileWriterConfig()
+        )
         self.filewriter_callback_period = SimTime(int(1e9))
 
-        self.monitor_status: MonitorStatus = MonitorStatus()
-        self.monitor_config: MonitorConfig = MonitorConfig()
+        self.monitor = EigerMonitor()
+        self.monitor_status: MonitorStatus = self.monitor.status
+        self.monitor_config: MonitorConfig = self.monitor.config
         self.monitor_callback_period = SimTime(int(1e9))
 
         self._num_frames_left: int = 0
         self._total_frames: int = 0
-        self._data_queue: Queue = Queue()
         self._series_id: int = 0
+        self._acquisition_start: Optional[SimTime] = None
+        self._schedule = None
+        self._exposure_start: Optional[SimTime] = None
+        self._trigger_input: bool = False
+        self.batch_period = batch_period
+        self.frame_pool = frame_pool
+        self.dcu_buffer = (
+            DCUBuffer(network_bandwidth, dcu_buffer_size)
+            if network_bandwidth is not None
+            else None
+        )
+
+        self.trace = trace
+        self.metrics = metrics
 
         self._finished_aquisition: Optional[asyncio.Event] = None
 
     @property
     def finished_aquisition(self) -> asyncio.Event:
-        """Event that is set when an acqusition series is complete.
+        """Event that is set when the acquisition for a trigger is complete.
 
         Property ensures the event is created.
         """
@@ -91,6 +178,11 @@ class EigerDevice(Device):
 
         return self._finished_aquisition
 
+    @property
+    def series_id(self) -> int:
+        """The ID of the latest acquisition series, given when armed."""
+        return self._series_id
+
     async def initialize(self) -> None:
         """Initialize the detector.
 
@@ -104,8 +196,32 @@ class EigerDevice(Device):
         Required for triggering.
         """
         self._series_id += 1
+        if self.metrics is not None:
+            self.metrics.series += 1
+        shape = (
+            self.settings.x_pixels_in_detector,
+            self.settings.y_pixels_in_detector,
+        )
+        if self.frame_pool is not None:
+            self.frame_pool.prepare(
+                shape,
+                f"uint{self.settings.bit_depth_image}",
+                self.settings.compression,
+                self.settings.sensor_shape,
+            )
+        elif self._roi_enabled:
+            # Crop the sample now rather than while acquiring the first frame
+            dummy_image_roi_blob(shape)
         self.stream.begin_series(self.settings, self._series_id)
-        self._num_frames_left = self.settings.nimages
+        self.monitor.begin_series()
+        if self.filewriter is not None:
+            self.filewriter.begin_series(self.settings, self._series_id)
+        self._total_frames = self.settings.nimages * self.settings.ntrigger
+        self._num_frames_left = self._total_frames
+        self._acquisition_start = None
+        self._trigger_input = False
+        self._end_trigger_schedule()
+        self._update_progress()
         self._set_state(State.READY)
 
     async def disarm(self) -> None:
@@ -114,22 +230,38 @@ class EigerDevice(Device):
         Intended for use when armed. See state diagram in class docstring.
         """
         self._set_state(State.IDLE)
-        self.stream.end_series(self._series_id)
+        self._end_series()
 
-    async def trigger(self) -> None:
+    async def trigger(self, count_time: Optional[float] = None) -> None:
         """Trigger the detector.
 
-        If the detector is in INTS mode, it will begin acquiring frames the
-        next time update() is called. If it is in EXTS mode, this call will
+        If the detector is in INTS mode, it will begin acquiring nimages frames
+        the next time update() is called. In INTE mode it will acquire a single
+        frame exposed for count_time. If it is in EXTS or EXTE mode, this call will
         be ignored and acquisition will start based on the parameter to
         update().
-        INTE and EXTE mode are currently not supported.
+
+        Args:
+            count_time: Exposure time in seconds of the frame taken in INTE mode.
+                Defaults to None, the configured count_time.
         """
         LOGGER.info("Trigger requested")
         trigger_mode = self.settings.trigger_mode
 
         if self._is_in_state(State.READY) and trigger_mode == "ints":
-            self._begin_acqusition_mode()
+            self._begin_trigger_schedule(self._frame_schedule())
+        elif self._is_in_state(State.READY) and trigger_mode == "inte":
+            exposure = self.settings.count_time if count_time is None else count_time
+            # The frame is read out after its exposure, as limited for any frame
+            period = max(
+                exposure + self.settings.detector_readout_time,
+                self.settings.min_frame_time,
+            )
+            self._begin_trigger_schedule(
+                TriggerSchedule(
+                    frames=1, period=int(period * 1e9), exposure=exposure * 1e9
+                )
+            )
         else:
             LOGGER.info(
                 f"Ignoring trigger, state={self.get_state()},"
@@ -143,7 +275,8 @@ class EigerDevice(Device):
         it will then return to a READY state as though it has just been armed.
         """
         self._set_state(State.READY)
-        self.stream.end_series(self._series_id)
+        self._end_trigger_schedule()
+        self._end_series()
 
     async def abort(self) -> None:
         """Abort acquisition.
@@ -151,7 +284,8 @@ class EigerDevice(Device):
         The detector will immediately stop acquiring frames and disarm itself.
         """
         self._set_state(State.IDLE)
-        self.stream.end_series(self._series_id)
+        self._end_trigger_schedule()
+        self._end_series()
 
     def update(self, time: SimTime, inputs: Inputs) -> DeviceUpdate[Outputs]:
         """Update the detector.
@@ -163,23 +297,42 @@ class EigerDevice(Device):
             time: The current simulation time (in nanoseconds).
             inputs: A mapping of device inputs and their values.
         """
-        if self._is_in_state(State.ACQUIRE):
-            if self._num_frames_left > 0:
-                self._acquire_frame()
+        if self.trace is not None:
+            self.trace.begin_update()
+        if self.dcu_buffer is not None:
+            self.dcu_buffer.drain(time)
+
+        trigger = bool(inputs.get("trigger", self._trigger_input))
+        rising, falling = trigger > self._trigger_input, trigger < self._trigger_input
+        self._trigger_input = trigger
+
+        if self._is_in_state(State.READY) and rising:
+            trigger_mode = self.settings.trigger_mode
+            if trigger_mode == "exts":
+                self._begin_trigger_schedule(self._frame_schedule())
+                # Should have another update immediately to begin acquisition
+                return DeviceUpdate(self.Outputs(), SimTime(time))
+            elif trigger_mode == "exte":
+                self._begin_acqusition_mode()
+                self._exposure_start = time
 
-                return DeviceUpdate(
-                    self.Outputs(), SimTime(time + int(self.settings.frame_time * 1e9))
-                )
+        if self._is_in_state(State.ACQUIRE):
+            if self._schedule is not None and not self._schedule.complete:
+                return DeviceUpdate(self.Outputs(), self._acquire_scheduled(time))
+            elif self._exposure_start is not None:
+                if falling:
+                    self._acquire_exposure(time)
             else:
-                self.finished_aquisition.set()
-
-                LOGGER.debug("Ending Series...")
-                self._set_state(State.IDLE)
-                self.stream.end_series(self._series_id)
-        if inputs.get("trigger", False):
-            self._begin_acqusition_mode()
-            # Should have another update immediately to begin acquisition
-            return DeviceUpdate(self.Outputs(), SimTime(time))
+                self._end_trigger()
+
+        self._update_buffer_free()
+        if self.stream.pending or (
+            self.dcu_buffer is not None and self.dcu_buffer.pending
+        ):
+            # Call back until the data left in the buffers has been sent
+            return DeviceUpdate(
+                self.Outputs(), SimTime(time + self.stream.callback_period)
+            )
 
         return DeviceUpdate(self.Outputs(), None)
 
@@ -188,18 +341,137 @@ class EigerDevice(Device):
         LOGGER.info("Now in acquiring mode")
         self.finished_aquisition.clear()
 
-    def _acquire_frame(self) -> None:
-        frame_id = self.settings.nimages - self._num_frames_left
-        LOGGER.debug(f"Frame id {frame_id}")
-
-        shape = (
-            self.settings.x_pixels_in_detector,
-            self.settings.y_pixels_in_detector,
+    def _frame_schedule(self) -> TriggerSchedule:
+        frames = min(self.settings.nimages, self._num_frames_left)
+        exposure = self.settings.count_time * 1e9
+        if self.stream.replay is not None:
+            return self.stream.replay.schedule(frames, exposure)
+        return TriggerSchedule(
+            frames=frames,
+            period=int(self.settings.frame_time * 1e9),
+            exposure=exposure,
         )
-        image = Image.create_dummy_image(frame_id, shape)
-        self.stream.insert_image(image, self._series_id)
+
+    def _begin_trigger_schedule(self, schedule: TriggerSchedule) -> None:
+        self._schedule = schedule
+        self._begin_acqusition_mode()
+
+    def _end_trigger_schedule(self) -> None:
+        self._schedule = None
+        self._exposure_start = None
+
+    def _acquire_scheduled(self, time: SimTime) -> SimTime:
+        schedule = self._schedule
+        assert schedule is not None
+        schedule.start(time)
+        if self._acquisition_start is None:
+            self._acquisition_start = time
+
+        acquired = 0
+        for _ in range(schedule.due(time, self.batch_period)):
+            deadline = schedule.next_deadline()
+            if self.dcu_buffer is not None:
+                self.dcu_buffer.drain(deadline)
+            if self._buffer_full():
+                LOGGER.debug("Buffer full, waiting to acquire frame")
+                schedule.delay(time, self._buffer_wait())
+                break
+            self._acquire_frame(deadline, schedule.exposure)
+            schedule.acquired += 1
+            acquired += 1
+        LOGGER.debug(f"Acquired {acquired} frames, {self._num_frames_left} left")
+
+        self._update_buffer_free()
+        self._update_progress()
+        # Once the last frame is acquired, the trigger ends when it is read out
+        return schedule.next_deadline()
+
+    def _acquire_exposure(self, time: SimTime) -> None:
+        assert self._exposure_start is not None
+        if self._acquisition_start is None:
+            self._acquisition_start = self._exposure_start
+        self._acquire_frame(self._exposure_start, float(time - self._exposure_start))
+        self._update_progress()
+        self._end_trigger()
+
+    def _end_trigger(self) -> None:
+        self._end_trigger_schedule()
+        if self._num_frames_left > 0:
+            LOGGER.debug("Waiting for next trigger...")
+            self._set_state(State.READY)
+            self.finished_aquisition.set()
+        else:
+            LOGGER.debug("Ending Series...")
+            self._set_state(State.IDLE)
+            self._end_series()
+
+    def _acquire_frame(self, start: SimTime, exposure: float) -> None:
+        assert self._acquisition_start is not None
+        frame_id = self._total_frames - self._num_frames_left
+        if self.trace is not None:
+            self.trace.begin_frame(self._series_id, frame_id)
+
+        if self.frame_pool is not None:
+            image = self.frame_pool.image(frame_id)
+        else:
+            shape = (
+                self.settings.x_pixels_in_detector,
+                self.settings.y_pixels_in_detector,
+            )
+            if self._roi_enabled:
+                image = Image.create_roi_image(frame_id, shape)
+            else:
+                image = Image.create_dummy_image(frame_id, shape)
+        if self.trace is not None:
+            self.trace.frame_taken()
+        image.real_time = exposure
+        image.start_time = float(start - self._acquisition_start)
+        image.stop_time = image.start_time + exposure
+        nbytes = self.stream.insert_image(image, self._series_id)
+        if self.dcu_buffer is not None:
+            self.dcu_buffer.fill(nbytes)
+        self.monitor.insert_image(image, self._series_id)
+        if self.metrics is not None:
+            self.metrics.frames_acquired += 1
+        if self.filewriter is not None:
+            self.filewriter.write_image(image)
         self._num_frames_left -= 1
-        LOGGER.debug(f"Frames left: {self._num_frames_left}")
+
+    @property
+    def _roi_enabled(self) -> bool:
+        # Only a region smaller than the sample can be cut from it
+        x, y = self.settings.x_pixels_in_detector, self.settings.y_pixels_in_detector
+        sample_x, sample_y = DUMMY_IMAGE_SHAPE
+        return self.settings.roi_mode != "disabled" and x <= sample_x and y <= sample_y
+
+    def _buffer_full(self) -> bool:
+        return self.stream.blocked or (
+            self.dcu_buffer is not None and self.dcu_buffer.full
+        )
+
+    def _buffer_wait(self) -> SimTime:
+        # A blocked stream is only checked again at the next callback
+        wait = self.stream.callback_period if self.stream.blocked else SimTime(0)
+        if self.dcu_buffer is not None:
+            wait = max(wait, self.dcu_buffer.drain_time)
+        return wait
+
+    def _update_buffer_free(self) -> None:
+        free = self.stream.buffer_free
+        if self.dcu_buffer is not None:
+            free = min(free, self.dcu_buffer.free)
+        self.status.dcu_buffer_free = free
+
+    def _update_progress(self) -> None:
+        self.status.frames_acquired = self._total_frames - self._num_frames_left
+        self.status.frames_remaining = self._num_frames_left
+        self.status.time_remaining = self._num_frames_left * self.settings.frame_time
+
+    def _end_series(self) -> None:
+        self.finished_aquisition.set()
+        self.stream.end_series(self._series_id)
+        if self.filewriter is not None:
+            self.filewriter.end_series()
 
     def get_state(self) -> State:
         """Get the eiger's current state
@@ -1,14 +1,30 @@
+import json
 import logging
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
 from aiohttp import web
 from apischema import serialize
 from tickit.adapters.http import HttpAdapter
 from tickit.adapters.specifications import HttpEndpoint
-from tickit.adapters.zmq import ZeroMqPushAdapter
-
+from tickit.adapters.zmq import (
+    ZeroMqMessage,
+    ZeroMqPushAdapter,
+    _SerializableMessagePart,
+)
+
+from tickit_devices.eiger.data.dummy_image import Image
+from tickit_devices.eiger.data.tiff import read_tiff, write_tiff
 from tickit_devices.eiger.eiger import EigerDevice
-from tickit_devices.eiger.eiger_schema import SequenceComplete, Value, construct_value
+from tickit_devices.eiger.eiger_schema import (
+    Parameters,
+    SequenceComplete,
+    Value,
+    construct_value,
+)
 from tickit_devices.eiger.eiger_status import State
+from tickit_devices.eiger.metrics import CONTENT_TYPE, LatencyHistogram
 
 API_VERSION = "1.8.0"
 DETECTOR_API = f"detector/api/{API_VERSION}"
@@ -16,16 +32,96 @@ STREAM_API = f"stream/api/{API_VERSION}"
 MONITOR_API = "monitor/api/1.8.0"
 FILEWRITER_API = "filewriter/api/1.8.0"
 
+TIFF = "application/tiff"
+
 LOGGER = logging.getLogger("EigerAdapter")
 
 
 class EigerRESTAdapter(HttpAdapter):
-    """An Eiger adapter which parses the commands sent to the HTTP server."""
+    """An Eiger adapter which parses the commands sent to the HTTP server.
+
+    Detector config responses are encoded once and cached until the parameter is
+    next set, directly or as a dependency of another parameter.
+
+    The flatfield and pixel_mask are sent as typed arrays, or as TIFF images when
+    requested with an Accept header of application/tiff. They can be set from
+    either form.
+
+    By default the trigger command responds once the series is acquired, as the
+    real detector does. With async_trigger it responds as soon as acquisition
+    starts with the ID of the series acquiring as its sequence id, and progress
+    can be followed through the frames_acquired, frames_remaining and
+    time_remaining status parameters.
+
+    If the detector traces its frames, the timings of each stage are given by the
+    status/trace parameters and the trace itself can be fetched in the Chrome trace
+    format. If it keeps metrics, they can be scraped from /metrics in the Prometheus
+    text format, including the latency of requests to each endpoint.
+    """
 
     device: EigerDevice
+    async_trigger: bool
 
-    def __init__(self, device: EigerDevice) -> None:
+    _config_responses: Dict[str, bytes]
+
+    def __init__(self, device: EigerDevice, async_trigger: bool = False) -> None:
+        """An EigerRESTAdapter constructor.
+
+        Args:
+            device: The Eiger to control.
+            async_trigger: Whether the trigger command responds without waiting for
+                the series to be acquired. Defaults to False.
+        """
         self.device = device
+        self.async_trigger = async_trigger
+        self._config_responses = {}
+        self.device.settings.observe(self._invalidate_config_response)
+
+    def get_endpoints(self) -> Iterable[Tuple[HttpEndpoint, Callable]]:
+        """Get the endpoints, timing each request if the detector keeps metrics.
+
+        Returns:
+            Iterable[Tuple[HttpEndpoint, Callable]]: The endpoints and their handlers.
+        """
+        metrics = self.device.metrics
+        for endpoint, func in super().get_endpoints():
+            if metrics is not None:
+                histogram = metrics.request_latency(endpoint.method, endpoint.path)
+                func = _timed(func, histogram)
+            yield endpoint, func
+
+    @HttpEndpoint.get(f"/{DETECTOR_API}" + "/config")
+    async def get_all_config(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for requesting every configuration variable of the Eiger.
+
+        Args:
+            request (web.Request): The request object that takes the request method.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request.
+        """
+        return web.json_response(serialize(self.device.settings.parameters()))
+
+    @HttpEndpoint.put(f"/{DETECTOR_API}" + "/config")
+    async def put_all_config(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for setting many configuration variables for the Eiger.
+
+        The variables are set in the order given, each resolving its dependencies
+        as when set alone. If any variable is unknown or cannot be set, none are.
+
+        Args:
+            request (web.Request): The request object that takes a mapping of
+            parameters to values.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request, listing every variable changed including dependencies.
+        """
+        if self.device.get_state() is not State.IDLE:
+            LOGGER.warning("Eiger not initialized or is currently running.")
+            return web.json_response(serialize([]))
+        return await _put_parameters(self.device.settings, request)
 
     @HttpEndpoint.get(f"/{DETECTOR_API}" + "/config/{parameter_name}")
     async def get_config(self, request: web.Request) -> web.Response:
@@ -40,13 +136,21 @@ class EigerRESTAdapter(HttpAdapter):
         """
         param = request.match_info["parameter_name"]
 
-        if hasattr(self.device.settings, param):
-            data = construct_value(self.device.settings, param)
+        value = getattr(self.device.settings, param, None)
+        if isinstance(value, np.ndarray) and TIFF in request.headers.get("Accept", ""):
+            return web.Response(body=write_tiff(value), content_type=TIFF)
 
-        else:
-            data = serialize(Value("None", "string", access_mode="None"))
+        body = self._config_responses.get(param)
+        if body is None:
+            if param in self.device.settings:
+                data = construct_value(self.device.settings, param)
+                body = json.dumps(data).encode("utf_8")
+                self._config_responses[param] = body
+            else:
+                data = serialize(Value("None", "string", access_mode="None"))
+                body = json.dumps(data).encode("utf_8")
 
-        return web.json_response(data)
+        return web.Response(body=body, content_type="application/json")
 
     @HttpEndpoint.put(f"/{DETECTOR_API}" + "/config/{parameter_name}")
     async def put_config(self, request: web.Request) -> web.Response:
@@ -62,20 +166,27 @@ class EigerRESTAdapter(HttpAdapter):
         """
         param = request.match_info["parameter_name"]
 
-        response = await request.json()
+        if request.content_type == TIFF:
+            try:
+                response = {"value": read_tiff(await request.read())}
+            except ValueError as e:
+                return web.json_response({"error": str(e)}, status=400)
+        else:
+            response = await request.json()
 
         if self.device.get_state() is not State.IDLE:
             LOGGER.warning("Eiger not initialized or is currently running.")
             return web.json_response(serialize([]))
-        elif (
-            hasattr(self.device.settings, param)
-            and self.device.get_state() is State.IDLE
-        ):
+        elif param in self.device.settings and self.device.get_state() is State.IDLE:
             attr = response["value"]
 
             LOGGER.debug(f"Changing to {str(attr)} for {str(param)}")
 
-            self.device.settings[param] = attr
+            try:
+                self.device.settings[param] = attr
+            except ValueError as e:
+                LOGGER.warning(f"Failed to set {param}: {e}")
+                return web.json_response({"error": str(e)}, status=400)
 
             LOGGER.debug("Set " + str(param) + " to " + str(attr))
             return web.json_response(serialize([param]))
@@ -83,6 +194,9 @@ class EigerRESTAdapter(HttpAdapter):
             LOGGER.debug("Eiger has no config variable: " + str(param))
             return web.json_response(serialize([]))
 
+    def _invalidate_config_response(self, param: str) -> None:
+        self._config_responses.pop(param, None)
+
     @HttpEndpoint.get(f"/{DETECTOR_API}" + "/status/{status_param}")
     async def get_status(self, request: web.Request) -> web.Response:
         """A HTTP Endpoint for requesting the status of the Eiger.
@@ -96,7 +210,7 @@ class EigerRESTAdapter(HttpAdapter):
         """
         param = request.match_info["status_param"]
 
-        if hasattr(self.device.status, param):
+        if param in self.device.status:
             data = construct_value(self.device.status, param)
 
         else:
@@ -130,6 +244,67 @@ class EigerRESTAdapter(HttpAdapter):
         """
         return await self.get_status(request)
 
+    @HttpEndpoint.get(f"/{DETECTOR_API}" + "/status/trace/{status_param}")
+    async def get_trace_status(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for requesting the timings of the frames traced.
+
+        Args:
+            request (web.Request): The request object that takes the request method.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request.
+        """
+        param = request.match_info["status_param"]
+
+        trace = self.device.trace
+        if trace is not None and hasattr(trace.status, param):
+            data = construct_value(trace.summarize(), param)
+        else:
+            data = serialize(Value("None", "string", access_mode="None"))
+
+        return web.json_response(data)
+
+    @HttpEndpoint.get(f"/{DETECTOR_API}" + "/trace")
+    async def get_trace(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for requesting the frames traced as a Chrome trace.
+
+        Args:
+            request (web.Request): The request object that takes the request method.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request.
+        """
+        if self.device.trace is None:
+            return web.Response(status=404, text="Tracing is not enabled")
+        return web.json_response(self.device.trace.chrome_trace())
+
+    @HttpEndpoint.get("/metrics")
+    async def get_metrics(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for scraping the metrics of the Eiger.
+
+        Args:
+            request (web.Request): The request object that takes the request method.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request.
+        """
+        metrics = self.device.metrics
+        if metrics is None:
+            return web.Response(status=404, text="Metrics are not enabled")
+        stream = self.device.stream
+        text = metrics.render(
+            {
+                "eiger_stream_dropped_images_total": stream.status.dropped,
+                "eiger_stream_buffered_images": stream.buffered_images,
+                "eiger_stream_buffer_free_ratio": stream.buffer_free,
+                "eiger_dcu_buffer_free_ratio": self.device.status.dcu_buffer_free,
+            }
+        )
+        return web.Response(text=text, headers={"Content-Type": CONTENT_TYPE})
+
     @HttpEndpoint.put(f"/{DETECTOR_API}" + "/command/initialize", interrupt=True)
     async def initialize_eiger(self, request: web.Request) -> web.Response:
         """A HTTP Endpoint for the 'initialize' command of the Eiger.
@@ -183,16 +358,23 @@ class EigerRESTAdapter(HttpAdapter):
         """A HTTP Endpoint for the 'trigger' command of the Eiger.
 
         Args:
-            request (web.Request): The request object that takes the request method.
+            request (web.Request): The request object that takes the request method,
+                and optionally the exposure time in inte mode as its value.
 
         Returns:
             web.Response: The response object returned given the result of the HTTP
                 request.
         """
         LOGGER.debug("Triggering Eiger")
-        await self.device.trigger()
+        count_time = None
+        if request.can_read_body:
+            count_time = (await request.json()).get("value")
+        await self.device.trigger(count_time)
 
         await self.interrupt()
+        if self.async_trigger:
+            # Identify the series acquiring, to follow it without waiting
+            return web.json_response(serialize(SequenceComplete(self.device.series_id)))
         await self.device.finished_aquisition.wait()
 
         return web.json_response(serialize(SequenceComplete(4)))
@@ -246,6 +428,35 @@ class EigerRESTAdapter(HttpAdapter):
 
         return web.json_response(data)
 
+    @HttpEndpoint.get(f"/{STREAM_API}" + "/config")
+    async def get_all_stream_config(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for requesting every config value from the Stream.
+
+        Args:
+            request (web.Request): The request object that takes the request method.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request.
+        """
+        return web.json_response(serialize(self.device.stream.config.parameters()))
+
+    @HttpEndpoint.put(f"/{STREAM_API}" + "/config")
+    async def put_all_stream_config(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for setting many config values for the Stream.
+
+        If any value is unknown or cannot be set, none are.
+
+        Args:
+            request (web.Request): The request object that takes a mapping of
+            parameters to values.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request, listing every value changed.
+        """
+        return await _put_parameters(self.device.stream.config, request)
+
     @HttpEndpoint.get(f"/{STREAM_API}" + "/config/{param}")
     async def get_stream_config(self, request: web.Request) -> web.Response:
         """A HTTP Endpoint for requesting config values from the Stream.
@@ -279,12 +490,16 @@ class EigerRESTAdapter(HttpAdapter):
 
         response = await request.json()
 
-        if hasattr(self.device.stream.config, param):
+        if param in self.device.stream.config:
             attr = response["value"]
 
             LOGGER.debug(f"Changing to {attr} for {param}")
 
-            self.device.stream.config[param] = attr
+            try:
+                self.device.stream.config[param] = attr
+            except ValueError as e:
+                LOGGER.warning(f"Failed to set {param}: {e}")
+                return web.json_response({"error": str(e)}, status=400)
 
             LOGGER.debug("Set " + str(param) + " to " + str(attr))
             return web.json_response(serialize([param]))
@@ -292,6 +507,35 @@ class EigerRESTAdapter(HttpAdapter):
             LOGGER.debug("Eiger has no config variable: " + str(param))
             return web.json_response(serialize([]))
 
+    @HttpEndpoint.get(f"/{MONITOR_API}" + "/config")
+    async def get_all_monitor_config(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for requesting every config value from the Monitor.
+
+        Args:
+            request (web.Request): The request object that takes the request method.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request.
+        """
+        return web.json_response(serialize(self.device.monitor_config.parameters()))
+
+    @HttpEndpoint.put(f"/{MONITOR_API}" + "/config")
+    async def put_all_monitor_config(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for setting many config values for the Monitor.
+
+        If any value is unknown or cannot be set, none are.
+
+        Args:
+            request (web.Request): The request object that takes a mapping of
+            parameters to values.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request, listing every value changed.
+        """
+        return await _put_parameters(self.device.monitor_config, request)
+
     @HttpEndpoint.get(f"/{MONITOR_API}" + "/config/{param}")
     async def get_monitor_config(self, request: web.Request) -> web.Response:
         """A HTTP Endpoint for requesting config values from the Monitor.
@@ -325,12 +569,16 @@ class EigerRESTAdapter(HttpAdapter):
 
         response = await request.json()
 
-        if hasattr(self.device.monitor_config, param):
+        if param in self.device.monitor_config:
             attr = response["value"]
 
             LOGGER.debug(f"Changing to {attr} for {param}")
 
-            self.device.monitor_config[param] = attr
+            try:
+                self.device.monitor_config[param] = attr
+            except ValueError as e:
+                LOGGER.warning(f"Failed to set {param}: {e}")
+                return web.json_response({"error": str(e)}, status=400)
 
             LOGGER.debug("Set " + str(param) + " to " + str(attr))
             return web.json_response(serialize([param]))
@@ -355,6 +603,74 @@ class EigerRESTAdapter(HttpAdapter):
 
         return web.json_response(data)
 
+    @HttpEndpoint.get(f"/{MONITOR_API}" + "/images")
+    async def get_monitor_images(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for listing the images held by the Monitor.
+
+        Args:
+            request (web.Request): The request object that takes the request method.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request.
+        """
+        return web.json_response(serialize(self.device.monitor.image_ids()))
+
+    @HttpEndpoint.get(f"/{MONITOR_API}" + "/images/next")
+    async def get_monitor_next_image(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for taking the oldest image from the Monitor.
+
+        Args:
+            request (web.Request): The request object that takes the request method.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request.
+        """
+        return _monitor_image_response(self.device.monitor.next_image())
+
+    @HttpEndpoint.get(f"/{MONITOR_API}" + "/images/monitor")
+    async def get_monitor_latest_image(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for requesting the most recent image from the Monitor.
+
+        Args:
+            request (web.Request): The request object that takes the request method.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request.
+        """
+        return _monitor_image_response(self.device.monitor.latest_image())
+
+    @HttpEndpoint.get(f"/{FILEWRITER_API}" + "/config")
+    async def get_all_filewriter_config(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for requesting every config value from the Filewriter.
+
+        Args:
+            request (web.Request): The request object that takes the request method.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request.
+        """
+        return web.json_response(serialize(self.device.filewriter_config.parameters()))
+
+    @HttpEndpoint.put(f"/{FILEWRITER_API}" + "/config")
+    async def put_all_filewriter_config(self, request: web.Request) -> web.Response:
+        """A HTTP Endpoint for setting many config values for the Filewriter.
+
+        If any value is unknown or cannot be set, none are.
+
+        Args:
+            request (web.Request): The request object that takes a mapping of
+            parameters to values.
+
+        Returns:
+            web.Response: The response object returned given the result of the HTTP
+                request, listing every value changed.
+        """
+        return await _put_parameters(self.device.filewriter_config, request)
+
     @HttpEndpoint.get(f"/{FILEWRITER_API}" + "/config/{param}")
     async def get_filewriter_config(self, request: web.Request) -> web.Response:
         """A HTTP Endpoint for requesting config values from the Filewriter.
@@ -388,7 +704,7 @@ class EigerRESTAdapter(HttpAdapter):
 
         response = await request.json()
 
-        if hasattr(self.device.filewriter_config, param):
+        if param in self.device.filewriter_config:
             attr = response["value"]
 
             LOGGER.debug(f"Changing to {attr} for {param}")
@@ -419,16 +735,189 @@ class EigerRESTAdapter(HttpAdapter):
         return web.json_response(data)
 
 
+async def _put_parameters(config: Parameters, request: web.Request) -> web.Response:
+    # Set every parameter in the request or, if any fails, restore the previous
+    # values and set none
+    values = await request.json()
+    if not isinstance(values, dict):
+        LOGGER.debug(f"Config must be an object of parameters, not {values!r}")
+        return web.json_response(
+            {"error": "Body must be an object of parameter values"}, status=400
+        )
+    before = config.parameters()
+    unknown = [param for param in values if param not in before]
+    if unknown:
+        LOGGER.debug(f"No config variables: {unknown}")
+        return web.json_response({"unknown": unknown}, status=400)
+
+    try:
+        for param, value in values.items():
+            config[param] = value
+    except Exception as e:
+        LOGGER.warning(f"Failed to set config, restoring previous values: {e}")
+        for param, value in before.items():
+            setattr(config, param, value)
+        return web.json_response({"error": str(e)}, status=400)
+
+    after = config.parameters()
+    changed = [param for param in after if _changed(before[param], after[param])]
+    LOGGER.debug(f"Set {changed}")
+    return web.json_response(
+        serialize(list(values) + [param for param in changed if param not in values])
+    )
+
+
+def _timed(
+    func: Callable[[web.Request], Awaitable[web.Response]],
+    histogram: LatencyHistogram,
+) -> Callable[[web.Request], Awaitable[web.Response]]:
+    async def timed(request: web.Request) -> web.Response:
+        start = perf_counter()
+        try:
+            return await func(request)
+        finally:
+            histogram.observe(perf_counter() - start)
+
+    return timed
+
+
+def _changed(before: Any, after: Any) -> bool:
+    # Array parameters are replaced rather than modified when they are set
+    if isinstance(before, np.ndarray) or isinstance(after, np.ndarray):
+        return before is not after
+    return before != after
+
+
+def _monitor_image_response(entry: Optional[Tuple[int, Image]]) -> web.Response:
+    # The image is sent as encoded by the detector with its metadata in headers,
+    # the body is the frame itself rather than a copy
+    if entry is None:
+        return web.Response(status=404, text="No image available")
+    series_id, image = entry
+    return web.Response(
+        body=image.data,
+        content_type="application/octet-stream",
+        headers={
+            "X-Series": str(series_id),
+            "X-Frame": str(image.index),
+            "X-Encoding": image.encoding,
+            "X-Dtype": image.dtype,
+            "X-Shape": ",".join(str(length) for length in image.shape),
+        },
+    )
+
+
+class StreamMessage(List[_SerializableMessagePart]):
+    """The parts of the stream messages sent together, with how many are images.
+
+    dropped is set once the images have been counted as dropped, so images dropped
+    for several subscribers are counted only once.
+    """
+
+    images: int
+    dropped: bool
+
+    def __init__(self, parts: Iterable[_SerializableMessagePart], images: int) -> None:
+        """A StreamMessage constructor.
+
+        Args:
+            parts: The message parts.
+            images: The number of images the parts hold.
+        """
+        super().__init__(parts)
+        self.images = images
+        self.dropped = False
+
+
 class EigerZMQAdapter(ZeroMqPushAdapter):
-    """An Eiger adapter which parses the data to send along a ZeroMQStream."""
+    """An Eiger adapter which parses the data to send along a ZeroMQStream.
+
+    Once the previous message has been sent, the io waits for the stream to have
+    data available and sends everything buffered as the next message, so data is
+    sent as soon as the socket can take it rather than only after device updates.
+
+    If the detector traces its frames, a message is recorded as sent once the io
+    asks for the next one.
+    """
 
     device: EigerDevice
 
+    _sending: bool
+
     def __init__(self, device: EigerDevice) -> None:
         super().__init__()
         self.device = device
+        self._sending = False
+
+    async def next_message(self) -> ZeroMqMessage:
+        """Get the next message to send, once the previous one has been sent.
+
+        Returns:
+            ZeroMqMessage: The message.
+        """
+        if self._sending and self.device.trace is not None:
+            self.device.trace.sent()
+        self._sending = False
+        queue = self._ensure_queue()
+        while True:
+            if not queue.empty():
+                message = queue.get_nowait()
+                break
+            stream_message = self._take_stream_data()
+            if stream_message is not None:
+                message = stream_message
+                break
+            await self.device.stream.data_available.wait()
+        self._sending = True
+        return message
+
+    def add_message_to_stream(self, message: ZeroMqMessage) -> None:
+        """Queue a message to send, waking the io if it is waiting for data.
+
+        Args:
+            message: The message.
+        """
+        super().add_message_to_stream(message)
+        self.device.stream.data_available.set()
 
     def after_update(self) -> None:
-        """Updates IOC values immediately following a device update."""
-        if buffered_data := list(self.device.stream.consume_data()):
-            self.add_message_to_stream(buffered_data)
+        """Send the data buffered by the stream immediately following a device update.
+
+        Data is only taken from the stream once the previous message has been handed
+        to the socket, so a slow consumer leaves data in the stream's bounded buffer
+        rather than in an unbounded queue here.
+        """
+        if not self._ensure_queue().empty():
+            return
+        if (stream_message := self._take_stream_data()) is not None:
+            self.add_message_to_stream(stream_message)
+
+    def message_dropped(self, subscriber: int, message: ZeroMqMessage) -> None:
+        """Count the images of a message a subscriber was too slow to take.
+
+        The images are counted once in the dropped stream status, however many
+        subscribers missed them, and for each subscriber in the metrics.
+
+        Args:
+            subscriber: The index of the subscriber the message was dropped for.
+            message: The message which was dropped.
+        """
+        images = message.images if isinstance(message, StreamMessage) else 0
+        LOGGER.debug(f"Dropped {images} image(s) for subscriber {subscriber}")
+        if isinstance(message, StreamMessage) and not message.dropped:
+            message.dropped = True
+            self.device.stream.status.dropped += images
+        if self.device.metrics is not None:
+            self.device.metrics.dropped_messages[subscriber] += 1
+            self.device.metrics.dropped_images[subscriber] += images
+
+    def _take_stream_data(self) -> Optional[StreamMessage]:
+        images = self.device.stream.buffered_images
+        buffered_data = self.device.stream.drain()
+        if not buffered_data:
+            return None
+        if self.device.trace is not None:
+            self.device.trace.consumed(images)
+        if self.device.metrics is not None:
+            self.device.metrics.message_streamed(buffered_data)
+        return StreamMessage(buffered_data, images)
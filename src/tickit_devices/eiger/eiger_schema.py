@@ -1,18 +1,38 @@
 import logging
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from enum import Enum
 from functools import partial
-from typing import Any, Generic, List, Mapping, Optional, TypeVar
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Generic,
+    List,
+    Mapping,
+    Optional,
+    Type,
+    TypeVar,
+)
 
-from apischema import serialized
+import numpy as np
+from apischema import serialized, serializer
+from apischema.conversions import Conversion
 from apischema.fields import with_fields_set
 from apischema.metadata import skip
 from apischema.serialization import serialize
 
+from tickit_devices.eiger.data.darray import encode_darray
+
 T = TypeVar("T")
+P = TypeVar("P", bound="Parameters")
 
 LOGGER = logging.getLogger(__name__)
 
+# Arrays are sent in the typed array form of the API
+serializer(Conversion(encode_darray, source=np.ndarray, target=Dict[str, Any]))
+
 
 def field_config(**kwargs) -> Mapping[str, Any]:
     """Helper function to create a typesafe dictionary.
@@ -29,6 +49,82 @@ def field_config(**kwargs) -> Mapping[str, Any]:
     return dict(**kwargs)
 
 
+class Parameters:
+    """Base for dataclasses whose fields are parameters of the API.
+
+    A parameter is looked up by name as ``obj[name]``, giving its value and field
+    metadata, and ``name in obj`` tells whether it is a parameter rather than some
+    other attribute. The metadata of every field is indexed once by the indexed_fields
+    class decorator, so a lookup does not scan the fields.
+
+    Observers can be registered to be told the name of every attribute set, however
+    it is set, e.g. to invalidate anything derived from the values.
+
+    A parameter whose metadata gives a min is checked against it when set by name,
+    so an impossible value is rejected with a ValueError.
+    """
+
+    _field_metadata: ClassVar[Mapping[str, Mapping[str, Any]]] = MappingProxyType({})
+
+    def __getitem__(self, key: str) -> Any:  # noqa: D105
+        return {"metadata": self._field_metadata[key], "value": self.__dict__[key]}
+
+    def __contains__(self, key: object) -> bool:  # noqa: D105
+        return key in self._field_metadata
+
+    def __setitem__(self, key: str, value: Any) -> None:  # noqa: D105
+        _check_min(key, value, self._field_metadata.get(key, {}))
+        setattr(self, key, value)
+
+    def parameters(self) -> Dict[str, Any]:
+        """Get the value of every parameter.
+
+        Returns:
+            Dict[str, Any]: The parameter values by name, in field order.
+        """
+        return {name: self.__dict__[name] for name in self._field_metadata}
+
+    def __setattr__(self, name: str, value: Any) -> None:  # noqa: D105
+        super().__setattr__(name, value)
+        for observer in self.__dict__.get("_observers", ()):
+            observer(name)
+
+    def observe(self, observer: Callable[[str], None]) -> None:
+        """Register a function to be called with the name of each attribute set.
+
+        Args:
+            observer: The function to call after an attribute is set.
+        """
+        self.__dict__.setdefault("_observers", []).append(observer)
+
+
+def indexed_fields(cls: Type[P]) -> Type[P]:
+    """Class decorator indexing the field metadata of a Parameters dataclass.
+
+    Must be applied above the dataclass decorator.
+
+    Args:
+        cls: The dataclass to index.
+
+    Returns:
+        Type[P]: The same class, with its field metadata indexed by name.
+    """
+    cls._field_metadata = MappingProxyType(
+        {field_.name: field_.metadata for field_ in fields(cls)}  # type: ignore
+    )
+    return cls
+
+
+def _check_min(key: str, value: Any, meta: Mapping[str, Any]) -> None:
+    minimum = meta.get("min")
+    if minimum is None:
+        return
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} must be a number, not {value!r}")
+    if value < minimum:
+        raise ValueError(f"{key} {value} is below its minimum of {minimum}")
+
+
 class AccessMode(Enum):
     """Possible access modes for field metadata."""
 
@@ -86,6 +182,11 @@ rw_float_grid: partial = partial(
     value_type=ValueType.FLOAT_GRID,
     access_mode=AccessMode.READ_WRITE,
 )
+ro_float_grid: partial = partial(
+    field_config,
+    value_type=ValueType.FLOAT_GRID,
+    access_mode=AccessMode.READ_ONLY,
+)
 rw_uint_grid: partial = partial(
     field_config,
     value_type=ValueType.UINT_GRID,
@@ -120,8 +221,9 @@ class Value(Generic[T]):
 
 
 def construct_value(obj, param):  # noqa: D103
-    value = obj[param]["value"]
-    meta = obj[param]["metadata"]
+    parameter = obj[param]
+    value = parameter["value"]
+    meta = parameter["metadata"]
 
     if "allowed_values" in meta:
         data = serialize(
@@ -133,6 +235,16 @@ def construct_value(obj, param):  # noqa: D103
             )
         )
 
+    elif "min" in meta:
+        data = serialize(
+            Value(
+                value,
+                meta["value_type"].value,
+                access_mode=meta["access_mode"].value,
+                min=meta["min"],
+            )
+        )
+
     else:
         data = serialize(
             Value(
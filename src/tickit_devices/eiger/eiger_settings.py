@@ -1,9 +1,14 @@
 import logging
 from dataclasses import dataclass, field, fields
 from enum import Enum
-from typing import Any, List, Mapping
+from typing import Any, Dict, List, Mapping, Tuple
 
+import numpy as np
+
+from .data.darray import decode_darray
 from .eiger_schema import (
+    Parameters,
+    indexed_fields,
     ro_float,
     ro_str,
     rw_bool,
@@ -20,6 +25,32 @@ LOGGER = logging.getLogger(__name__)
 FRAME_WIDTH: int = 4148
 FRAME_HEIGHT: int = 4362
 
+#: Maximum frame rate in Hz of the whole detector reading out 16 bit pixels
+FULL_FRAME_RATE: float = 133.0
+
+#: Size of the central region of the detector read out in the "4M" roi_mode
+ROI_4M_WIDTH: int = 2068
+ROI_4M_HEIGHT: int = 2162
+#: Maximum frame rate in Hz of the "4M" region reading out 16 bit pixels
+ROI_4M_FRAME_RATE: float = 750.0
+
+#: The shape as (x pixels, y pixels) of the region read out in each roi_mode, with
+#: its maximum frame rate in Hz at 16 bit readout
+ROI_MODES: Dict[str, Tuple[Tuple[int, int], float]] = {
+    "disabled": ((FRAME_WIDTH, FRAME_HEIGHT), FULL_FRAME_RATE),
+    "4M": ((ROI_4M_WIDTH, ROI_4M_HEIGHT), ROI_4M_FRAME_RATE),
+}
+
+#: Data type each array parameter is stored as
+ARRAY_TYPES = {"flatfield": "float32", "pixel_mask": "uint32"}
+
+_READOUT_LIMITED = (
+    "bit_depth_readout",
+    "detector_readout_time",
+    "x_pixels_in_detector",
+    "y_pixels_in_detector",
+)
+
 
 class KA_Energy(Enum):
     """Possible element K-alpha energies for samples."""
@@ -54,9 +85,23 @@ class KA_Energy(Enum):
     Zn: float = 8638.86
 
 
+@indexed_fields
 @dataclass
-class EigerSettings:
-    """A data container for Eiger device configuration."""
+class EigerSettings(Parameters):
+    """A data container for Eiger device configuration.
+
+    Setting a parameter by name keeps the timing achievable, as the real detector
+    does. A frame_time shorter than min_frame_time is rejected, a count_time which
+    does not fit in the frame_time with the readout time is shortened, and a longer
+    count_time lengthens the frame_time.
+
+    Setting the roi_mode sets the pixels in the detector to the size of the region
+    read out, the centre of the sensor, which reads out at a higher frame rate.
+
+    The flatfield and pixel_mask are held as read only arrays of shape (y, x), set
+    by name from a typed array, nested lists or an array. An empty array stands for
+    the default of a flatfield of ones and a pixel mask of zeros.
+    """
 
     auto_summation: bool = field(default=True, metadata=rw_bool())
     beam_center_x: float = field(default=0.0, metadata=rw_float())
@@ -83,8 +128,8 @@ class EigerSettings:
     element: str = field(
         default="Co", metadata=rw_str(allowed_values=["", *(e.name for e in KA_Energy)])
     )
-    flatfield: List[List[float]] = field(
-        default_factory=lambda: [[]], metadata=rw_float_grid()
+    flatfield: np.ndarray = field(
+        default_factory=lambda: _empty_array("flatfield"), metadata=rw_float_grid()
     )
     flatfield_correction_applied: bool = field(default=True, metadata=rw_bool())
     frame_time: float = field(default=0.12, metadata=rw_float())
@@ -98,12 +143,12 @@ class EigerSettings:
     phi_increment: float = field(default=0.0, metadata=rw_float())
     phi_start: float = field(default=0.0, metadata=rw_float())
     photon_energy: float = field(default=6930.32, metadata=rw_float())
-    pixel_mask: List[List[int]] = field(
-        default_factory=lambda: [[]], metadata=rw_uint_grid()
+    pixel_mask: np.ndarray = field(
+        default_factory=lambda: _empty_array("pixel_mask"), metadata=rw_uint_grid()
     )
     pixel_mask_applied: bool = field(default=False, metadata=rw_bool())
     roi_mode: str = field(
-        default="disabled", metadata=rw_str(allowed_values=["disabled", "4M"])
+        default="disabled", metadata=rw_str(allowed_values=list(ROI_MODES))
     )
     sensor_material: str = field(default="Silicon", metadata=ro_str())
     sensor_thickness: float = field(default=0.01, metadata=ro_float())
@@ -120,20 +165,61 @@ class EigerSettings:
     y_pixel_size: float = field(default=0.01, metadata=ro_float())
     y_pixels_in_detector: int = field(default=FRAME_HEIGHT, metadata=rw_int())
 
-    def __getitem__(self, key: str) -> Any:  # noqa: D105
-        f = {}
-        for field_ in fields(self):
-            f[field_.name] = {
-                "value": vars(self)[field_.name],
-                "metadata": field_.metadata,
-            }
-        return f[key]
-
     def __setitem__(self, key: str, value: Any) -> None:  # noqa: D105
-        self.__dict__[key] = value
+        if key in ARRAY_TYPES:
+            # A view, so an array given is not made read only for its owner
+            value = decode_darray(value, ARRAY_TYPES[key]).view()
+            value.flags.writeable = False
+        self._check_limits(key, value)
+        setattr(self, key, value)
 
         self._check_dependencies(key, value)
 
+    @property
+    def max_frame_rate(self) -> float:
+        """The highest frame rate in Hz that the detector can read out.
+
+        The time to read out a frame scales with the number of pixels and the bits
+        read out per pixel, from the rate in ROI_MODES of the region read out at 16
+        bits.
+        """
+        (width, height), rate = ROI_MODES[self.roi_mode]
+        pixels = max(self.x_pixels_in_detector * self.y_pixels_in_detector, 1)
+        return rate * (16 / max(self.bit_depth_readout, 1)) * (width * height / pixels)
+
+    @property
+    def sensor_shape(self) -> Tuple[int, int]:
+        """The shape of the whole sensor as (x pixels, y pixels).
+
+        When a region of interest is read out the frames are the centre of it.
+        """
+        if self.roi_mode == "disabled":
+            return (self.x_pixels_in_detector, self.y_pixels_in_detector)
+        return (FRAME_WIDTH, FRAME_HEIGHT)
+
+    @property
+    def min_frame_time(self) -> float:
+        """The shortest frame time in seconds that the detector can achieve.
+
+        Frames are read out while the next is exposed, so the frame time is limited
+        by the maximum frame rate and the dead time of the readout, not the sum of
+        count and readout times.
+        """
+        return max(1 / self.max_frame_rate, self.detector_readout_time)
+
+    def _check_limits(self, key: str, value: Any) -> None:
+        if key not in ("frame_time", "count_time"):
+            return
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{key} must be a number, not {value!r}")
+        elif key == "frame_time" and value < self.min_frame_time:
+            raise ValueError(
+                f"frame_time {value} is shorter than the minimum of "
+                f"{self.min_frame_time} at {self.bit_depth_readout} bit readout"
+            )
+        elif key == "count_time" and value <= 0:
+            raise ValueError(f"count_time {value} must be positive")
+
     def _check_dependencies(self, key, value):
         if key == "element":
             self.photon_energy = getattr(KA_Energy, value).value
@@ -157,7 +243,23 @@ class EigerSettings:
             self._calc_threshold_energy()
 
         elif key == "count_time":
-            self.frame_time = self.count_time + self.detector_readout_time
+            self.frame_time = max(
+                self.count_time + self.detector_readout_time, self.min_frame_time
+            )
+
+        elif key == "frame_time":
+            max_count_time = self.frame_time - self.detector_readout_time
+            if self.count_time > max_count_time:
+                LOGGER.debug(f"Shortening count_time to {max_count_time}")
+                self.count_time = max_count_time
+
+        elif key == "roi_mode":
+            (self.x_pixels_in_detector, self.y_pixels_in_detector), _ = ROI_MODES[value]
+            self._check_dependencies("x_pixels_in_detector", self.x_pixels_in_detector)
+
+        elif key in _READOUT_LIMITED and self.frame_time < self.min_frame_time:
+            LOGGER.debug(f"Lengthening frame_time to {self.min_frame_time}")
+            self.frame_time = self.min_frame_time
 
     def _calc_threshold_energy(self):
         self.threshold_energy = 0.5 * self.photon_energy
@@ -168,5 +270,11 @@ class EigerSettings:
         return {
             fld.name: vars(self)[fld.name]
             for fld in fields(self)
-            if fld not in exclude_fields
+            if fld.name not in exclude_fields
         }
+
+
+def _empty_array(name: str) -> np.ndarray:
+    array = np.zeros((0, 0), dtype=ARRAY_TYPES[name])
+    array.flags.writeable = False
+    return array
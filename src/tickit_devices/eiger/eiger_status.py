@@ -1,9 +1,18 @@
-from dataclasses import dataclass, field, fields
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any, List
+from typing import List
 
-from .eiger_schema import ro_str_list, rw_datetime, rw_float, rw_state
+from .eiger_schema import (
+    Parameters,
+    indexed_fields,
+    ro_float,
+    ro_int,
+    ro_str_list,
+    rw_datetime,
+    rw_float,
+    rw_state,
+)
 
 
 class State(Enum):
@@ -19,9 +28,15 @@ class State(Enum):
     ERROR = "error"
 
 
+@indexed_fields
 @dataclass
-class EigerStatus:
-    """Stores the status parameters of the Eiger detector."""
+class EigerStatus(Parameters):
+    """Stores the status parameters of the Eiger detector.
+
+    frames_acquired, frames_remaining and time_remaining (an estimate in seconds)
+    report the progress of the current series, they are an addition to the API of
+    the real detector.
+    """
 
     state: State = field(
         default=State.NA,
@@ -31,13 +46,7 @@ class EigerStatus:
     th0_temp: float = field(default=24.5, metadata=rw_float())
     th0_humidity: float = field(default=0.2, metadata=rw_float())
     time: datetime = field(default=datetime.now(), metadata=rw_datetime())
-    dcu_buffer_free: float = field(default=0.5, metadata=rw_float())
-
-    def __getitem__(self, key: str) -> Any:  # noqa: D105
-        f = {}
-        for field_ in fields(self):
-            f[field_.name] = {
-                "value": vars(self)[field_.name],
-                "metadata": field_.metadata,
-            }
-        return f[key]
+    dcu_buffer_free: float = field(default=1.0, metadata=rw_float())
+    frames_acquired: int = field(default=0, metadata=ro_int())
+    frames_remaining: int = field(default=0, metadata=ro_int())
+    time_remaining: float = field(default=0.0, metadata=ro_float())
@@ -0,0 +1,245 @@
+import json
+import logging
+from typing import Callable, List, Optional, Set
+
+import aiozmq
+import zmq
+from pydantic.v1 import BaseModel
+from tickit.adapters.io import ZeroMqPushIo
+from tickit.adapters.io.zeromq_push_io import SocketFactory
+from tickit.adapters.zmq import (
+    ZeroMqMessage,
+    _MessagePart,
+    _SerializableMessagePart,
+)
+from zmq.utils.monitor import recv_monitor_message
+
+LOGGER = logging.getLogger(__name__)
+
+#: Messages queued for each consumer before sending blocks or drops, as libzmq
+DEFAULT_HWM = 1000
+
+#: Called with the index of the subscriber and the message dropped for it
+DropCallback = Callable[[int, ZeroMqMessage], None]
+
+_PEER_EVENTS = (
+    zmq.EVENT_ACCEPTED | zmq.EVENT_HANDSHAKE_SUCCEEDED | zmq.EVENT_DISCONNECTED
+)
+
+
+async def bind_zmq_push_socket(
+    host: str, port: int, hwm: int = DEFAULT_HWM
+) -> aiozmq.ZmqStream:
+    """Create a PUSH socket bound to an address, for consumers to connect to.
+
+    Unlike the tickit default the socket does not also connect to the address. A
+    PUSH socket connected to itself queues messages on a connection which fails its
+    handshake and is retried, losing the messages queued on it.
+
+    Args:
+        host: The host to bind to.
+        port: The port to bind to.
+        hwm: The number of messages queued for each connected consumer. Defaults
+            to DEFAULT_HWM.
+
+    Returns:
+        aiozmq.ZmqStream: The bound socket.
+    """
+    stream = await aiozmq.create_zmq_stream(zmq.PUSH)
+    # The high water mark only applies to connections made after it is set
+    stream.transport.setsockopt(zmq.SNDHWM, hwm)
+    await stream.transport.bind(f"tcp://{host}:{port}")
+    return stream
+
+
+class EigerZeroMqPushIo(ZeroMqPushIo):
+    """ZeroMqPushIo which hands image payloads to libzmq without copying them.
+
+    Message parts which are already bytes-like (encoded headers, image blobs,
+    memoryviews and zmq Frames) are passed through untouched and sent with
+    ``copy=False`` whenever the socket can accept the message immediately. If the
+    socket would block, the message is queued in aiozmq's write buffer instead so
+    that ordering is preserved.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 5555,
+        socket_factory: SocketFactory = bind_zmq_push_socket,
+    ) -> None:
+        """An EigerZeroMqPushIo constructor.
+
+        Args:
+            host: The host to bind to. Defaults to "127.0.0.1".
+            port: The port to bind to. Defaults to 5555.
+            socket_factory: Creates the socket. Defaults to bind_zmq_push_socket.
+        """
+        super().__init__(host, port, socket_factory)
+
+    async def send_message(self, message: ZeroMqMessage) -> None:
+        """Send a multipart message, avoiding a copy of each part where possible.
+
+        Args:
+            message: The message parts to send.
+        """
+        socket = await self._ensure_socket()
+        serialized = self._serialize(message)
+        transport = socket.transport
+        if transport.get_write_buffer_size() == 0:
+            zmq_socket = transport.get_extra_info("zmq_socket")
+            try:
+                zmq_socket.send_multipart(serialized, zmq.DONTWAIT, copy=False)
+                return
+            except zmq.Again:
+                LOGGER.debug("Socket would block, falling back to buffered send")
+        socket.write([_as_buffer(part) for part in serialized])
+        await socket.drain()
+
+    def _serialize_part(self, part: _SerializableMessagePart) -> _MessagePart:
+        if isinstance(part, (bytes, memoryview, zmq.Frame)):
+            return part
+        elif isinstance(part, BaseModel):
+            return part.json().encode("utf_8")
+        elif isinstance(part, dict):
+            return json.dumps(part).encode("utf_8")
+        elif isinstance(part, str):
+            return part.encode("utf_8")
+        else:
+            raise TypeError(f"Message: {part} is not serializable")
+
+
+class EigerZeroMqBroadcastIo(EigerZeroMqPushIo):
+    """Sends every message to each of several subscribers, dropping for slow ones.
+
+    Each subscriber has a PUSH socket of its own, bound to consecutive ports from
+    the given port, so consumers connect with a PULL socket as they would to the
+    detector. Messages are queued for each subscriber up to its high water mark,
+    beyond that the message is dropped for that subscriber only and counted in
+    ``dropped``, so a slow consumer never holds back the others. A subscriber with
+    no consumer connected misses the messages sent meanwhile, they are not counted
+    as dropped.
+    """
+
+    subscribers: int
+    hwm: int
+    dropped: List[int]
+
+    _sockets: List[aiozmq.ZmqStream]
+    _monitors: List["_PeerMonitor"]
+    _on_drop: Optional[DropCallback]
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 5555,
+        subscribers: int = 2,
+        hwm: int = DEFAULT_HWM,
+        on_drop: Optional[DropCallback] = None,
+    ) -> None:
+        """An EigerZeroMqBroadcastIo constructor.
+
+        Args:
+            host: The host to bind to. Defaults to "127.0.0.1".
+            port: The port of the first subscriber. Defaults to 5555.
+            subscribers: The number of subscribers. Defaults to 2.
+            hwm: The number of messages queued for each subscriber. Defaults to
+                DEFAULT_HWM.
+            on_drop: Called when a message is dropped for a subscriber. Defaults
+                to None.
+        """
+        super().__init__(host, port)
+        self.subscribers = subscribers
+        self.hwm = hwm
+        self.dropped = [0] * subscribers
+        self._sockets = []
+        self._monitors = []
+        self._on_drop = on_drop
+
+    @property
+    def peers(self) -> List[int]:
+        """The number of consumers connected to each subscriber."""
+        return [monitor.peers for monitor in self._monitors]
+
+    async def shutdown(self) -> None:  # noqa: D102
+        if self._task:
+            self._task.cancel()
+        for monitor in self._monitors:
+            monitor.close()
+        for socket in self._sockets:
+            socket.close()
+        self._monitors = []
+        self._sockets = []
+        self._socket = None
+
+    async def send_message(self, message: ZeroMqMessage) -> None:
+        """Send a multipart message to every subscriber which can take it.
+
+        Args:
+            message: The message parts to send.
+        """
+        await self._ensure_socket()
+        serialized = self._serialize(message)
+        for subscriber, socket in enumerate(self._sockets):
+            zmq_socket = socket.transport.get_extra_info("zmq_socket")
+            try:
+                zmq_socket.send_multipart(serialized, zmq.DONTWAIT, copy=False)
+            except zmq.Again:
+                # A socket with no consumer to send to would block too, only a
+                # consumer falling behind drops a message
+                if self._monitors[subscriber].peers == 0:
+                    continue
+                LOGGER.debug(f"Subscriber {subscriber} is behind, dropped message")
+                self.dropped[subscriber] += 1
+                if self._on_drop is not None:
+                    self._on_drop(subscriber, message)
+
+    async def _ensure_socket(self) -> aiozmq.ZmqStream:
+        async with self._socket_lock:
+            if not self._sockets:
+                self._sockets = [
+                    await bind_zmq_push_socket(self._host, self._port + index, self.hwm)
+                    for index in range(self.subscribers)
+                ]
+                self._monitors = [
+                    _PeerMonitor(socket.transport.get_extra_info("zmq_socket"))
+                    for socket in self._sockets
+                ]
+                self._socket = self._sockets[0]
+        return self._sockets[0]
+
+
+class _PeerMonitor:
+    # Counts the peers connected to a bound socket from the events of a monitor
+    # socket, read when the count is wanted as connections change rarely. A peer is
+    # counted once its handshake succeeds, until its connection is closed
+
+    def __init__(self, socket: zmq.Socket) -> None:
+        self._socket = socket
+        self._monitor = socket.get_monitor_socket(_PEER_EVENTS)
+        self._accepted: Set[int] = set()
+        self._ready = 0
+
+    @property
+    def peers(self) -> int:
+        while self._monitor.poll(0, zmq.POLLIN):
+            event = recv_monitor_message(self._monitor, zmq.NOBLOCK)
+            if event["event"] == zmq.EVENT_ACCEPTED:
+                self._accepted.add(event["value"])
+            elif event["event"] == zmq.EVENT_HANDSHAKE_SUCCEEDED:
+                self._ready += 1
+            elif event["event"] == zmq.EVENT_DISCONNECTED:
+                # The connection may have closed before its handshake succeeded
+                self._accepted.discard(event["value"])
+                self._ready = min(self._ready, len(self._accepted))
+        return min(self._ready, len(self._accepted))
+
+    def close(self) -> None:
+        self._socket.disable_monitor()
+        self._monitor.close(linger=0)
+
+
+def _as_buffer(part: _MessagePart) -> _MessagePart:
+    if isinstance(part, zmq.Frame):
+        return part.buffer
+    return part
@@ -0,0 +1,305 @@
+import logging
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import h5py
+import numpy as np
+
+from tickit_devices.eiger.data.compression import decompress
+from tickit_devices.eiger.data.dummy_image import Image
+from tickit_devices.eiger.eiger_settings import EigerSettings
+from tickit_devices.eiger.filewriter.filewriter_config import FileWriterConfig
+from tickit_devices.eiger.filewriter.filewriter_status import FileWriterStatus
+
+LOGGER = logging.getLogger(__name__)
+
+#: HDF5 filter IDs of the bitshuffle and LZ4 plugins
+BSHUF_H5FILTER = 32008
+LZ4_H5FILTER = 32004
+_BSHUF_H5_VERSION = (0, 4)
+_BSHUF_H5_COMPRESS_LZ4 = 2
+
+#: Settings recorded in the master file, under the detector and detectorSpecific
+_DETECTOR_FIELDS = [
+    "count_time",
+    "frame_time",
+    "description",
+    "detector_number",
+    "x_pixel_size",
+    "y_pixel_size",
+    "bit_depth_image",
+    "sensor_thickness",
+    "sensor_material",
+]
+_DETECTOR_SPECIFIC_FIELDS = [
+    "nimages",
+    "ntrigger",
+    "x_pixels_in_detector",
+    "y_pixels_in_detector",
+    "compression",
+    "photon_energy",
+    "trigger_mode",
+]
+
+
+class EigerFileWriter:
+    """Simulation of the Eiger filewriter, writing NeXus style HDF5 files.
+
+    A series writes a master file holding the detector configuration and links to
+    data files, each of which holds up to nimages_per_file images, or all of them if
+    nimages_per_file is 0. Images are written
+    with direct chunk writes, one chunk per image, so the compressed data from the
+    detector goes to disk as it is, unless compression is disabled in which case the
+    images are decompressed first.
+
+    All file access and state changes happen on a single worker thread, in the order
+    the series and images were submitted, so writing never blocks the simulation and
+    the end of one series cannot overwrite the state of the next.
+    """
+
+    config: FileWriterConfig
+    status: FileWriterStatus
+    directory: Path
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        config: Optional[FileWriterConfig] = None,
+        status: Optional[FileWriterStatus] = None,
+    ) -> None:
+        """An EigerFileWriter constructor.
+
+        Args:
+            directory: The directory to write files to.
+            config: Filewriter configuration. Defaults to None.
+            status: Starting status. Defaults to None.
+        """
+        self.directory = Path(directory)
+        self.config = config or FileWriterConfig()
+        self.status = status or FileWriterStatus()
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="EigerFileWriter"
+        )
+        self._enabled = False
+        self._series: Optional[_Series] = None
+
+    def begin_series(self, settings: EigerSettings, series_id: int) -> None:
+        """Write the master file for an acquisition series.
+
+        Args:
+            settings: Current detector configuration, recorded in the master file.
+            series_id: ID for the acquisition series, substituted for $id in the
+                name pattern.
+        """
+        self._enabled = self.config.mode == "enabled"
+        if not self._enabled:
+            self._executor.submit(self._begin, "disabled")
+            return
+
+        prefix = self.config.name_pattern.replace("$id", str(series_id))
+        if prefix.endswith(".h5"):
+            prefix = prefix[: -len(".h5")]
+        series = _Series(
+            prefix=prefix,
+            nimages_per_file=self.config.nimages_per_file,
+            image_nr_start=self.config.image_nr_start,
+            compression_enabled=self.config.compression_enabled,
+            settings={
+                name: getattr(settings, name)
+                for name in _DETECTOR_FIELDS + _DETECTOR_SPECIFIC_FIELDS
+            },
+        )
+        self._executor.submit(self._begin, "acquire")
+        self._submit(self._open_series, series)
+
+    def write_image(self, image: Image) -> None:
+        """Queue an image to be written to the current data file.
+
+        Args:
+            image: The image with associated metadata.
+        """
+        if self._enabled:
+            self._submit(self._write_image, image)
+
+    def end_series(self) -> None:
+        """Close the files of the current series once all images are written."""
+        if self._enabled:
+            self._enabled = False
+            self._submit(self._close_series)
+
+    def flush(self) -> None:
+        """Wait until everything submitted so far has been written."""
+        self._executor.submit(lambda: None).result()
+
+    def close(self) -> None:
+        """Finish writing and stop the worker thread."""
+        self.end_series()
+        self._executor.shutdown(wait=True)
+
+    def _submit(self, func: Any, *args: Any) -> None:
+        self._executor.submit(self._guarded, func, *args)
+
+    def _guarded(self, func: Any, *args: Any) -> None:
+        if self.status.state == "error":
+            return
+        try:
+            func(*args)
+        except Exception as e:
+            LOGGER.exception("Filewriter failed")
+            self.status.error.append(str(e))
+            self.status.state = "error"
+            if self._series is not None:
+                self._series.close()
+                self._series = None
+
+    def _begin(self, state: str) -> None:
+        # Not guarded, so a new series clears the error of the last
+        self.status.error.clear()
+        self.status.state = state
+
+    def _open_series(self, series: "_Series") -> None:
+        master_name = f"{series.prefix}_master.h5"
+        series.master = h5py.File(self.directory / master_name, "w")
+        _write_master(series.master, series.settings)
+        self._series = series
+        self._add_file(master_name)
+
+    def _write_image(self, image: Image) -> None:
+        series = self._series
+        if series is None:
+            return
+        if series.nimages_per_file > 0:
+            file_number, position = divmod(series.written, series.nimages_per_file)
+        else:
+            file_number, position = 0, series.written
+        if position == 0:
+            self._open_data_file(series, file_number + 1, image)
+
+        dataset = series.dataset
+        assert dataset is not None
+        dataset.resize(position + 1, axis=0)
+        chunk = _chunk_for(image, series.compression_enabled)
+        dataset.id.write_direct_chunk((position, 0, 0), chunk)
+        dataset.attrs["image_nr_high"] = series.image_nr_start + series.written
+        series.written += 1
+
+    def _open_data_file(self, series: "_Series", number: int, image: Image) -> None:
+        if series.data is not None:
+            series.data.close()
+        name = f"{series.prefix}_data_{number:06d}.h5"
+        series.data = h5py.File(self.directory / name, "w")
+        series.dataset = series.data.create_dataset(
+            "entry/data/data",
+            shape=(0, image.shape[1], image.shape[0]),
+            maxshape=(series.nimages_per_file or None, image.shape[1], image.shape[0]),
+            chunks=(1, image.shape[1], image.shape[0]),
+            dtype=image.dtype,
+            **_filter_for(image, series.compression_enabled),
+        )
+        series.dataset.attrs["image_nr_low"] = series.image_nr_start + series.written
+        series.dataset.attrs["image_nr_high"] = series.image_nr_start + series.written
+
+        assert series.master is not None
+        series.master[f"entry/data/data_{number:06d}"] = h5py.ExternalLink(
+            name, "entry/data/data"
+        )
+        series.master.flush()
+        self._add_file(name)
+
+    def _close_series(self) -> None:
+        if self._series is not None:
+            self._series.close()
+            self._series = None
+        self.status.state = "ready"
+
+    def _add_file(self, name: str) -> None:
+        if name not in self.status.files:
+            self.status.files.append(name)
+        LOGGER.debug(f"Writing {self.directory / name}")
+
+
+class _Series:
+    """The files and progress of the series being written."""
+
+    def __init__(
+        self,
+        prefix: str,
+        nimages_per_file: int,
+        image_nr_start: int,
+        compression_enabled: bool,
+        settings: Dict[str, Any],
+    ) -> None:
+        self.prefix = prefix
+        self.nimages_per_file = nimages_per_file
+        self.image_nr_start = image_nr_start
+        self.compression_enabled = compression_enabled
+        self.settings = settings
+
+        self.written = 0
+        self.master: Optional[h5py.File] = None
+        self.data: Optional[h5py.File] = None
+        self.dataset: Optional[h5py.Dataset] = None
+
+    def close(self) -> None:
+        for h5file in (self.data, self.master):
+            if h5file is not None:
+                h5file.close()
+        self.master = self.data = self.dataset = None
+
+
+def _write_master(master: h5py.File, settings: Dict[str, Any]) -> None:
+    entry = master.create_group("entry")
+    entry.attrs["NX_class"] = "NXentry"
+    entry.create_group("data").attrs["NX_class"] = "NXdata"
+    detector = entry.create_group("instrument/detector")
+    detector.attrs["NX_class"] = "NXdetector"
+    for name in _DETECTOR_FIELDS:
+        detector[name] = settings[name]
+    specific = detector.create_group("detectorSpecific")
+    for name in _DETECTOR_SPECIFIC_FIELDS:
+        specific[name] = settings[name]
+
+
+def _filter_for(image: Image, compression_enabled: bool) -> Dict[str, Any]:
+    # The compression filter recorded for the dataset, filters are looked up when
+    # reading so they need not be available here. A loaded bitshuffle filter fills
+    # in its version and the element size itself, otherwise they are given here.
+    if not compression_enabled:
+        return {}
+    elif image.encoding.startswith("bs"):
+        options: Tuple[int, ...] = (0, _BSHUF_H5_COMPRESS_LZ4)
+        if not h5py.h5z.filter_avail(BSHUF_H5FILTER):
+            elem_size = np.dtype(image.dtype).itemsize
+            options = (*_BSHUF_H5_VERSION, elem_size, *options)
+        return {
+            "compression": BSHUF_H5FILTER,
+            "compression_opts": options,
+            "allow_unknown_filter": True,
+        }
+    elif image.encoding == "lz4<":
+        return {"compression": LZ4_H5FILTER, "allow_unknown_filter": True}
+    raise ValueError(f"Unknown encoding: {image.encoding}")
+
+
+def _chunk_for(image: Image, compression_enabled: bool) -> Any:
+    # The chunk to write for an image, as the dataset's filters would produce it
+    rows_columns = (image.shape[1], image.shape[0])
+    if not compression_enabled:
+        raw = decompress(image.data, image.encoding, rows_columns, image.dtype)
+        return np.ascontiguousarray(raw, dtype=np.dtype(image.dtype))
+    elif image.encoding == "lz4<":
+        return _hdf5_lz4_chunk(image, int(np.prod(rows_columns)))
+    return image.data
+
+
+def _hdf5_lz4_chunk(image: Image, pixels: int) -> bytes:
+    # The LZ4 filter frames its blocks with the sizes, the stream sends a bare block
+    nbytes = pixels * np.dtype(image.dtype).itemsize
+    if len(image.data) == nbytes:
+        # A block the size of the input is taken to be stored uncompressed
+        raw = decompress(image.data, image.encoding, (pixels,), image.dtype)
+        return struct.pack(">QII", nbytes, nbytes, nbytes) + raw.tobytes()
+    return struct.pack(">QII", nbytes, nbytes, len(image.data)) + bytes(image.data)
@@ -1,11 +1,17 @@
-from dataclasses import dataclass, field, fields
-from typing import Any
+from dataclasses import dataclass, field
 
-from tickit_devices.eiger.eiger_schema import rw_bool, rw_int, rw_str
+from tickit_devices.eiger.eiger_schema import (
+    Parameters,
+    indexed_fields,
+    rw_bool,
+    rw_int,
+    rw_str,
+)
 
 
+@indexed_fields
 @dataclass
-class FileWriterConfig:
+class FileWriterConfig(Parameters):
     """Eiger filewriter configuration taken from the API spec."""
 
     mode: str = field(
@@ -15,15 +21,3 @@ class FileWriterConfig:
     image_nr_start: int = field(default=0, metadata=rw_int())
     name_pattern: str = field(default="test.h5", metadata=rw_str())
     compression_enabled: bool = field(default=False, metadata=rw_bool())
-
-    def __getitem__(self, key: str) -> Any:  # noqa: D105
-        f = {}
-        for field_ in fields(self):
-            f[field_.name] = {
-                "value": vars(self)[field_.name],
-                "metadata": field_.metadata,
-            }
-        return f[key]
-
-    def __setitem__(self, key: str, value: Any) -> None:  # noqa: D105
-        self.__dict__[key] = value
@@ -0,0 +1,258 @@
+import json
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from time import perf_counter_ns
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+from tickit_devices.eiger.eiger_schema import (
+    Parameters,
+    indexed_fields,
+    ro_float_grid,
+    ro_int,
+    ro_str_list,
+)
+
+#: Events recorded for each frame, in the order they happen
+EVENTS = ["update", "acquire", "frame", "header", "consume", "send"]
+#: Stages between consecutive events, each named after the event ending it
+STAGES = EVENTS[1:]
+
+_UPDATE, _ACQUIRE, _FRAME, _HEADER, _CONSUME, _SEND = range(len(EVENTS))
+_WIDTH = len(EVENTS)
+_EMPTY_ROW = array("q", bytes(8 * _WIDTH))
+
+
+@indexed_fields
+@dataclass
+class TraceStatus(Parameters):
+    """Aggregate timings of the frames in a trace.
+
+    stage_latency has a row of the median and 99th percentile duration, in
+    microseconds, of each of the stages, in the order given by stages.
+    """
+
+    stages: List[str] = field(
+        default_factory=lambda: list(STAGES), metadata=ro_str_list()
+    )
+    stage_latency: List[List[float]] = field(
+        default_factory=lambda: [[0.0, 0.0] for _ in STAGES],
+        metadata=ro_float_grid(),
+    )
+    frames_traced: int = field(default=0, metadata=ro_int())
+    frames_in_flight: int = field(default=0, metadata=ro_int())
+
+
+class FrameTrace:
+    """Timestamps of each stage of the most recent frames through the detector.
+
+    The timestamps of a frame are recorded into a row of an array allocated once,
+    used as a ring so the oldest frames are overwritten, and nothing is allocated
+    per frame. The arrays are plain machine arrays, cheap to set an item of, and
+    viewed as NumPy arrays to aggregate. The stages of a frame are:
+
+    acquire: From the start of the device update to the start of acquiring the
+        frame, so scheduling and the earlier frames of a batch.
+    frame: Taking the frame from the frame pool or sample image.
+    header: Building the headers of the frame and buffering it in the stream.
+    consume: Waiting in the stream buffer until taken by the ZeroMQ adapter.
+    send: Waiting to be sent and handing it to the socket.
+
+    Frames dropped by the stream are never consumed or sent, so only count towards
+    the stages they reached.
+    """
+
+    capacity: int
+    status: TraceStatus
+
+    _stamps: "array[int]"
+    _series: "array[int]"
+    _frames: "array[int]"
+    _sequence: "array[int]"
+    _traced: int
+    _update: int
+    _current: Optional[int]
+    _buffered: Deque[int]
+    _sending: Deque[List[int]]
+
+    def __init__(self, capacity: int = 4096) -> None:
+        """A FrameTrace constructor.
+
+        Args:
+            capacity: The number of frames kept. Defaults to 4096.
+        """
+        self.capacity = capacity
+        self.status = TraceStatus()
+        self._stamps = array("q", bytes(8 * capacity * _WIDTH))
+        self._series = array("q", bytes(8 * capacity))
+        self._frames = array("q", bytes(8 * capacity))
+        self._sequence = array("q", [-1]) * capacity
+        self._traced = 0
+        self._update = 0
+        self._current = None
+        self._buffered = deque()
+        self._sending = deque()
+
+    @property
+    def frames_in_flight(self) -> int:
+        """The number of frames acquired and not yet sent or dropped."""
+        return len(self._buffered) + sum(len(message) for message in self._sending)
+
+    def begin_update(self) -> None:
+        """Record the start of a device update, before any frames it acquires."""
+        self._update = perf_counter_ns()
+
+    def begin_frame(self, series_id: int, frame: int) -> None:
+        """Record the start of acquiring a frame.
+
+        Args:
+            series_id: ID of the acquisition series.
+            frame: Index of the frame in the series.
+        """
+        sequence = self._traced
+        slot = sequence % self.capacity
+        row = slot * _WIDTH
+        self._stamps[row : row + _WIDTH] = _EMPTY_ROW
+        self._stamps[row + _UPDATE] = self._update
+        self._stamps[row + _ACQUIRE] = perf_counter_ns()
+        self._series[slot] = series_id
+        self._frames[slot] = frame
+        self._sequence[slot] = sequence
+        self._traced += 1
+        self._current = sequence
+
+    def frame_taken(self) -> None:
+        """Record the frame being acquired taken from its source."""
+        self._stamp(self._current, _FRAME)
+
+    def frame_buffered(self, dropped: int, policy: str) -> None:
+        """Record the frame being acquired buffered in the stream.
+
+        Args:
+            dropped: The number of images dropped by the stream buffer to add it.
+            policy: The policy of the stream buffer, which determines the image
+                dropped.
+        """
+        if self._current is None:
+            return
+        self._stamp(self._current, _HEADER)
+        if not dropped:
+            self._buffered.append(self._current)
+        elif policy == "drop_oldest":
+            if self._buffered:
+                self._buffered.popleft()
+            self._buffered.append(self._current)
+        self._current = None
+
+    def consumed(self, images: int) -> None:
+        """Record the oldest buffered frames taken from the stream as one message.
+
+        Args:
+            images: The number of images in the message.
+        """
+        now = perf_counter_ns()
+        message = [
+            self._buffered.popleft() for _ in range(min(images, len(self._buffered)))
+        ]
+        for sequence in message:
+            self._stamp(sequence, _CONSUME, now)
+        self._sending.append(message)
+
+    def sent(self) -> None:
+        """Record the oldest consumed message handed to the socket."""
+        if not self._sending:
+            return
+        now = perf_counter_ns()
+        for sequence in self._sending.popleft():
+            self._stamp(sequence, _SEND, now)
+
+    def summarize(self) -> TraceStatus:
+        """Update the status with the timings of the frames in the trace.
+
+        Returns:
+            TraceStatus: The updated status.
+        """
+        stamps = self._stamp_rows()[_as_numpy(self._sequence) >= 0]
+        latency = []
+        for stage in range(1, len(EVENTS)):
+            start, end = stamps[:, stage - 1], stamps[:, stage]
+            durations = (end - start)[(start > 0) & (end > 0)]
+            if durations.size:
+                p50, p99 = np.percentile(durations, [50, 99]) / 1e3
+                latency.append([float(p50), float(p99)])
+            else:
+                latency.append([0.0, 0.0])
+        self.status.stage_latency = latency
+        self.status.frames_traced = self._traced
+        self.status.frames_in_flight = self.frames_in_flight
+        return self.status
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Get the frames in the trace as a Chrome trace, e.g. for chrome://tracing.
+
+        Each stage of a frame is a complete event on a thread of its own, with the
+        series and frame index as arguments.
+
+        Returns:
+            Dict[str, Any]: The JSON serializable trace.
+        """
+        events: List[Dict[str, Any]] = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 0,
+                "tid": tid,
+                "args": {"name": stage},
+            }
+            for tid, stage in enumerate(STAGES)
+        ]
+        rows = self._stamp_rows()
+        sequence = _as_numpy(self._sequence)
+        for slot in np.argsort(sequence):
+            if sequence[slot] < 0:
+                continue
+            stamps = rows[slot]
+            args = {"series": int(self._series[slot]), "frame": int(self._frames[slot])}
+            for tid, stage in enumerate(STAGES):
+                start, end = int(stamps[tid]), int(stamps[tid + 1])
+                if start and end:
+                    events.append(
+                        {
+                            "name": stage,
+                            "ph": "X",
+                            "pid": 0,
+                            "tid": tid,
+                            "ts": start / 1e3,
+                            "dur": (end - start) / 1e3,
+                            "args": args,
+                        }
+                    )
+        return {"traceEvents": events, "displayTimeUnit": "ns"}
+
+    def dump(self, path: str) -> None:
+        """Write the frames in the trace to a Chrome trace JSON file.
+
+        Args:
+            path: The file to write.
+        """
+        with open(path, "w") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+    def _stamp(
+        self, sequence: Optional[int], event: int, now: Optional[int] = None
+    ) -> None:
+        # The frame may have been overwritten by a later frame in the ring
+        if sequence is None:
+            return
+        slot = sequence % self.capacity
+        if self._sequence[slot] == sequence:
+            self._stamps[slot * _WIDTH + event] = now or perf_counter_ns()
+
+    def _stamp_rows(self) -> np.ndarray:
+        return _as_numpy(self._stamps).reshape(self.capacity, _WIDTH)
+
+
+def _as_numpy(values: "array[int]") -> np.ndarray:
+    return np.frombuffer(values, dtype=np.int64)
@@ -0,0 +1,198 @@
+import json
+from bisect import bisect_left
+from collections import defaultdict
+from typing import DefaultDict, Dict, List, Mapping, Sequence, Tuple
+
+from pydantic.v1 import BaseModel
+
+#: Upper bounds, in seconds, of the buckets of the HTTP request latency histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+#: Metrics read from the detector when scraped, by name, with their type and help
+SCRAPED_METRICS = {
+    "eiger_stream_dropped_images_total": (
+        "counter",
+        "Images dropped by the stream buffer or for any subscriber.",
+    ),
+    "eiger_stream_buffered_images": (
+        "gauge",
+        "Images buffered in the stream waiting to be sent.",
+    ),
+    "eiger_stream_buffer_free_ratio": (
+        "gauge",
+        "Fraction of the stream buffer that is free.",
+    ),
+    "eiger_dcu_buffer_free_ratio": (
+        "gauge",
+        "Fraction of the fuller of the DCU and stream buffers that is free.",
+    ),
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class LatencyHistogram:
+    """A histogram of latencies, in the buckets given by LATENCY_BUCKETS."""
+
+    counts: List[int]
+    total: float
+
+    def __init__(self) -> None:
+        """A LatencyHistogram constructor."""
+        # The last count is of latencies beyond every bucket
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Add a latency to the histogram.
+
+        Args:
+            seconds: The latency in seconds.
+        """
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+
+
+class EigerMetrics:
+    """Counters of the work done by an Eiger, in the Prometheus text format.
+
+    The counters are plain integers incremented by the detector and its adapters
+    as they go, the simulation runs in one thread so they need no locks. Values
+    which the detector already keeps, such as buffer occupancy, are read from it
+    when scraped rather than counted.
+    """
+
+    frames_acquired: int
+    series: int
+    messages_streamed: int
+    bytes_streamed: int
+    dropped_messages: DefaultDict[int, int]
+    dropped_images: DefaultDict[int, int]
+
+    _requests: Dict[Tuple[str, str], LatencyHistogram]
+
+    def __init__(self) -> None:
+        """An EigerMetrics constructor."""
+        self.frames_acquired = 0
+        self.series = 0
+        self.messages_streamed = 0
+        self.bytes_streamed = 0
+        self.dropped_messages = defaultdict(int)
+        self.dropped_images = defaultdict(int)
+        self._requests = {}
+
+    def request_latency(self, method: str, path: str) -> LatencyHistogram:
+        """Get the histogram of the latency of requests to an HTTP endpoint.
+
+        Args:
+            method: The method of the endpoint.
+            path: The path of the endpoint, as routed.
+
+        Returns:
+            LatencyHistogram: The histogram, made when first requested.
+        """
+        histogram = self._requests.get((method, path))
+        if histogram is None:
+            histogram = self._requests[(method, path)] = LatencyHistogram()
+        return histogram
+
+    def message_streamed(self, parts: Sequence[object]) -> None:
+        """Count a message sent along the stream.
+
+        Args:
+            parts: The parts of the message.
+        """
+        self.messages_streamed += 1
+        try:
+            # Nearly every part is already encoded, so is sized by its length
+            self.bytes_streamed += sum(map(len, parts))  # type: ignore
+        except TypeError:
+            self.bytes_streamed += sum(_encoded_size(part) for part in parts)
+
+    def render(self, scraped: Mapping[str, float]) -> str:
+        """Render every metric in the Prometheus text exposition format.
+
+        Args:
+            scraped: The value of each of SCRAPED_METRICS, read from the detector.
+
+        Returns:
+            str: The metrics.
+        """
+        lines: List[str] = []
+        for name, kind, text, value in [
+            (
+                "eiger_frames_acquired_total",
+                "counter",
+                "Frames acquired.",
+                self.frames_acquired,
+            ),
+            ("eiger_series_total", "counter", "Series armed.", self.series),
+            (
+                "eiger_stream_messages_total",
+                "counter",
+                "Messages queued to send along the stream.",
+                self.messages_streamed,
+            ),
+            (
+                "eiger_stream_bytes_total",
+                "counter",
+                "Bytes queued to send along the stream.",
+                self.bytes_streamed,
+            ),
+        ]:
+            lines += _header(name, kind, text) + [f"{name} {value}"]
+
+        for name, (kind, text) in SCRAPED_METRICS.items():
+            lines += _header(name, kind, text) + [f"{name} {scraped[name]}"]
+
+        for name, text, counts in [
+            (
+                "eiger_stream_dropped_messages_total",
+                "Messages dropped for a slow subscriber.",
+                self.dropped_messages,
+            ),
+            (
+                "eiger_stream_subscriber_dropped_images_total",
+                "Images dropped for a slow subscriber.",
+                self.dropped_images,
+            ),
+        ]:
+            lines += _header(name, "counter", text)
+            for subscriber, count in sorted(counts.items()):
+                lines.append(f'{name}{{subscriber="{subscriber}"}} {count}')
+
+        name = "eiger_http_request_duration_seconds"
+        lines += _header(name, "histogram", "Latency of HTTP requests by endpoint.")
+        for (method, path), histogram in sorted(self._requests.items()):
+            labels = f'method="{_escape(method)}",path="{_escape(path)}"'
+            cumulative = 0
+            for bound, count in zip(
+                [*map(str, LATENCY_BUCKETS), "+Inf"], histogram.counts
+            ):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.total}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _header(name: str, kind: str, text: str) -> List[str]:
+    return [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _encoded_size(part: object) -> int:
+    # Series headers and footers are sent as models, sized as the io encodes them
+    if isinstance(part, memoryview):
+        return part.nbytes
+    elif isinstance(part, BaseModel):
+        return len(part.json().encode("utf_8"))
+    elif isinstance(part, Mapping):
+        return len(json.dumps(part).encode("utf_8"))
+    elif isinstance(part, str):
+        return len(part.encode("utf_8"))
+    return len(part)  # type: ignore
@@ -0,0 +1,79 @@
+import logging
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from tickit_devices.eiger.data.dummy_image import Image
+from tickit_devices.eiger.monitor.monitor_config import MonitorConfig
+from tickit_devices.eiger.monitor.monitor_status import MonitorStatus
+
+LOGGER = logging.getLogger(__name__)
+
+
+class EigerMonitor:
+    """Simulation of the Eiger monitor, which keeps the most recent images.
+
+    Images are held in a ring of monitor buffer_size images, the oldest falling out
+    as new ones arrive. The ring holds the same image objects given to the stream,
+    so keeping them costs no copies.
+    """
+
+    config: MonitorConfig
+    status: MonitorStatus
+
+    _images: Deque[Tuple[int, Image]]
+
+    def __init__(
+        self,
+        config: Optional[MonitorConfig] = None,
+        status: Optional[MonitorStatus] = None,
+    ) -> None:
+        """An EigerMonitor constructor.
+
+        Args:
+            config: Monitor configuration. Defaults to None.
+            status: Starting status. Defaults to None.
+        """
+        self.config = config or MonitorConfig()
+        self.status = status or MonitorStatus()
+        self._images = deque(maxlen=self.config.buffer_size)
+
+    def begin_series(self) -> None:
+        """Apply the configured buffer size, keeping the most recent images."""
+        if self._images.maxlen != self.config.buffer_size:
+            self._images = deque(self._images, maxlen=self.config.buffer_size)
+
+    def insert_image(self, image: Image, series_id: int) -> None:
+        """Keep an image, dropping the oldest if the buffer is full.
+
+        Args:
+            image: The image with associated metadata.
+            series_id: ID of the acquisition series the image belongs to.
+        """
+        if self.config.mode == "enabled":
+            self._images.append((series_id, image))
+
+    def next_image(self) -> Optional[Tuple[int, Image]]:
+        """Remove and return the oldest image in the buffer.
+
+        Returns:
+            Optional[Tuple[int, Image]]: The series ID and image, or None if the
+                buffer is empty.
+        """
+        return self._images.popleft() if self._images else None
+
+    def latest_image(self) -> Optional[Tuple[int, Image]]:
+        """Get the most recent image, leaving it in the buffer.
+
+        Returns:
+            Optional[Tuple[int, Image]]: The series ID and image, or None if the
+                buffer is empty.
+        """
+        return self._images[-1] if self._images else None
+
+    def image_ids(self) -> List[Tuple[int, int]]:
+        """List the images in the buffer, oldest first.
+
+        Returns:
+            List[Tuple[int, int]]: The series ID and index of each image.
+        """
+        return [(series_id, image.index) for series_id, image in self._images]
@@ -1,20 +1,12 @@
-from dataclasses import dataclass, field, fields
-from typing import Any, List
+from dataclasses import dataclass, field
+from typing import List
 
-from tickit_devices.eiger.eiger_schema import ro_str_list
+from tickit_devices.eiger.eiger_schema import Parameters, indexed_fields, ro_str_list
 
 
+@indexed_fields
 @dataclass
-class MonitorStatus:
+class MonitorStatus(Parameters):
     """Eiger monitor status taken from the API spec."""
 
     error: List[str] = field(default_factory=lambda: [], metadata=ro_str_list())
-
-    def __getitem__(self, key: str) -> Any:  # noqa: D105
-        f = {}
-        for field_ in fields(self):
-            f[field_.name] = {
-                "value": vars(self)[field_.name],
-                "metadata": field_.metadata,
-            }
-        return f[key]
@@ -1,38 +1,92 @@
+import asyncio
+import json
 import logging
-from queue import Queue
-from typing import Any, Iterable, Mapping, TypedDict, Union
+import uuid
+from typing import (
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+    Union,
+)
 
 from pydantic.v1 import BaseModel
 from tickit.core.typedefs import SimTime
 from typing_extensions import TypedDict
 
+from tickit_devices.eiger.data.details import (
+    countrate_table,
+    flatfield,
+    pixel_mask,
+)
 from tickit_devices.eiger.data.dummy_image import Image
 from tickit_devices.eiger.data.schema import (
     AcquisitionDetailsHeader,
     AcquisitionSeriesFooter,
     AcquisitionSeriesHeader,
-    ImageCharacteristicsHeader,
-    ImageConfigHeader,
-    ImageHeader,
 )
+from tickit_devices.eiger.data.stream2 import (
+    ImageMessageTemplate,
+    end_message,
+    start_message,
+)
+from tickit_devices.eiger.data.templates import HeaderTemplateCache
 from tickit_devices.eiger.eiger_settings import EigerSettings
+from tickit_devices.eiger.frame_trace import FrameTrace
+from tickit_devices.eiger.stream.replay import StreamReplay
+from tickit_devices.eiger.stream.stream_buffer import StreamBuffer
 from tickit_devices.eiger.stream.stream_config import StreamConfig
 from tickit_devices.eiger.stream.stream_status import StreamStatus
 
 LOGGER = logging.getLogger(__name__)
 
 
-_Message = Union[BaseModel, Mapping[str, Any], bytes]
+_Message = Union[BaseModel, Mapping[str, Any], bytes, memoryview]
+_TemplateKey = Tuple[int, Tuple[int, int], str, str]
+
+#: Settings sent as blobs of their own rather than in the config header
+_DETAIL_FIELDS = ["flatfield", "pixel_mask", "countrate_correction_table"]
 
 
 class EigerStream:
-    """Simulation of an Eiger stream."""
+    """Simulation of an Eiger stream.
+
+    The stream sends the legacy multipart JSON headers, or with the cbor format one
+    CBOR message per image as the stream2 interface does, with start and end
+    messages around the series. The format is fixed for a series when it begins.
+
+    The config header is encoded once and kept until a setting in it changes, so
+    arming repeatedly does not encode the settings each time. The image header
+    templates can be shared with the streams of other detectors.
+
+    If a trace is given, each image is recorded in it once buffered.
+
+    If a replay is given, the messages of a captured series are sent in place of
+    those the stream would make, with the series and frame numbers rewritten.
+
+    Messages are buffered until drained all at once, everything runs on the event
+    loop so the buffer takes no locks. The data_available event is set while data
+    is buffered, so a consumer can wait for data rather than poll.
+    """
 
     status: StreamStatus
     config: StreamConfig
     callback_period: SimTime
+    trace: Optional[FrameTrace]
+    replay: Optional[StreamReplay]
 
-    _message_buffer: Queue[_Message]
+    _message_buffer: StreamBuffer[_Message]
+    _header_templates: HeaderTemplateCache
+    _image_templates: Dict[_TemplateKey, ImageMessageTemplate]
+    _format: str
+    _series_unique_id: str
+    _config_header: Optional[bytes]
+    _observed_settings: Optional[EigerSettings]
+    _data_available: Optional[asyncio.Event]
 
     class Inputs(TypedDict):
         ...
@@ -40,13 +94,43 @@ class EigerStream:
     class Outputs(TypedDict):
         ...
 
-    def __init__(self, callback_period: int = int(1e9)) -> None:
-        """An Eiger Stream constructor."""
+    def __init__(
+        self,
+        callback_period: int = int(1e9),
+        header_templates: Optional[HeaderTemplateCache] = None,
+        trace: Optional[FrameTrace] = None,
+        replay: Optional[StreamReplay] = None,
+    ) -> None:
+        """An Eiger Stream constructor.
+
+        Args:
+            callback_period: Simulation time (in nanoseconds) between updates while
+                data is buffered. Defaults to 1 second.
+            header_templates: Cache of image header templates, which may be shared
+                with other streams. Defaults to None, a cache of its own.
+            trace: Trace to record buffered images in. Defaults to None, images are
+                not traced.
+            replay: Capture to replay the messages of. Defaults to None, messages
+                are made from the images acquired.
+        """
         self.status = StreamStatus()
         self.config = StreamConfig()
         self.callback_period = SimTime(callback_period)
+        self.trace = trace
+        self.replay = replay
 
-        self._message_buffer = Queue()
+        self._message_buffer = StreamBuffer(
+            self.config.buffer_size, self.config.buffer_policy
+        )
+        self._header_templates = (
+            HeaderTemplateCache() if header_templates is None else header_templates
+        )
+        self._image_templates = {}
+        self._format = self.config.format
+        self._series_unique_id = ""
+        self._config_header = None
+        self._observed_settings = None
+        self._data_available = None
 
     def begin_series(self, settings: EigerSettings, series_id: int) -> None:
         """Send the headers marking the beginning of the acquisition series.
@@ -56,6 +140,24 @@ class EigerStream:
                 headers.
             series_id: ID for the acquisition series.
         """
+        self._image_templates.clear()
+        self._message_buffer.size = self.config.buffer_size
+        self._message_buffer.policy = self.config.buffer_policy
+
+        if self.replay is not None:
+            # Captures are of the legacy format, so end with its footer
+            self._format = "legacy"
+            for parts in self.replay.begin(series_id):
+                self._message_buffer.put(parts)
+            self._signal_data()
+            return
+
+        self._format = self.config.format
+        if self._format == "cbor":
+            self._series_unique_id = uuid.uuid4().hex
+            self._buffer(start_message(settings, series_id, self._series_unique_id))
+            return
+
         header_detail = self.config.header_detail
         header = AcquisitionSeriesHeader(
             header_detail=header_detail,
@@ -64,70 +166,69 @@ class EigerStream:
         self._buffer(header)
 
         if header_detail != "none":
-            config_header = settings.filtered(
-                ["flatfield", "pixelmask" "countrate_correction_table"]
-            )
-            self._buffer(config_header)
+            self._buffer(self._get_config_header(settings))
 
             if header_detail == "all":
-                x = settings.x_pixels_in_detector
-                y = settings.y_pixels_in_detector
-
-                flatfield_header = AcquisitionDetailsHeader(
-                    htype="flatfield-1.0",
-                    shape=(x, y),
-                    type="float32",
-                )
-                self._buffer(flatfield_header)
-                flatfield_data_blob = {"blob": "blob"}
-                self._buffer(flatfield_data_blob)
-
-                pixel_mask_header = AcquisitionDetailsHeader(
-                    htype="dpixelmask-1.0",
-                    shape=(x, y),
-                    type="uint32",
-                )
-                self._buffer(pixel_mask_header)
-                pixel_mask_data_blob = {"blob": "blob"}
-                self._buffer(pixel_mask_data_blob)
-
-                countrate_table_header = AcquisitionDetailsHeader(
-                    htype="dcountrate_table-1.0",
-                    shape=(x, y),
-                    type="float32",
-                )
-                self._buffer(countrate_table_header)
-                countrate_table_data_blob = {"blob": "blob"}
-                self._buffer(countrate_table_data_blob)
-
-    def insert_image(self, image: Image, series_id: int) -> None:
+                for htype, array in [
+                    ("flatfield-1.0", flatfield(settings)),
+                    ("dpixelmask-1.0", pixel_mask(settings)),
+                    ("dcountrate_table-1.0", countrate_table(settings)),
+                ]:
+                    self._buffer(
+                        AcquisitionDetailsHeader(
+                            htype=htype,
+                            shape=tuple(reversed(array.shape)),
+                            type=array.dtype.name,
+                        )
+                    )
+                    # The blob is a view of the array, which is read only
+                    self._buffer(array.data.cast("B"))
+
+    def insert_image(self, image: Image, series_id: int) -> int:
         """Send headers and an data blob for a single image.
 
+        The headers are rendered from templates that are built once per series,
+        shape and encoding, so only the per-image fields are encoded here.
+
         Args:
             image: The image with associated metadata
             series_id: ID for the acquisition series.
+
+        Returns:
+            int: The size of the image data sent in bytes, that of the whole
+                captured message when replaying.
         """
-        header = ImageHeader(
-            frame=image.index,
-            hash=image.hash,
-            series=series_id,
-        )
-        characteristics_header = ImageCharacteristicsHeader(
-            encoding=image.encoding,
-            shape=image.shape,
-            size=len(image.data),
-            type=image.dtype,
-        )
-        config_header = ImageConfigHeader(
-            real_time=0.0,
-            start_time=0.0,
-            stop_time=0.0,
-        )
+        message: Sequence[_Message]
+        nbytes = len(image.data)
+        if self.replay is not None:
+            replayed = self.replay.next_image(series_id, image.index)
+            nbytes = sum(len(part) for part in replayed)
+            message = replayed
+        elif self._format == "cbor":
+            message = (self._get_image_template(image, series_id).render(image),)
+        else:
+            templates = self._header_templates.get(
+                series_id, image.shape, image.encoding, image.dtype
+            )
+            message = (
+                templates.image.render(frame=image.index, hash=image.hash),
+                templates.characteristics.render(size=len(image.data)),
+                image.data,
+                templates.config.render(
+                    real_time=image.real_time,
+                    start_time=image.start_time,
+                    stop_time=image.stop_time,
+                ),
+            )
 
-        self._buffer(header)
-        self._buffer(characteristics_header)
-        self._buffer(image.data)
-        self._buffer(config_header)
+        dropped = self._message_buffer.put_image(message)
+        self._signal_data()
+        if self.trace is not None:
+            self.trace.frame_buffered(dropped, self._message_buffer.policy)
+        if dropped:
+            LOGGER.debug(f"Stream buffer full, dropped {dropped} image(s)")
+            self.status.dropped += dropped
+        return nbytes
 
     def end_series(self, series_id: int) -> None:
         """Send footer marking the end of an acquisition series.
@@ -135,17 +236,90 @@ class EigerStream:
         Args:
             series_id: ID of the series to end.
         """
-        footer = AcquisitionSeriesFooter(series=series_id)
-        self._buffer(footer)
+        if self._format == "cbor":
+            self._buffer(end_message(series_id, self._series_unique_id))
+        else:
+            footer = AcquisitionSeriesFooter(series=series_id)
+            self._buffer(footer)
 
-    def consume_data(self) -> Iterable[_Message]:
-        """Consume all headers and data buffered by other methods.
+    def drain(self) -> List[_Message]:
+        """Consume all headers and data buffered by other methods, in one call.
 
         Returns:
-            Iterable[_Message]: Iterable of headers and data
+            List[_Message]: List of headers and data
         """
-        while not self._message_buffer.empty():
-            yield self._message_buffer.get()
+        if self._data_available is not None:
+            self._data_available.clear()
+        return self._message_buffer.drain()
+
+    @property
+    def data_available(self) -> asyncio.Event:
+        """Event that is set while there is buffered data waiting to be drained.
+
+        Property ensures the event is created.
+        """
+        if self._data_available is None:
+            self._data_available = asyncio.Event()
+            if self._message_buffer:
+                self._data_available.set()
+        return self._data_available
+
+    @property
+    def pending(self) -> bool:
+        """Whether there is buffered data waiting to be consumed."""
+        return bool(self._message_buffer)
+
+    @property
+    def buffered_images(self) -> int:
+        """The number of images buffered waiting to be consumed."""
+        return self._message_buffer.images
+
+    @property
+    def blocked(self) -> bool:
+        """Whether the buffer is full and images should not be added until drained.
+
+        Only applies to the "block" buffer policy, the other policies drop images
+        instead.
+        """
+        return self._message_buffer.policy == "block" and self._message_buffer.full
+
+    @property
+    def buffer_free(self) -> float:
+        """The fraction of the image buffer that is free, between 0 and 1."""
+        return self._message_buffer.free
+
+    def _get_config_header(self, settings: EigerSettings) -> bytes:
+        if settings is not self._observed_settings:
+            settings.observe(self._invalidate_config_header)
+            self._observed_settings = settings
+            self._config_header = None
+        if self._config_header is None:
+            header = settings.filtered(_DETAIL_FIELDS)
+            self._config_header = json.dumps(header).encode("utf_8")
+        return self._config_header
+
+    def _invalidate_config_header(self, name: str) -> None:
+        if name not in _DETAIL_FIELDS:
+            self._config_header = None
+
+    def _get_image_template(self, image: Image, series_id: int) -> ImageMessageTemplate:
+        key = (series_id, image.shape, image.encoding, image.dtype)
+        template = self._image_templates.get(key)
+        if template is None:
+            template = ImageMessageTemplate(
+                series_id,
+                self._series_unique_id,
+                image.shape,
+                image.encoding,
+                image.dtype,
+            )
+            self._image_templates[key] = template
+        return template
 
     def _buffer(self, message: _Message) -> None:
-        self._message_buffer.put_nowait(message)
+        self._message_buffer.put((message,))
+        self._signal_data()
+
+    def _signal_data(self) -> None:
+        if self._data_available is not None:
+            self._data_available.set()
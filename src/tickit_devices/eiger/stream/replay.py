@@ -0,0 +1,197 @@
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from tickit_devices.eiger.data.capture import CAPTURE_BUFFER_SIZE, CaptureReader
+from tickit_devices.eiger.trigger_schedule import RecordedSchedule, TriggerSchedule
+
+LOGGER = logging.getLogger(__name__)
+
+#: How fast a capture is replayed, at the recorded cadence or as fast as possible
+CADENCES = ["recorded", "fast"]
+
+_IMAGE_HTYPE = "dimage-1.0"
+_FOOTER_HTYPE = "dseries_end-1.0"
+
+
+class StreamReplay:
+    """Replays the series recorded in a capture of a real detector's stream.
+
+    The capture is read once when opened to find its messages and the times its
+    images were received, then read sequentially as each series is sent. The
+    series header messages are sent when the series begins and then one captured
+    image message for each frame acquired, going back to the first image of the
+    capture when they run out. The series and frame numbers in the headers are
+    rewritten to those of the series being sent, the data is sent as captured.
+
+    Only the first series of the capture is replayed, and the capture must be of
+    the legacy stream format, whose messages begin with a JSON header.
+    """
+
+    path: Path
+    cadence: str
+
+    _reader: CaptureReader
+    _start: int
+    _first_image: int
+    _offsets: np.ndarray
+    _span: int
+    _cursor: int
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        cadence: str = "recorded",
+        buffer_size: int = CAPTURE_BUFFER_SIZE,
+    ) -> None:
+        """A StreamReplay constructor.
+
+        Args:
+            path: The capture file to replay.
+            cadence: One of CADENCES, "recorded" sends each image as long after the
+                first as it was received, "fast" sends them as fast as possible.
+                Defaults to "recorded".
+            buffer_size: Size of the reads made from the capture. Defaults to
+                CAPTURE_BUFFER_SIZE.
+
+        Raises:
+            ValueError: If the cadence is unknown, or the capture holds no images
+                or messages which are not of the legacy stream format.
+        """
+        if cadence not in CADENCES:
+            raise ValueError(f"Unknown replay cadence: {cadence}")
+        self.path = Path(path)
+        self.cadence = cadence
+        self._reader = CaptureReader(path, buffer_size)
+        self._start = self._reader.tell()
+        self._first_image = self._start
+        self._cursor = 0
+
+        timestamps: List[int] = []
+        position = self._start
+        for record in self._reader.first_parts():
+            htype = _header(record.parts)["htype"]
+            if htype == _IMAGE_HTYPE:
+                if not timestamps:
+                    self._first_image = position
+                timestamps.append(record.timestamp)
+            elif htype == _FOOTER_HTYPE:
+                break
+            position = self._reader.tell()
+        if not timestamps:
+            self._reader.close()
+            raise ValueError(f"No images found in capture {self.path}")
+
+        self._offsets = np.array(timestamps, dtype=np.int64) - timestamps[0]
+        # The capture repeats a typical frame period after its last image
+        period = int(np.median(np.diff(self._offsets))) if len(timestamps) > 1 else 0
+        self._span = int(self._offsets[-1]) + period
+        self._reader.seek(self._first_image)
+        LOGGER.debug(f"Replaying {len(timestamps)} images from {self.path}")
+
+    @property
+    def images(self) -> int:
+        """The number of images in the capture."""
+        return len(self._offsets)
+
+    def begin(self, series_id: int) -> List[List[bytes]]:
+        """Read the captured messages sent at the beginning of a series.
+
+        The next image sent is the first image of the capture.
+
+        Args:
+            series_id: ID of the acquisition series.
+
+        Returns:
+            List[List[bytes]]: The parts of each message, for the series given.
+
+        Raises:
+            ValueError: If the capture has been cut short since it was opened.
+        """
+        self._reader.seek(self._start)
+        messages = []
+        while self._reader.tell() < self._first_image:
+            record = self._reader.read()
+            if record is None:
+                raise ValueError(f"Capture {self.path} ended before its first image")
+            messages.append(_rewrite(record.parts, series=series_id))
+        self._cursor = 0
+        return messages
+
+    def next_image(self, series_id: int, frame: int) -> List[bytes]:
+        """Read the next captured image message.
+
+        Args:
+            series_id: ID of the acquisition series.
+            frame: Index of the image in the series.
+
+        Returns:
+            List[bytes]: The parts of the message, for the series and frame given.
+
+        Raises:
+            ValueError: If the capture has been cut short since it was opened.
+        """
+        if self._cursor >= self.images:
+            self._reader.seek(self._first_image)
+            self._cursor = 0
+        while True:
+            record = self._reader.read()
+            if record is None:
+                raise ValueError(f"Capture {self.path} ended before its last image")
+            if _header(record.parts)["htype"] == _IMAGE_HTYPE:
+                break
+        self._cursor += 1
+        return _rewrite(record.parts, series=series_id, frame=frame)
+
+    def schedule(self, frames: int, exposure: float) -> TriggerSchedule:
+        """Make the schedule of the next images sent following a trigger.
+
+        Args:
+            frames: The number of frames acquired following the trigger.
+            exposure: Exposure time of each frame in nanoseconds.
+
+        Returns:
+            TriggerSchedule: The schedule, of the recorded cadence of the images or
+                with every frame due at once.
+        """
+        if self.cadence == "fast":
+            return TriggerSchedule(frames=frames, period=0, exposure=exposure)
+        # The frame after the last marks the end of the trigger
+        index = self._cursor % self.images + np.arange(frames + 1, dtype=np.int64)
+        laps, image = np.divmod(index, self.images)
+        deadlines = laps * self._span + self._offsets[image]
+        return RecordedSchedule(
+            frames=frames,
+            period=0,
+            exposure=exposure,
+            offsets=deadlines - deadlines[0],
+        )
+
+    def close(self) -> None:
+        """Close the capture file."""
+        self._reader.close()
+
+
+def _header(parts: List[bytes]) -> Dict[str, Any]:
+    header: Optional[Dict[str, Any]] = None
+    if parts and parts[0][:1] == b"{":
+        try:
+            header = json.loads(parts[0])
+        except ValueError:
+            pass
+    if not isinstance(header, dict) or "htype" not in header:
+        raise ValueError("Captured message is not of the legacy stream format")
+    return header
+
+
+def _rewrite(parts: List[bytes], **values: int) -> List[bytes]:
+    # Only the first part of a legacy message holds the series and frame numbers
+    header = _header(parts)
+    changed = {name: value for name, value in values.items() if name in header}
+    if not changed:
+        return parts
+    header.update(changed)
+    return [json.dumps(header).encode("utf_8"), *parts[1:]]
@@ -0,0 +1,106 @@
+from collections import deque
+from typing import Deque, Generic, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+BUFFER_POLICIES = ["block", "drop_oldest", "drop_newest"]
+
+
+class StreamBuffer(Generic[T]):
+    """A bounded buffer of stream messages, counted in images.
+
+    Each entry is a whole message (all the parts sent for an image, or a single
+    series header/footer) so that dropping never leaves a partial image in the
+    stream. Only images count towards the size and only images are ever dropped,
+    the series headers and footers are always kept.
+
+    What happens when an image is added to a full buffer depends on the policy:
+
+    block: The image is kept, the producer is expected to check ``full`` and wait.
+    drop_oldest: The oldest buffered image is discarded to make room.
+    drop_newest: The new image is discarded.
+    """
+
+    size: int
+    policy: str
+
+    _messages: Deque[Tuple[bool, Sequence[T]]]
+    _images: int
+
+    def __init__(self, size: int = 512, policy: str = "block") -> None:
+        """A StreamBuffer constructor.
+
+        Args:
+            size: The number of images the buffer can hold. Defaults to 512.
+            policy: What to do when the buffer is full, one of BUFFER_POLICIES.
+                Defaults to "block".
+        """
+        self.size = size
+        self.policy = policy
+        self._messages = deque()
+        self._images = 0
+
+    @property
+    def images(self) -> int:
+        """The number of images currently buffered."""
+        return self._images
+
+    @property
+    def full(self) -> bool:
+        """Whether the buffer holds as many images as its size."""
+        return self._images >= self.size
+
+    @property
+    def free(self) -> float:
+        """The fraction of the buffer that is free, between 0 and 1."""
+        if self.size <= 0:
+            return 0.0
+        return max(0.0, 1.0 - self._images / self.size)
+
+    def __bool__(self) -> bool:  # noqa: D105
+        return bool(self._messages)
+
+    def put(self, message: Sequence[T]) -> None:
+        """Add a message which is not an image, it is never dropped.
+
+        Args:
+            message: The parts of the message.
+        """
+        self._messages.append((False, message))
+
+    def put_image(self, message: Sequence[T]) -> int:
+        """Add the parts of an image, applying the policy if the buffer is full.
+
+        Args:
+            message: The headers and data of the image.
+
+        Returns:
+            int: The number of images dropped to honour the policy (0 or 1).
+        """
+        if self.full and self.policy != "block":
+            if self.policy == "drop_oldest" and self._drop_oldest_image():
+                self._messages.append((True, message))
+            return 1
+        self._messages.append((True, message))
+        self._images += 1
+        return 0
+
+    def drain(self) -> List[T]:
+        """Remove the parts of every buffered message in order, in one list.
+
+        Returns:
+            List[T]: The message parts.
+        """
+        parts: List[T] = []
+        for _, message in self._messages:
+            parts += message
+        self._messages.clear()
+        self._images = 0
+        return parts
+
+    def _drop_oldest_image(self) -> bool:
+        for index, (is_image, _) in enumerate(self._messages):
+            if is_image:
+                del self._messages[index]
+                return True
+        return False
@@ -1,30 +1,26 @@
-from dataclasses import dataclass, field, fields
-from typing import Any
+from dataclasses import dataclass, field
 
-from tickit_devices.eiger.eiger_schema import rw_str
+from tickit_devices.eiger.eiger_schema import Parameters, indexed_fields, rw_int, rw_str
+from tickit_devices.eiger.stream.stream_buffer import BUFFER_POLICIES
 
 
+@indexed_fields
 @dataclass
-class StreamConfig:
+class StreamConfig(Parameters):
     """Eiger stream configuration taken from the API spec."""
 
     mode: str = field(
         default="enabled", metadata=rw_str(allowed_values=["disabled", "enabled"])
     )
+    format: str = field(
+        default="legacy", metadata=rw_str(allowed_values=["legacy", "cbor"])
+    )
     header_detail: str = field(
         default="basic", metadata=rw_str(allowed_values=["none", "basic", "all"])
     )
     header_appendix: str = field(default="", metadata=rw_str())
     image_appendix: str = field(default="", metadata=rw_str())
-
-    def __getitem__(self, key: str) -> Any:  # noqa: D105
-        f = {}
-        for field_ in fields(self):
-            f[field_.name] = {
-                "value": vars(self)[field_.name],
-                "metadata": field_.metadata,
-            }
-        return f[key]
-
-    def __setitem__(self, key: str, value: Any) -> None:  # noqa: D105
-        self.__dict__[key] = value
+    buffer_size: int = field(default=512, metadata=rw_int(min=1))
+    buffer_policy: str = field(
+        default="block", metadata=rw_str(allowed_values=BUFFER_POLICIES)
+    )
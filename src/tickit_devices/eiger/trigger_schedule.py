@@ -0,0 +1,152 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from tickit.core.typedefs import SimTime
+
+
+@dataclass
+class TriggerSchedule:
+    """The frames acquired following a single trigger, at regular deadlines.
+
+    Frame k of the trigger is due at origin + k * period, so the frames due at any
+    time are counted arithmetically rather than tracked one by one. The origin is
+    set by the first update after the trigger, and moves later if the detector has
+    to wait before acquiring a frame.
+
+    Times are in nanoseconds.
+    """
+
+    frames: int
+    period: int
+    exposure: float
+    origin: Optional[SimTime] = None
+    acquired: int = 0
+
+    @property
+    def remaining(self) -> int:
+        """The number of frames of the trigger not yet acquired."""
+        return self.frames - self.acquired
+
+    @property
+    def complete(self) -> bool:
+        """Whether every frame of the trigger has been acquired."""
+        return self.acquired >= self.frames
+
+    def start(self, time: SimTime) -> None:
+        """Set the time of the first frame, if not already started.
+
+        Args:
+            time: The time the first frame is due.
+        """
+        if self.origin is None:
+            self.origin = time
+
+    def deadline(self, frame: int) -> SimTime:
+        """The time a frame of the trigger is due.
+
+        Args:
+            frame: The index of the frame within the trigger.
+
+        Returns:
+            SimTime: The time the frame is due.
+        """
+        assert self.origin is not None, "Trigger schedule has not started"
+        return SimTime(self.origin + frame * self.period)
+
+    def next_deadline(self) -> SimTime:
+        """The time the next frame to acquire is due, or the trigger ends."""
+        return self.deadline(self.acquired)
+
+    def due(self, time: SimTime, window: int = 0) -> int:
+        """Count the frames due by a time, or within a window after it.
+
+        Args:
+            time: The current time.
+            window: Frames due before time + window are counted as well. Defaults
+                to 0.
+
+        Returns:
+            int: The number of frames due which have not been acquired.
+        """
+        assert self.origin is not None, "Trigger schedule has not started"
+        if self.period <= 0:
+            return self.remaining
+        elapsed = time - self.origin
+        by_time = elapsed // self.period + 1 if elapsed >= 0 else 0
+        by_window = -(-(elapsed + window) // self.period) if window > 0 else 0
+        due = min(max(by_time, by_window), self.frames)
+        return int(max(due - self.acquired, 0))
+
+    def delay(self, time: SimTime, wait: int) -> None:
+        """Push the next frame back to a period after time, if not already later.
+
+        Args:
+            time: The time the next frame could not be acquired.
+            wait: The time to wait instead if there is no period between frames,
+                so the frame is never due again at the same time.
+        """
+        assert self.origin is not None, "Trigger schedule has not started"
+        step = self.period if self.period > 0 else max(wait, 1)
+        earliest = time + step - self.acquired * self.period
+        self.origin = SimTime(max(self.origin, earliest))
+
+
+@dataclass
+class RecordedSchedule(TriggerSchedule):
+    """The frames acquired following a single trigger, at recorded deadlines.
+
+    Frame k of the trigger is due at origin + offsets[k], so frames follow the
+    cadence they were recorded at rather than a regular period. offsets never
+    decrease and has one more entry than there are frames, the time the trigger
+    ends.
+
+    Times are in nanoseconds.
+    """
+
+    offsets: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=np.int64))
+
+    def deadline(self, frame: int) -> SimTime:
+        """The time a frame of the trigger is due.
+
+        Args:
+            frame: The index of the frame within the trigger.
+
+        Returns:
+            SimTime: The time the frame is due.
+        """
+        assert self.origin is not None, "Trigger schedule has not started"
+        return SimTime(self.origin + int(self.offsets[frame]))
+
+    def due(self, time: SimTime, window: int = 0) -> int:
+        """Count the frames due by a time, or within a window after it.
+
+        Args:
+            time: The current time.
+            window: Frames due before time + window are counted as well. Defaults
+                to 0.
+
+        Returns:
+            int: The number of frames due which have not been acquired.
+        """
+        assert self.origin is not None, "Trigger schedule has not started"
+        deadlines = self.offsets[: self.frames]
+        elapsed = time - self.origin
+        due = int(np.searchsorted(deadlines, elapsed, side="right"))
+        if window > 0:
+            due = max(due, int(np.searchsorted(deadlines, elapsed + window)))
+        return max(due - self.acquired, 0)
+
+    def delay(self, time: SimTime, wait: int) -> None:
+        """Push the next frame back to its recorded gap after time, if not later.
+
+        Args:
+            time: The time the next frame could not be acquired.
+            wait: The time to wait instead if there is no recorded gap before the
+                frame, so the frame is never due again at the same time.
+        """
+        assert self.origin is not None, "Trigger schedule has not started"
+        offset = int(self.offsets[self.acquired])
+        gap = offset - int(self.offsets[self.acquired - 1]) if self.acquired else 0
+        gap = gap if gap > 0 else max(wait, 1)
+        self.origin = SimTime(max(self.origin, time + gap - offset))
@@ -1,18 +1,33 @@
 import itertools
+from typing import List
 from unittest.mock import ANY
 
 import pytest
 from mock import MagicMock, Mock
 from tickit.core.typedefs import SimTime
 
+from tickit_devices.eiger.data.dummy_image import Image
+from tickit_devices.eiger.data.frame_pool import FramePool
 from tickit_devices.eiger.eiger import EigerDevice
 from tickit_devices.eiger.eiger_status import State
+from tickit_devices.eiger.filewriter.eiger_filewriter import EigerFileWriter
+from tickit_devices.eiger.filewriter.filewriter_config import FileWriterConfig
+from tickit_devices.eiger.filewriter.filewriter_status import FileWriterStatus
+from tickit_devices.eiger.metrics import EigerMetrics
 from tickit_devices.eiger.stream.eiger_stream import EigerStream
 
+FRAME_PERIOD = int(0.12 * 1e9)
+
 
 @pytest.fixture
 def mock_stream() -> EigerStream:
-    return MagicMock(EigerStream)
+    stream = MagicMock(EigerStream)
+    stream.blocked = False
+    stream.pending = False
+    stream.buffer_free = 1.0
+    stream.replay = None
+    stream.callback_period = SimTime(int(1e9))
+    return stream
 
 
 @pytest.fixture
@@ -159,8 +174,8 @@ async def test_acquire_frames_in_ints_mode(
 
         # Extra update cleans up state
         for i in range(num_frames):
-            update = eiger.update(SimTime(i), {})
-            assert update.call_at == SimTime(i + int(0.12 * 1e9))
+            update = eiger.update(SimTime(i * FRAME_PERIOD), {})
+            assert update.call_at == SimTime((i + 1) * FRAME_PERIOD)
 
         update = eiger.update(SimTime(0.0), {})
         assert update.call_at is None
@@ -198,8 +213,8 @@ async def test_acquire_frames_in_exts_mode(
 
         # Extra update cleans up state
         for i in range(num_frames):
-            update = eiger.update(SimTime(i), {})
-            assert update.call_at == SimTime(i + int(0.12 * 1e9))
+            update = eiger.update(SimTime(i * FRAME_PERIOD), {})
+            assert update.call_at == SimTime((i + 1) * FRAME_PERIOD)
 
         update = eiger.update(SimTime(0.0), {})
         assert update.call_at is None
@@ -240,5 +255,321 @@ async def test_abort_mid_acquisition(
         assert_in_state(eiger, State.IDLE)
 
 
+@pytest.mark.asyncio
+async def test_blocked_stream_delays_acquisition(eiger: EigerDevice, mock_stream: Mock):
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    eiger.settings.nimages = 2
+    await eiger.arm()
+    await eiger.trigger()
+
+    mock_stream.blocked = True
+    mock_stream.buffer_free = 0.0
+    update = eiger.update(SimTime(0), {})
+    assert update.call_at == SimTime(int(0.12 * 1e9))
+    mock_stream.insert_image.assert_not_called()
+    assert eiger.status.dcu_buffer_free == 0.0
+
+    mock_stream.blocked = False
+    mock_stream.buffer_free = 0.5
+    eiger.update(SimTime(int(0.12 * 1e9)), {})
+    mock_stream.insert_image.assert_called_once_with(ANY, 1)
+    assert eiger.status.dcu_buffer_free == 0.5
+
+
+@pytest.mark.asyncio
+async def test_batched_acquisition(mock_stream: Mock):
+    eiger = EigerDevice(stream=mock_stream, batch_period=SimTime(int(0.01 * 1e9)))
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    eiger.settings.nimages = 25
+    eiger.settings.count_time = 0.0005
+    eiger.settings.frame_time = 0.001
+    await eiger.arm()
+    await eiger.trigger()
+
+    time = SimTime(5000)
+    call_times = []
+    while (update := eiger.update(time, {})).call_at is not None:
+        call_times.append(update.call_at)
+        time = update.call_at
+
+    assert call_times == [
+        SimTime(5000 + 10_000_000),
+        SimTime(5000 + 20_000_000),
+        SimTime(5000 + 25_000_000),
+    ]
+    images = [call.args[0] for call in mock_stream.insert_image.call_args_list]
+    assert [image.index for image in images] == list(range(25))
+    assert [image.start_time for image in images] == [
+        i * 1_000_000.0 for i in range(25)
+    ]
+    assert all(image.stop_time - image.start_time == 500_000.0 for image in images)
+    assert all(image.real_time == 500_000.0 for image in images)
+    assert_in_state(eiger, State.IDLE)
+
+
+@pytest.mark.asyncio
+async def test_batch_stops_when_stream_blocks(mock_stream: Mock):
+    eiger = EigerDevice(stream=mock_stream, batch_period=SimTime(int(1e9)))
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    eiger.settings.nimages = 10
+    eiger.settings.frame_time = 0.01
+    await eiger.arm()
+    await eiger.trigger()
+
+    def insert_image(image, series_id):
+        mock_stream.blocked = image.index >= 2
+
+    mock_stream.insert_image.side_effect = insert_image
+    update = eiger.update(SimTime(0), {})
+    assert mock_stream.insert_image.call_count == 3
+    assert update.call_at == SimTime(3 * int(0.01 * 1e9))
+
+
+@pytest.mark.asyncio
+async def test_acquire_from_frame_pool(mock_stream: Mock):
+    frame_pool = MagicMock(FramePool)
+    eiger = EigerDevice(stream=mock_stream, frame_pool=frame_pool)
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    eiger.settings.bit_depth_image = 32
+    eiger.settings.compression = "lz4"
+    await eiger.arm()
+    frame_pool.prepare.assert_called_once_with(
+        (4148, 4362), "uint32", "lz4", (4148, 4362)
+    )
+
+    await eiger.trigger()
+    eiger.update(SimTime(0), {})
+    frame_pool.image.assert_called_once_with(0)
+    mock_stream.insert_image.assert_called_once_with(frame_pool.image.return_value, 1)
+
+
+@pytest.mark.asyncio
+async def test_roi_frames_are_cut_from_whole_sensor(mock_stream: Mock):
+    frame_pool = MagicMock(FramePool)
+    eiger = EigerDevice(stream=mock_stream, frame_pool=frame_pool)
+    await eiger.initialize()
+    eiger.settings["roi_mode"] = "4M"
+    await eiger.arm()
+    frame_pool.prepare.assert_called_once_with(
+        (2068, 2162), "uint16", "bslz4", (4148, 4362)
+    )
+
+
+@pytest.mark.asyncio
+async def test_roi_sample_frames_are_smaller(mock_stream: Mock):
+    eiger = EigerDevice(stream=mock_stream)
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    eiger.settings["roi_mode"] = "4M"
+    await eiger.arm()
+    await eiger.trigger()
+    eiger.update(SimTime(0), {})
+
+    image = mock_stream.insert_image.call_args.args[0]
+    assert image.shape == (2068, 2162)
+    assert len(image.data) < len(Image.create_dummy_image(0, (1, 1)).data)
+
+
+@pytest.mark.asyncio
+async def test_frames_and_series_are_counted_in_metrics(mock_stream: Mock):
+    metrics = EigerMetrics()
+    eiger = EigerDevice(
+        stream=mock_stream, batch_period=SimTime(int(1e9)), metrics=metrics
+    )
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    eiger.settings.nimages = 3
+    for _ in range(2):
+        await eiger.arm()
+        await eiger.trigger()
+        eiger.update(SimTime(0), {})
+    assert metrics.series == 2
+    assert metrics.frames_acquired == 6
+
+
+@pytest.mark.asyncio
+async def test_acquired_frames_are_written_to_file(mock_stream: Mock):
+    filewriter = MagicMock(EigerFileWriter)
+    filewriter.config = FileWriterConfig()
+    filewriter.status = FileWriterStatus()
+    eiger = EigerDevice(stream=mock_stream, filewriter=filewriter)
+    assert eiger.filewriter_config is filewriter.config
+    assert eiger.filewriter_status is filewriter.status
+
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    await eiger.arm()
+    filewriter.begin_series.assert_called_once_with(eiger.settings, 1)
+
+    await eiger.trigger()
+    eiger.update(SimTime(0), {})
+    filewriter.write_image.assert_called_once_with(
+        mock_stream.insert_image.call_args[0][0]
+    )
+    eiger.update(SimTime(int(0.12 * 1e9)), {})
+    filewriter.end_series.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_progress_is_reported_in_status(eiger: EigerDevice):
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    eiger.settings.nimages = 3
+    await eiger.arm()
+    assert (eiger.status.frames_acquired, eiger.status.frames_remaining) == (0, 3)
+    assert eiger.status.time_remaining == pytest.approx(3 * 0.12)
+
+    await eiger.trigger()
+    eiger.update(SimTime(0), {})
+    assert (eiger.status.frames_acquired, eiger.status.frames_remaining) == (1, 2)
+    assert eiger.status.time_remaining == pytest.approx(2 * 0.12)
+
+    eiger.update(SimTime(int(0.12 * 1e9)), {})
+    eiger.update(SimTime(int(0.24 * 1e9)), {})
+    assert (eiger.status.frames_acquired, eiger.status.frames_remaining) == (3, 0)
+    assert eiger.status.time_remaining == 0.0
+
+
+@pytest.mark.asyncio
+async def test_ntrigger_series_waits_for_each_trigger(
+    eiger: EigerDevice, mock_stream: Mock
+):
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    eiger.settings.nimages = 2
+    eiger.settings.ntrigger = 3
+    await eiger.arm()
+    assert eiger.status.frames_remaining == 6
+
+    for trigger in range(3):
+        assert_in_state(eiger, State.READY)
+        await eiger.trigger()
+        eiger.update(SimTime(0), {})
+        eiger.update(SimTime(FRAME_PERIOD), {})
+        eiger.update(SimTime(2 * FRAME_PERIOD), {})
+        assert eiger.finished_aquisition.is_set()
+
+    images = [call.args[0] for call in mock_stream.insert_image.call_args_list]
+    assert [image.index for image in images] == list(range(6))
+    mock_stream.end_series.assert_called_once_with(1)
+    assert_in_state(eiger, State.IDLE)
+
+
+@pytest.mark.asyncio
+async def test_inte_exposes_each_frame_for_given_time(
+    eiger: EigerDevice, mock_stream: Mock
+):
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "inte"
+    eiger.settings.nimages = 2
+    await eiger.arm()
+
+    await eiger.trigger(0.5)
+    update = eiger.update(SimTime(0), {})
+    # The exposure is followed by the readout
+    assert update.call_at == SimTime(int(0.51e9))
+    eiger.update(update.call_at, {})
+    assert_in_state(eiger, State.READY)
+
+    await eiger.trigger()
+    eiger.update(SimTime(int(1e9)), {})
+    eiger.update(SimTime(int(2e9)), {})
+    assert_in_state(eiger, State.IDLE)
+
+    images = [call.args[0] for call in mock_stream.insert_image.call_args_list]
+    assert [image.real_time for image in images] == [0.5e9, 0.1e9]
+    assert [image.start_time for image in images] == [0.0, 1e9]
+
+
+@pytest.mark.asyncio
+async def test_inte_triggers_are_limited_to_min_frame_time(
+    eiger: EigerDevice, mock_stream: Mock
+):
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "inte"
+    eiger.settings.detector_readout_time = 1e-6
+    eiger.settings.nimages = 1
+    await eiger.arm()
+
+    await eiger.trigger(1e-6)
+    update = eiger.update(SimTime(0), {})
+    assert update.call_at == SimTime(int(eiger.settings.min_frame_time * 1e9))
+
+
+@pytest.mark.asyncio
+async def test_exte_exposes_frame_for_trigger_pulse(
+    eiger: EigerDevice, mock_stream: Mock
+):
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "exte"
+    eiger.settings.nimages = 1
+    eiger.settings.ntrigger = 2
+    await eiger.arm()
+
+    for start, stop in [(1000, 3000), (10_000, 15_000)]:
+        eiger.update(SimTime(start), {"trigger": True})
+        assert_in_state(eiger, State.ACQUIRE)
+        eiger.update(SimTime(stop), {"trigger": False})
+
+    images = [call.args[0] for call in mock_stream.insert_image.call_args_list]
+    assert [image.real_time for image in images] == [2000.0, 5000.0]
+    assert [image.start_time for image in images] == [0.0, 9000.0]
+    mock_stream.end_series.assert_called_once_with(1)
+    assert_in_state(eiger, State.IDLE)
+
+
+@pytest.mark.asyncio
+async def test_full_dcu_buffer_holds_back_acquisition(mock_stream: Mock):
+    frame_size = len(Image.create_dummy_image(0, (1, 1)).data)
+    # Two frames fit, and a frame drains every four frame periods
+    eiger = EigerDevice(
+        stream=mock_stream,
+        network_bandwidth=frame_size / (4 * 0.12),
+        dcu_buffer_size=2 * frame_size,
+    )
+    mock_stream.callback_period = SimTime(FRAME_PERIOD)
+    mock_stream.insert_image.return_value = frame_size
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    eiger.settings.nimages = 4
+    await eiger.arm()
+    await eiger.trigger()
+
+    time = SimTime(0)
+    acquired_at: List[SimTime] = []
+    while (update := eiger.update(time, {})).call_at is not None:
+        if mock_stream.insert_image.call_count > len(acquired_at):
+            acquired_at.append(time)
+        time = update.call_at
+
+    assert acquired_at == [
+        SimTime(0),
+        SimTime(FRAME_PERIOD),
+        SimTime(2 * FRAME_PERIOD),
+        SimTime(5 * FRAME_PERIOD),
+    ]
+    assert eiger.status.dcu_buffer_free == 1.0
+    assert_in_state(eiger, State.IDLE)
+
+
+@pytest.mark.asyncio
+async def test_update_calls_back_until_stream_consumed(
+    eiger: EigerDevice, mock_stream: Mock
+):
+    await eiger.initialize()
+    mock_stream.callback_period = SimTime(100)
+    mock_stream.pending = True
+    update = eiger.update(SimTime(10), {})
+    assert update.call_at == SimTime(110)
+
+    mock_stream.pending = False
+    update = eiger.update(SimTime(20), {})
+    assert update.call_at is None
+
+
 def assert_in_state(eiger: EigerDevice, state: State) -> None:
     assert state is eiger.get_state()
@@ -1,14 +1,32 @@
+import asyncio
+import json
+from dataclasses import fields
+
+import numpy as np
+import pytest
 from pytest_mock import MockerFixture
 
-from tickit_devices.eiger.eiger_adapters import EigerZMQAdapter
+from tickit_devices.eiger.data.darray import decode_darray, encode_darray
+from tickit_devices.eiger.data.tiff import read_tiff, write_tiff
+from tickit_devices.eiger.eiger import EigerDevice
+from tickit_devices.eiger.eiger_adapters import (
+    EigerRESTAdapter,
+    EigerZMQAdapter,
+    StreamMessage,
+)
+from tickit_devices.eiger.eiger_schema import construct_value
+from tickit_devices.eiger.eiger_settings import EigerSettings
+from tickit_devices.eiger.eiger_status import State
+from tickit_devices.eiger.frame_trace import STAGES, FrameTrace
+from tickit_devices.eiger.metrics import EigerMetrics
 
 
 def test_after_update(mocker: MockerFixture) -> None:
     test_data = [b"data", b"some more data"]
 
-    # Mock consume_data to return with data the first time and nothing the second time
+    # Mock drain to return with data the first time and nothing the second time
     device_mock = mocker.MagicMock()
-    device_mock.stream.consume_data.side_effect = [test_data, []]
+    device_mock.stream.drain.side_effect = [test_data, []]
 
     zmq_adapter = EigerZMQAdapter(device_mock)
     add_mock = mocker.patch.object(zmq_adapter, "add_message_to_stream")
@@ -19,3 +37,507 @@ def test_after_update(mocker: MockerFixture) -> None:
     add_mock.reset_mock()
     zmq_adapter.after_update()
     add_mock.assert_not_called()
+
+
+def test_after_update_waits_for_previous_message(mocker: MockerFixture) -> None:
+    device_mock = mocker.MagicMock()
+    device_mock.stream.drain.side_effect = [[b"first"], [b"second"]]
+
+    zmq_adapter = EigerZMQAdapter(device_mock)
+
+    # The first message has not been taken by the io so the second stays buffered
+    zmq_adapter.after_update()
+    zmq_adapter.after_update()
+    device_mock.stream.drain.assert_called_once()
+
+
+def test_dropped_message_counts_its_images(mocker: MockerFixture) -> None:
+    metrics = EigerMetrics()
+    device = EigerDevice(metrics=metrics)
+    zmq_adapter = EigerZMQAdapter(device)
+    add_mock = mocker.patch.object(zmq_adapter, "add_message_to_stream")
+    device.stream._message_buffer.put((b"start",))
+    device.stream._message_buffer.put_image((b"header", b"data"))
+    device.stream._message_buffer.put_image((b"header", b"data"))
+
+    zmq_adapter.after_update()
+    (message,), _ = add_mock.call_args
+    assert message.images == 2
+
+    zmq_adapter.message_dropped(0, message)
+    zmq_adapter.message_dropped(1, message)
+    zmq_adapter.message_dropped(1, [b"not from the stream"])
+    # Each subscriber's drops are its own, the stream counts each image once
+    assert metrics.dropped_images == {0: 2, 1: 2}
+    assert metrics.dropped_messages == {0: 1, 1: 2}
+    assert device.stream.status.dropped == 2
+    assert isinstance(message, StreamMessage)
+
+
+def test_dropped_images_counted_without_metrics() -> None:
+    device = EigerDevice()
+    zmq_adapter = EigerZMQAdapter(device)
+    zmq_adapter.message_dropped(0, StreamMessage([b"header", b"data"], 1))
+    zmq_adapter.message_dropped(1, StreamMessage([b"header", b"data"], 1))
+    assert device.metrics is None
+    assert device.stream.status.dropped == 2
+
+
+async def get_config(adapter: EigerRESTAdapter, param: str, mocker: MockerFixture):
+    request = mocker.MagicMock(match_info={"parameter_name": param})
+    response = await adapter.get_config(request)
+    return json.loads(response.body)
+
+
+@pytest.mark.asyncio
+async def test_config_response_is_cached(mocker: MockerFixture) -> None:
+    adapter = EigerRESTAdapter(EigerDevice())
+    construct = mocker.patch(
+        "tickit_devices.eiger.eiger_adapters.construct_value",
+        wraps=construct_value,
+    )
+
+    first = await get_config(adapter, "description", mocker)
+    second = await get_config(adapter, "description", mocker)
+    assert first == second == construct_value(adapter.device.settings, "description")
+    construct.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_config_response_follows_dependencies(mocker: MockerFixture) -> None:
+    device = EigerDevice()
+    adapter = EigerRESTAdapter(device)
+    for param in ["element", "photon_energy", "wavelength", "threshold_energy"]:
+        await get_config(adapter, param, mocker)
+
+    device.settings["element"] = "Li"
+    responses = {
+        param: (await get_config(adapter, param, mocker))["value"]
+        for param in ["element", "photon_energy", "wavelength", "threshold_energy"]
+    }
+    assert responses == {
+        "element": "Li",
+        "photon_energy": 54.3,
+        "wavelength": device.settings.wavelength,
+        "threshold_energy": device.settings.threshold_energy,
+    }
+
+
+@pytest.mark.asyncio
+async def test_config_response_follows_attribute_changes(
+    mocker: MockerFixture,
+) -> None:
+    device = EigerDevice()
+    adapter = EigerRESTAdapter(device)
+    assert (await get_config(adapter, "trigger_mode", mocker))["value"] == "exts"
+    device.settings.trigger_mode = "ints"
+    assert (await get_config(adapter, "trigger_mode", mocker))["value"] == "ints"
+
+
+@pytest.mark.asyncio
+async def test_put_config_rejects_impossible_frame_time(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    request = json_request(mocker, {"value": 0.001})
+    request.match_info = {"parameter_name": "frame_time"}
+    response = await idle_adapter.put_config(request)
+    assert response.status == 400
+    assert idle_adapter.device.settings.frame_time == 0.12
+
+
+@pytest.mark.asyncio
+async def test_put_config_rejects_non_numeric_frame_time(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    request = json_request(mocker, {"value": "fast"})
+    request.match_info = {"parameter_name": "frame_time"}
+    response = await idle_adapter.put_config(request)
+    assert response.status == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("param", ["min_frame_time", "sensor_shape", "parameters"])
+async def test_config_attributes_that_are_not_parameters_are_unknown(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture, param: str
+) -> None:
+    assert (await get_config(idle_adapter, param, mocker))["value"] == "None"
+
+    request = json_request(mocker, {"value": 1})
+    request.match_info = {"parameter_name": param}
+    response = await idle_adapter.put_config(request)
+    assert json.loads(response.body) == []
+
+
+@pytest.mark.asyncio
+async def test_get_array_config_as_typed_array(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    idle_adapter.device.settings["pixel_mask"] = [[0, 1], [2, 0]]
+    response = await get_config(idle_adapter, "pixel_mask", mocker)
+    assert response["value_type"] == "uint[][]"
+    assert decode_darray(response["value"], "uint32").tolist() == [[0, 1], [2, 0]]
+
+
+@pytest.mark.asyncio
+async def test_get_array_config_as_tiff(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    idle_adapter.device.settings["flatfield"] = [[0.5, 1.0], [1.5, 2.0]]
+    request = mocker.MagicMock(
+        match_info={"parameter_name": "flatfield"},
+        headers={"Accept": "application/tiff"},
+    )
+    response = await idle_adapter.get_config(request)
+    assert response.content_type == "application/tiff"
+    assert read_tiff(response.body).tolist() == [[0.5, 1.0], [1.5, 2.0]]
+
+
+@pytest.mark.asyncio
+async def test_put_array_config_as_tiff(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    mask = np.array([[0, 1, 0], [8, 0, 0]], dtype="uint16")
+    request = mocker.MagicMock(
+        match_info={"parameter_name": "pixel_mask"}, content_type="application/tiff"
+    )
+    request.read = mocker.AsyncMock(return_value=write_tiff(mask))
+    response = await idle_adapter.put_config(request)
+    assert json.loads(response.body) == ["pixel_mask"]
+    assert idle_adapter.device.settings.pixel_mask.tolist() == mask.tolist()
+
+
+@pytest.mark.asyncio
+async def test_put_invalid_tiff_config(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    request = mocker.MagicMock(
+        match_info={"parameter_name": "pixel_mask"}, content_type="application/tiff"
+    )
+    request.read = mocker.AsyncMock(return_value=b"not a tiff")
+    response = await idle_adapter.put_config(request)
+    assert response.status == 400
+
+
+@pytest.mark.asyncio
+async def test_put_all_config_with_arrays(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    flatfield = encode_darray(np.ones((2, 2), dtype="float32"))
+    request = json_request(mocker, {"flatfield": flatfield, "nimages": 1})
+    response = await idle_adapter.put_all_config(request)
+    assert json.loads(response.body) == ["flatfield", "nimages"]
+    assert idle_adapter.device.settings.flatfield.tolist() == [[1.0, 1.0]] * 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_config_response(mocker: MockerFixture) -> None:
+    adapter = EigerRESTAdapter(EigerDevice())
+    assert (await get_config(adapter, "doesnt_exist", mocker))["value"] == "None"
+
+
+def json_request(mocker: MockerFixture, body):
+    request = mocker.MagicMock()
+    request.json = mocker.AsyncMock(return_value=body)
+    return request
+
+
+@pytest.fixture
+def idle_adapter() -> EigerRESTAdapter:
+    device = EigerDevice()
+    device.status.state = State.IDLE
+    return EigerRESTAdapter(device)
+
+
+@pytest.mark.asyncio
+async def test_get_all_config(idle_adapter: EigerRESTAdapter) -> None:
+    response = await idle_adapter.get_all_config(None)
+    values = json.loads(response.body)
+    assert len(values) == len(fields(EigerSettings))
+    assert values["count_time"] == 0.1
+    assert values["element"] == "Co"
+
+
+@pytest.mark.asyncio
+async def test_put_all_config_resolves_dependencies(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    settings = idle_adapter.device.settings
+    request = json_request(mocker, {"count_time": 0.5, "element": "Li", "nimages": 10})
+    response = await idle_adapter.put_all_config(request)
+
+    changed = json.loads(response.body)
+    assert changed[:3] == ["count_time", "element", "nimages"]
+    assert set(changed[3:]) == {
+        "frame_time",
+        "photon_energy",
+        "wavelength",
+        "threshold_energy",
+    }
+    assert settings.count_time == 0.5
+    assert settings.frame_time == pytest.approx(0.51)
+    assert settings.photon_energy == 54.3
+    assert settings.nimages == 10
+
+
+@pytest.mark.asyncio
+async def test_put_all_config_unknown_parameter_sets_nothing(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    request = json_request(mocker, {"nimages": 10, "doesnt_exist": 1})
+    response = await idle_adapter.put_all_config(request)
+    assert response.status == 400
+    assert json.loads(response.body) == {"unknown": ["doesnt_exist"]}
+    assert idle_adapter.device.settings.nimages == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body", [10, "nimages", ["nimages", 10], None])
+async def test_put_all_config_rejects_body_not_an_object(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture, body
+) -> None:
+    response = await idle_adapter.put_all_config(json_request(mocker, body))
+    assert response.status == 400
+    assert "error" in json.loads(response.body)
+    assert idle_adapter.device.settings.nimages == 1
+
+
+@pytest.mark.asyncio
+async def test_put_all_config_failure_restores_values(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    settings = idle_adapter.device.settings
+    before = settings.parameters()
+    await get_config(idle_adapter, "nimages", mocker)
+
+    request = json_request(mocker, {"nimages": 10, "element": "Unobtainium"})
+    response = await idle_adapter.put_all_config(request)
+    assert response.status == 400
+    assert settings.parameters() == before
+    assert (await get_config(idle_adapter, "nimages", mocker))["value"] == 1
+
+
+@pytest.mark.asyncio
+async def test_put_all_config_while_not_idle_sets_nothing(
+    mocker: MockerFixture,
+) -> None:
+    adapter = EigerRESTAdapter(EigerDevice())
+    response = await adapter.put_all_config(json_request(mocker, {"nimages": 10}))
+    assert json.loads(response.body) == []
+    assert adapter.device.settings.nimages == 1
+
+
+@pytest.mark.asyncio
+async def test_put_stream_config_rejects_empty_buffer(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    request = json_request(mocker, {"value": 0})
+    request.match_info = {"param": "buffer_size"}
+    response = await idle_adapter.put_stream_config(request)
+    assert response.status == 400
+    assert idle_adapter.device.stream.config.buffer_size == 512
+
+    response = await idle_adapter.put_all_stream_config(
+        json_request(mocker, {"buffer_size": 0})
+    )
+    assert response.status == 400
+    assert idle_adapter.device.stream.config.buffer_size == 512
+
+
+@pytest.mark.asyncio
+async def test_put_monitor_config_rejects_negative_buffer(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    request = json_request(mocker, {"value": -1})
+    request.match_info = {"param": "buffer_size"}
+    response = await idle_adapter.put_monitor_config(request)
+    assert response.status == 400
+    assert idle_adapter.device.monitor_config.buffer_size == 512
+
+
+@pytest.mark.asyncio
+async def test_put_all_stream_config(
+    idle_adapter: EigerRESTAdapter, mocker: MockerFixture
+) -> None:
+    request = json_request(mocker, {"header_detail": "all", "buffer_size": 8})
+    response = await idle_adapter.put_all_stream_config(request)
+    assert json.loads(response.body) == ["header_detail", "buffer_size"]
+
+    response = await idle_adapter.get_all_stream_config(None)
+    values = json.loads(response.body)
+    assert values["header_detail"] == "all"
+    assert values["buffer_size"] == 8
+
+
+@pytest.mark.asyncio
+async def test_trigger_waits_for_series(mocker: MockerFixture) -> None:
+    device = mocker.MagicMock()
+    device.trigger = mocker.AsyncMock()
+    device.finished_aquisition = asyncio.Event()
+    adapter = EigerRESTAdapter(device)
+    adapter.interrupt = mocker.AsyncMock()
+
+    request = mocker.MagicMock(can_read_body=False)
+
+    trigger = asyncio.create_task(adapter.trigger_eiger(request))
+    await asyncio.sleep(0.01)
+    assert not trigger.done()
+    device.finished_aquisition.set()
+    response = await asyncio.wait_for(trigger, timeout=1.0)
+    assert json.loads(response.body) == {"sequence id": 4}
+
+
+@pytest.mark.asyncio
+async def test_async_trigger_returns_immediately(mocker: MockerFixture) -> None:
+    device = mocker.MagicMock()
+    device.trigger = mocker.AsyncMock()
+    device.finished_aquisition = asyncio.Event()
+    device.series_id = 3
+    adapter = EigerRESTAdapter(device, async_trigger=True)
+    adapter.interrupt = mocker.AsyncMock()
+    request = mocker.MagicMock(can_read_body=False)
+
+    response = await asyncio.wait_for(adapter.trigger_eiger(request), timeout=1.0)
+    assert json.loads(response.body) == {"sequence id": 3}
+    device.trigger.assert_awaited_once_with(None)
+    adapter.interrupt.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_async_trigger_returns_series_of_each_arm(
+    mocker: MockerFixture,
+) -> None:
+    device = EigerDevice()
+    await device.initialize()
+    adapter = EigerRESTAdapter(device, async_trigger=True)
+    adapter.interrupt = mocker.AsyncMock()
+    request = mocker.MagicMock(can_read_body=False)
+
+    sequence_ids = []
+    for _ in range(2):
+        await device.arm()
+        response = await adapter.trigger_eiger(request)
+        sequence_ids.append(json.loads(response.body)["sequence id"])
+        await device.disarm()
+    assert sequence_ids == [1, 2]
+    assert device.series_id == 2
+
+
+@pytest.mark.asyncio
+async def test_trigger_passes_exposure_time(mocker: MockerFixture) -> None:
+    device = mocker.MagicMock()
+    device.trigger = mocker.AsyncMock()
+    device.series_id = 1
+    adapter = EigerRESTAdapter(device, async_trigger=True)
+    adapter.interrupt = mocker.AsyncMock()
+
+    await adapter.trigger_eiger(json_request(mocker, {"value": 0.25}))
+    device.trigger.assert_awaited_once_with(0.25)
+
+
+@pytest.mark.asyncio
+async def test_get_trace_status(mocker: MockerFixture) -> None:
+    trace = FrameTrace(capacity=4)
+    trace.begin_update()
+    trace.begin_frame(1, 0)
+    trace.frame_taken()
+    trace.frame_buffered(0, "block")
+    adapter = EigerRESTAdapter(EigerDevice(trace=trace))
+
+    async def get_trace_status(param: str):
+        request = mocker.MagicMock(match_info={"status_param": param})
+        return json.loads((await adapter.get_trace_status(request)).body)
+
+    assert (await get_trace_status("frames_in_flight"))["value"] == 1
+    assert (await get_trace_status("stages"))["value"] == STAGES
+    latency = await get_trace_status("stage_latency")
+    assert latency["value_type"] == "float[][]"
+    assert len(latency["value"]) == len(STAGES)
+    assert (await get_trace_status("doesnt_exist"))["value"] == "None"
+
+
+@pytest.mark.asyncio
+async def test_get_trace(mocker: MockerFixture) -> None:
+    trace = FrameTrace(capacity=4)
+    adapter = EigerRESTAdapter(EigerDevice(trace=trace))
+    response = await adapter.get_trace(mocker.MagicMock())
+    assert "traceEvents" in json.loads(response.body)
+
+    untraced = EigerRESTAdapter(EigerDevice())
+    assert (await untraced.get_trace(mocker.MagicMock())).status == 404
+    request = mocker.MagicMock(match_info={"status_param": "frames_in_flight"})
+    response = await untraced.get_trace_status(request)
+    assert json.loads(response.body)["value"] == "None"
+
+
+@pytest.mark.asyncio
+async def test_get_metrics(mocker: MockerFixture) -> None:
+    device = EigerDevice(metrics=EigerMetrics())
+    device.stream._message_buffer.put_image((b"header", b"data"))
+    adapter = EigerRESTAdapter(device)
+
+    response = await adapter.get_metrics(mocker.MagicMock())
+    assert response.content_type == "text/plain"
+    assert "eiger_stream_buffered_images 1" in response.text.splitlines()
+
+    untraced = EigerRESTAdapter(EigerDevice())
+    assert (await untraced.get_metrics(mocker.MagicMock())).status == 404
+
+
+@pytest.mark.asyncio
+async def test_endpoints_are_timed_with_metrics(mocker: MockerFixture) -> None:
+    metrics = EigerMetrics()
+    adapter = EigerRESTAdapter(EigerDevice(metrics=metrics))
+    endpoints = {
+        (endpoint.method, endpoint.path): func
+        for endpoint, func in adapter.get_endpoints()
+    }
+    path = "/detector/api/1.8.0/config/{parameter_name}"
+    request = mocker.MagicMock(match_info={"parameter_name": "nimages"})
+    await endpoints[("GET", path)](request)
+    await endpoints[("GET", path)](request)
+    assert sum(metrics.request_latency("GET", path).counts) == 2
+
+    untimed = EigerRESTAdapter(EigerDevice())
+    handlers = {endpoint.path: func for endpoint, func in untimed.get_endpoints()}
+    assert handlers["/metrics"] == untimed.get_metrics
+
+
+def test_streamed_and_dropped_messages_are_counted(mocker: MockerFixture) -> None:
+    metrics = EigerMetrics()
+    device = EigerDevice(metrics=metrics)
+    zmq_adapter = EigerZMQAdapter(device)
+    add_mock = mocker.patch.object(zmq_adapter, "add_message_to_stream")
+    device.stream._message_buffer.put_image((b"header", b"data"))
+
+    zmq_adapter.after_update()
+    (message,), _ = add_mock.call_args
+    zmq_adapter.message_dropped(1, message)
+    assert metrics.messages_streamed == 1
+    assert metrics.bytes_streamed == len(b"headerdata")
+    assert metrics.dropped_messages == {1: 1}
+
+
+@pytest.mark.asyncio
+async def test_next_message_waits_for_stream_data() -> None:
+    device = EigerDevice()
+    zmq_adapter = EigerZMQAdapter(device)
+    next_message = asyncio.create_task(zmq_adapter.next_message())
+    await asyncio.sleep(0)
+    assert not next_message.done()
+
+    # Sent without waiting for the device update to finish
+    device.stream.end_series(1)
+    message = await asyncio.wait_for(next_message, 1.0)
+    assert isinstance(message, StreamMessage)
+    assert [part.series for part in message] == [1]
+    assert not device.stream.pending
+
+
+@pytest.mark.asyncio
+async def test_next_message_wakes_for_added_message() -> None:
+    zmq_adapter = EigerZMQAdapter(EigerDevice())
+    next_message = asyncio.create_task(zmq_adapter.next_message())
+    await asyncio.sleep(0)
+
+    zmq_adapter.add_message_to_stream([b"message"])
+    assert await asyncio.wait_for(next_message, 1.0) == [b"message"]
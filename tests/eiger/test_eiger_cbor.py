@@ -0,0 +1,55 @@
+import cbor2
+import numpy as np
+import pytest
+
+from tickit_devices.eiger.data import cbor
+from tickit_devices.eiger.data.cbor import Tag
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        True,
+        False,
+        0,
+        23,
+        24,
+        255,
+        256,
+        65536,
+        2**32,
+        2**64 - 1,
+        -1,
+        -25,
+        -(2**40),
+        1.5,
+        -0.0,
+        "",
+        "threshold_1",
+        "é" * 300,
+        b"",
+        b"\x00" * 70000,
+        [1, [2, "three"], {}],
+        {"a": {"b": [1.0, None]}},
+    ],
+)
+def test_encode_matches_reference_decoder(value):
+    assert cbor2.loads(cbor.encode(value)) == value
+
+
+def test_encode_tags():
+    decoded = cbor2.loads(cbor.encode(Tag(56500, ["bslz4", 2, b"data"])))
+    assert decoded.tag == 56500
+    assert list(decoded.value) == ["bslz4", 2, b"data"]
+
+
+def test_encode_buffers_and_numpy_scalars():
+    array = np.arange(4, dtype="<u2")
+    assert cbor2.loads(cbor.encode(memoryview(array))) == array.tobytes()
+    assert cbor2.loads(cbor.encode([np.int64(3), np.float32(0.5)])) == [3, 0.5]
+
+
+def test_encode_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        cbor.encode(object())
@@ -0,0 +1,87 @@
+import struct
+
+import lz4.block
+import numpy as np
+import pytest
+
+from tickit_devices.eiger.data.compression import (
+    bitshuffle_lz4_compress,
+    bitshuffle_lz4_decompress,
+    compress,
+    default_block_size,
+    encoding_for,
+)
+from tickit_devices.eiger.data.dummy_image import dummy_image_blob
+
+# # # # # Eiger Compression Tests # # # # #
+
+
+@pytest.mark.parametrize(
+    "dtype,shape",
+    [
+        ("uint8", (64, 64)),
+        ("uint16", (100, 123)),
+        ("uint32", (37, 91)),
+        ("uint16", (3, 5)),
+        ("uint16", (1, 4099)),
+    ],
+)
+def test_bitshuffle_lz4_round_trip(dtype: str, shape):
+    image = np.random.default_rng(0).poisson(3, shape).astype(dtype)
+    compressed = bitshuffle_lz4_compress(image)
+    assert (bitshuffle_lz4_decompress(compressed, shape, dtype) == image).all()
+
+
+def test_bitshuffle_lz4_header():
+    image = np.zeros((10, 100), dtype="uint16")
+    compressed = bitshuffle_lz4_compress(image)
+    assert struct.unpack_from(">QI", compressed) == (2000, 8192)
+
+
+def test_bitshuffle_transposes_bits():
+    # One element of a block of 8 has every bit set, so each bit plane has its
+    # first bit set
+    image = np.array([0xFFFF, 0, 0, 0, 0, 0, 0, 0], dtype="uint16")
+    compressed = bitshuffle_lz4_compress(image)
+    (size,) = struct.unpack_from(">I", compressed, 12)
+    shuffled = lz4.block.decompress(compressed[16 : 16 + size], uncompressed_size=16)
+    assert shuffled == b"\x01" * 16
+
+
+def test_decompress_detector_sample():
+    blob = dummy_image_blob()
+    image = bitshuffle_lz4_decompress(blob, (4362, 4148), "uint16")
+    recompressed = bitshuffle_lz4_compress(image)
+    assert (
+        bitshuffle_lz4_decompress(recompressed, (4362, 4148), "uint16") == image
+    ).all()
+
+
+def test_lz4_compress():
+    image = np.arange(1000, dtype="uint32").reshape(10, 100)
+    data, encoding = compress(image, "lz4")
+    assert encoding == "lz4<"
+    assert lz4.block.decompress(data, uncompressed_size=4000) == image.tobytes()
+
+
+@pytest.mark.parametrize(
+    "compression,dtype,expected",
+    [
+        ("bslz4", "uint8", "bs8-lz4<"),
+        ("bslz4", "uint16", "bs16-lz4<"),
+        ("bslz4", "uint32", "bs32-lz4<"),
+        ("lz4", "uint16", "lz4<"),
+    ],
+)
+def test_encoding_for(compression: str, dtype: str, expected: str):
+    assert encoding_for(compression, np.dtype(dtype)) == expected
+
+
+def test_unknown_compression():
+    with pytest.raises(ValueError):
+        compress(np.zeros((2, 2), dtype="uint16"), "zstd")
+
+
+@pytest.mark.parametrize("elem_size,expected", [(1, 8192), (2, 4096), (4, 2048)])
+def test_default_block_size(elem_size: int, expected: int):
+    assert default_block_size(elem_size) == expected
@@ -0,0 +1,60 @@
+import base64
+
+import numpy as np
+import pytest
+
+from tickit_devices.eiger.data.darray import decode_darray, encode_darray
+
+
+@pytest.mark.parametrize("dtype", ["uint8", "uint32", "float32", "float64"])
+def test_round_trip(dtype: str) -> None:
+    array = np.arange(12, dtype=dtype).reshape(3, 4)
+    decoded = decode_darray(encode_darray(array), dtype)
+    assert decoded.dtype == np.dtype(dtype)
+    assert np.array_equal(decoded, array)
+
+
+def test_shape_is_x_then_y() -> None:
+    encoded = encode_darray(np.zeros((3, 4), dtype="uint32"))
+    assert encoded["shape"] == [4, 3]
+    assert encoded["type"] == "<u4"
+    assert encoded["filters"] == ["base64"]
+
+
+def test_decode_converts_type() -> None:
+    encoded = {
+        "__darray__": [1, 0, 0],
+        "type": ">u2",
+        "shape": [2, 1],
+        "filters": ["base64"],
+        "data": base64.b64encode(b"\x00\x01\x01\x00").decode("ascii"),
+    }
+    assert decode_darray(encoded, "uint32").tolist() == [[1, 256]]
+
+
+def test_decode_lists() -> None:
+    decoded = decode_darray([[1.5, 2.0]], "float32")
+    assert decoded.dtype == np.float32
+    assert decoded.tolist() == [[1.5, 2.0]]
+
+
+def test_decode_rejects_unknown_filters() -> None:
+    encoded = encode_darray(np.zeros((1, 1)))
+    encoded["filters"] = ["lz4"]
+    with pytest.raises(ValueError):
+        decode_darray(encoded, "float64")
+
+
+def test_decode_rejects_data_not_matching_shape() -> None:
+    encoded = encode_darray(np.zeros((2, 2), dtype="uint8"))
+    encoded["shape"] = [3, 3]
+    with pytest.raises(ValueError):
+        decode_darray(encoded, "uint8")
+
+
+@pytest.mark.parametrize("filters,data", [(["base64"], [0, 0]), ([], "AAA=")])
+def test_decode_rejects_data_not_encoded_as_filtered(filters, data) -> None:
+    encoded = encode_darray(np.zeros((1, 2), dtype="uint8"))
+    encoded.update(filters=filters, data=data)
+    with pytest.raises(ValueError):
+        decode_darray(encoded, "uint8")
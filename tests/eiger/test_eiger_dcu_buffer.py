@@ -0,0 +1,38 @@
+import pytest
+from tickit.core.typedefs import SimTime
+
+from tickit_devices.eiger.dcu_buffer import DCUBuffer
+
+
+@pytest.fixture
+def dcu_buffer() -> DCUBuffer:
+    dcu_buffer = DCUBuffer(bandwidth=1000.0, size=100)
+    dcu_buffer.drain(SimTime(0))
+    return dcu_buffer
+
+
+def test_fill_until_full(dcu_buffer: DCUBuffer):
+    dcu_buffer.fill(60)
+    assert dcu_buffer.free == pytest.approx(0.4)
+    assert not dcu_buffer.full
+    dcu_buffer.fill(60)
+    assert dcu_buffer.full
+    assert dcu_buffer.free == 0.0
+
+
+def test_drains_at_bandwidth(dcu_buffer: DCUBuffer):
+    dcu_buffer.fill(100)
+    dcu_buffer.drain(SimTime(int(0.05e9)))
+    assert dcu_buffer.free == pytest.approx(0.5)
+    dcu_buffer.drain(SimTime(int(0.2e9)))
+    assert dcu_buffer.free == 1.0
+    assert not dcu_buffer.pending
+
+
+def test_drain_ignores_earlier_times(dcu_buffer: DCUBuffer):
+    dcu_buffer.drain(SimTime(int(0.05e9)))
+    dcu_buffer.fill(100)
+    dcu_buffer.drain(SimTime(0))
+    assert dcu_buffer.free == 0.0
+    dcu_buffer.drain(SimTime(int(0.1e9)))
+    assert dcu_buffer.free == pytest.approx(0.5)
@@ -0,0 +1,54 @@
+import pytest
+from tickit.core.components.system_component import SystemComponent
+from tickit.core.typedefs import ComponentID, ComponentPort, PortID
+from tickit.utils.configuration.loading import read_configs
+
+from tickit_devices.eiger import EigerFarm
+
+
+@pytest.fixture
+def farm() -> EigerFarm:
+    return EigerFarm(
+        name=ComponentID("farm"),
+        inputs={PortID("trigger"): ComponentPort(ComponentID("gate"), PortID("out"))},
+        images="flat",
+        detectors=3,
+    )
+
+
+def test_farm_read_from_config():
+    (config,) = read_configs("examples/configs/eiger/eiger_farm.yaml")
+    assert isinstance(config, EigerFarm)
+    assert config.detectors == 2
+
+
+def test_farm_members_have_distinct_ports(farm: EigerFarm):
+    component = farm()
+    assert isinstance(component, SystemComponent)
+    members = [member.config for member in component.components]
+    assert [member.name for member in members] == ["farm_0", "farm_1", "farm_2"]
+    assert [member.port for member in members] == [8081, 8082, 8083]
+    assert [member.zmq_port for member in members] == [9999, 10000, 10001]
+
+
+def test_farm_broadcast_ports_do_not_overlap(farm: EigerFarm):
+    farm.zmq_mode = "broadcast"
+    farm.zmq_subscribers = 3
+    members = [member.config for member in farm().components]
+    assert [member.zmq_port for member in members] == [9999, 10002, 10005]
+
+
+def test_farm_members_take_trigger_from_system(farm: EigerFarm):
+    for member in farm().components:
+        assert member.inputs == {
+            PortID("trigger"): ComponentPort(ComponentID("external"), PortID("trigger"))
+        }
+
+
+def test_farm_members_share_frames_and_templates(farm: EigerFarm):
+    devices = [member().device for member in farm().components]
+    for device in devices:
+        device.frame_pool.prepare((20, 10), "uint16", "lz4")
+    assert devices[0].frame_pool.image(0).data is devices[1].frame_pool.image(0).data
+    templates = {id(device.stream._header_templates) for device in devices}
+    assert len(templates) == 1
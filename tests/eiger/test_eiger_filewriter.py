@@ -0,0 +1,149 @@
+from pathlib import Path
+from typing import List
+
+import h5py
+import numpy as np
+import pytest
+
+from tickit_devices.eiger.data.dummy_image import Image
+from tickit_devices.eiger.data.frame_pool import FramePool
+from tickit_devices.eiger.data.generators import PoissonImageGenerator
+from tickit_devices.eiger.eiger_settings import EigerSettings
+from tickit_devices.eiger.filewriter.eiger_filewriter import EigerFileWriter
+
+SHAPE = (30, 20)
+
+
+@pytest.fixture
+def filewriter(tmp_path: Path):
+    writer = EigerFileWriter(tmp_path)
+    yield writer
+    writer.close()
+
+
+def make_images(count: int, compression: str) -> List[Image]:
+    pool = FramePool(PoissonImageGenerator(mean=3.0), size=count)
+    pool.prepare(SHAPE, "uint16", compression)
+    # Wait for every distinct frame to be rendered
+    images = [pool.image(index) for index in range(count)]
+    while len({image.hash for image in images}) < count:
+        images = [pool.image(index) for index in range(count)]
+    pool.close()
+    return images
+
+
+def expected_pixels(index: int) -> np.ndarray:
+    generator = PoissonImageGenerator(mean=3.0)
+    return generator.generate(index, (SHAPE[1], SHAPE[0]), "uint16")
+
+
+def write_series(
+    filewriter: EigerFileWriter, images: List[Image], series_id: int = 1
+) -> None:
+    filewriter.begin_series(EigerSettings(), series_id)
+    for image in images:
+        filewriter.write_image(image)
+    filewriter.end_series()
+    filewriter.flush()
+
+
+def test_files_roll_every_nimages_per_file(filewriter: EigerFileWriter):
+    filewriter.config.nimages_per_file = 2
+    filewriter.config.name_pattern = "series_$id"
+    write_series(filewriter, make_images(5, "bslz4"), series_id=3)
+
+    assert filewriter.status.files == [
+        "series_3_master.h5",
+        "series_3_data_000001.h5",
+        "series_3_data_000002.h5",
+        "series_3_data_000003.h5",
+    ]
+    assert all(
+        (filewriter.directory / name).exists() for name in filewriter.status.files
+    )
+    with h5py.File(filewriter.directory / "series_3_data_000003.h5") as data:
+        dataset = data["entry/data/data"]
+        assert dataset.shape == (1, SHAPE[1], SHAPE[0])
+        assert dataset.attrs["image_nr_low"] == 4
+        assert dataset.attrs["image_nr_high"] == 4
+
+
+def test_uncompressed_images_read_through_master(filewriter: EigerFileWriter):
+    filewriter.config.nimages_per_file = 2
+    write_series(filewriter, make_images(3, "bslz4"))
+
+    with h5py.File(filewriter.directory / "test_master.h5") as master:
+        assert master["entry/instrument/detector/detectorSpecific/nimages"][()] == 1
+        assert list(master["entry/data"]) == ["data_000001", "data_000002"]
+        frames = np.concatenate(
+            [master["entry/data/data_000001"][()], master["entry/data/data_000002"][()]]
+        )
+    for index, frame in enumerate(frames):
+        np.testing.assert_array_equal(frame, expected_pixels(index))
+
+
+@pytest.mark.parametrize("compression", ["bslz4", "lz4"])
+def test_compressed_images_written_as_sent(
+    filewriter: EigerFileWriter, compression: str
+):
+    filewriter.config.compression_enabled = True
+    filewriter.config.nimages_per_file = 10
+    images = make_images(2, compression)
+    write_series(filewriter, images)
+
+    with h5py.File(filewriter.directory / "test_data_000001.h5") as data:
+        dataset = data["entry/data/data"]
+        if compression == "bslz4":
+            for index, image in enumerate(images):
+                _, chunk = dataset.id.read_direct_chunk((index, 0, 0))
+                assert chunk == image.data
+
+        hdf5plugin = pytest.importorskip("hdf5plugin")
+        assert hdf5plugin
+        for index in range(len(images)):
+            np.testing.assert_array_equal(dataset[index], expected_pixels(index))
+
+
+def test_state_follows_series(filewriter: EigerFileWriter):
+    assert filewriter.status.state == "ready"
+    filewriter.begin_series(EigerSettings(), 1)
+    filewriter.flush()
+    assert filewriter.status.state == "acquire"
+    filewriter.end_series()
+    filewriter.flush()
+    assert filewriter.status.state == "ready"
+
+
+def test_closing_a_series_keeps_the_state_of_the_next(filewriter: EigerFileWriter):
+    filewriter.begin_series(EigerSettings(), 1)
+    filewriter.end_series()
+    filewriter.begin_series(EigerSettings(), 2)
+    filewriter.flush()
+    assert filewriter.status.state == "acquire"
+
+
+def test_zero_nimages_per_file_writes_one_data_file(filewriter: EigerFileWriter):
+    filewriter.config.nimages_per_file = 0
+    write_series(filewriter, make_images(5, "bslz4"))
+
+    assert filewriter.status.files == ["test_master.h5", "test_data_000001.h5"]
+    with h5py.File(filewriter.directory / "test_data_000001.h5") as data:
+        dataset = data["entry/data/data"]
+        assert dataset.shape == (5, SHAPE[1], SHAPE[0])
+        assert dataset.attrs["image_nr_high"] == 4
+
+
+def test_disabled_writes_nothing(filewriter: EigerFileWriter):
+    filewriter.config.mode = "disabled"
+    write_series(filewriter, make_images(1, "bslz4"))
+    assert filewriter.status.state == "disabled"
+    assert filewriter.status.files == []
+    assert list(filewriter.directory.iterdir()) == []
+
+
+def test_write_failure_sets_error(tmp_path: Path):
+    filewriter = EigerFileWriter(tmp_path / "missing")
+    write_series(filewriter, make_images(1, "bslz4"))
+    filewriter.close()
+    assert filewriter.status.state == "error"
+    assert len(filewriter.status.error) == 1
@@ -0,0 +1,201 @@
+from pathlib import Path
+from threading import Event
+from typing import Tuple
+
+import numpy as np
+import pytest
+
+from tickit_devices.eiger.data.compression import bitshuffle_lz4_decompress
+from tickit_devices.eiger.data.dummy_image import dummy_image_blob
+from tickit_devices.eiger.data.frame_pool import (
+    FramePool,
+    MappedFramePool,
+    SharedFramePool,
+    write_frame_container,
+)
+from tickit_devices.eiger.data.generators import (
+    FlatImageGenerator,
+    PoissonImageGenerator,
+)
+
+# # # # # Eiger FramePool Tests # # # # #
+
+
+@pytest.fixture
+def frame_pool():
+    pool = FramePool(PoissonImageGenerator(mean=2.0), size=4)
+    yield pool
+    pool.close()
+
+
+def test_image_before_prepare_raises(frame_pool: FramePool):
+    with pytest.raises(RuntimeError):
+        frame_pool.image(0)
+
+
+def test_images_match_configuration(frame_pool: FramePool):
+    frame_pool.prepare((50, 40), "uint32", "bslz4")
+    image = frame_pool.image(5)
+    assert image.index == 5
+    assert image.shape == (50, 40)
+    assert image.dtype == "uint32"
+    assert image.encoding == "bs32-lz4<"
+    decompressed = bitshuffle_lz4_decompress(image.data, (40, 50), "uint32")
+    assert decompressed.shape == (40, 50)
+
+
+def test_pool_cycles_through_distinct_frames(frame_pool: FramePool):
+    frame_pool.prepare((50, 40), "uint16", "bslz4")
+    frame_pool.image(0)
+    frame_pool._executor.submit(lambda: None).result()  # wait for all frames
+
+    data = [frame_pool.image(i).data for i in range(8)]
+    assert len(set(data[:4])) == 4
+    assert data[4:] == data[:4]
+
+
+def test_prepare_again_with_new_configuration(frame_pool: FramePool):
+    frame_pool.prepare((50, 40), "uint16", "bslz4")
+    first = frame_pool.image(0)
+    frame_pool.prepare((50, 40), "uint16", "bslz4")
+    assert frame_pool.image(0).data is first.data
+
+    frame_pool.prepare((50, 40), "uint16", "lz4")
+    assert frame_pool.image(0).encoding == "lz4<"
+
+
+class _BlockingGenerator(FlatImageGenerator):
+    def __init__(self) -> None:
+        super().__init__()
+        self.started = Event()
+        self.release = Event()
+
+    def generate(self, index: int, shape: Tuple[int, int], dtype: str) -> np.ndarray:
+        self.started.set()
+        self.release.wait(timeout=5)
+        return super().generate(index, shape, dtype)
+
+
+def test_frame_rendering_during_prepare_is_discarded():
+    generator = _BlockingGenerator()
+    pool = FramePool(generator, size=2)
+    pool.prepare((50, 40), "uint16", "bslz4")
+    assert generator.started.wait(timeout=5)
+    pool.prepare((20, 10), "uint16", "bslz4")
+    generator.release.set()
+    pool._executor.submit(lambda: None).result()  # wait for all frames
+    pool.close()
+
+    assert len(pool._frames) == 2
+    for index in range(2):
+        image = pool.image(index)
+        assert image.shape == (20, 10)
+        decompressed = bitshuffle_lz4_decompress(image.data, (10, 20), "uint16")
+        assert decompressed.shape == (10, 20)
+
+
+def test_flat_frames():
+    pool = FramePool(FlatImageGenerator(value=3), size=1)
+    pool.prepare((16, 8), "uint16", "bslz4")
+    data = pool.image(0).data
+    expected = np.full((8, 16), 3, dtype="uint16")
+    assert (bitshuffle_lz4_decompress(data, (8, 16), "uint16") == expected).all()
+    pool.close()
+
+
+def test_region_of_interest_frames_are_centre_of_sensor():
+    generator = PoissonImageGenerator(mean=2.0)
+    pool = FramePool(generator, size=1)
+    pool.prepare((16, 8), "uint16", "bslz4", (32, 24))
+    image = pool.image(0)
+    pool.close()
+    assert image.shape == (16, 8)
+    expected = generator.generate(0, (24, 32), "uint16")[8:16, 8:24]
+    assert (bitshuffle_lz4_decompress(image.data, (8, 16), "uint16") == expected).all()
+
+
+# # # # # Eiger MappedFramePool Tests # # # # #
+
+
+def test_shared_sources_share_frames():
+    shared = SharedFramePool(PoissonImageGenerator(mean=2.0), size=4)
+    first, second = shared.source(), shared.source()
+    first.prepare((50, 40), "uint16", "lz4")
+    second.prepare((50, 40), "uint16", "lz4")
+    assert first.image(1).data is second.image(5).data
+    shared.close()
+
+
+def test_shared_sources_prepare_independently():
+    shared = SharedFramePool(FlatImageGenerator(value=1), size=2)
+    first, second = shared.source(), shared.source()
+    first.prepare((50, 40), "uint16", "lz4")
+    second.prepare((20, 10), "uint32", "lz4")
+    assert first.image(0).shape == (50, 40)
+    assert second.image(0).shape == (20, 10)
+    assert second.image(0).dtype == "uint32"
+    shared.close()
+
+
+def test_shared_source_before_prepare_raises():
+    shared = SharedFramePool(FlatImageGenerator(value=1), size=2)
+    with pytest.raises(RuntimeError):
+        shared.source().image(0)
+
+
+def test_mapped_sample_frame():
+    pool = MappedFramePool()
+    image = pool.image(3)
+    assert len(pool) == 1
+    assert isinstance(image.data, memoryview)
+    assert image.data == dummy_image_blob()
+    assert image.index == 3
+    assert image.shape == (4148, 4362)
+    assert image.encoding == "bs16-lz4<"
+
+
+def test_mapped_directory(tmp_path: Path):
+    for i in range(3):
+        (tmp_path / f"frame_{i:03d}").write_bytes(bytes([i]) * (i + 1))
+    pool = MappedFramePool(tmp_path, shape=(2, 2), dtype="uint8", encoding="lz4<")
+    frames = [bytes(pool.image(i).data) for i in range(4)]
+    assert frames == [b"\x00", b"\x01\x01", b"\x02\x02\x02", b"\x00"]
+    assert pool.image(0).dtype == "uint8"
+
+
+def test_mapped_container(tmp_path: Path):
+    path = tmp_path / "frames.bin"
+    frames = [b"first frame", b"second", b"third frame data"]
+    write_frame_container(path, frames, (10, 20), "uint32", "bs32-lz4<")
+
+    pool = MappedFramePool(path)
+    assert len(pool) == 3
+    images = [pool.image(i) for i in range(3)]
+    assert [image.data for image in images] == frames
+    assert all(image.shape == (10, 20) for image in images)
+    assert all(image.dtype == "uint32" for image in images)
+    assert all(image.encoding == "bs32-lz4<" for image in images)
+    assert len({image.hash for image in images}) == 3
+
+
+def test_mapped_frames_are_views_of_one_mapping(tmp_path: Path):
+    path = tmp_path / "frames.bin"
+    write_frame_container(path, [b"a" * 100, b"b" * 100], (10, 10), "uint8", "lz4<")
+    pool = MappedFramePool(path)
+    first, second = pool.image(0).data, pool.image(1).data
+    assert isinstance(first, memoryview) and isinstance(second, memoryview)
+    assert first.obj is second.obj
+    assert first.readonly
+
+
+def test_mapped_empty_directory_raises(tmp_path: Path):
+    with pytest.raises(ValueError):
+        MappedFramePool(tmp_path)
+
+
+def test_mapped_prepare_warns_on_mismatch(caplog: pytest.LogCaptureFixture):
+    pool = MappedFramePool()
+    pool.prepare((4148, 4362), "uint16", "bslz4")
+    assert not caplog.records
+    pool.prepare((1024, 1024), "uint16", "bslz4")
+    assert "configured for" in caplog.text
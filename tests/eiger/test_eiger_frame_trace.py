@@ -0,0 +1,142 @@
+import json
+from pathlib import Path
+
+import pytest
+from tickit.core.typedefs import SimTime
+
+from tickit_devices.eiger.eiger import EigerDevice
+from tickit_devices.eiger.eiger_adapters import EigerZMQAdapter
+from tickit_devices.eiger.frame_trace import STAGES, FrameTrace
+from tickit_devices.eiger.stream.eiger_stream import EigerStream
+
+
+def trace_frames(trace: FrameTrace, frames: int, series_id: int = 1) -> None:
+    trace.begin_update()
+    for frame in range(frames):
+        trace.begin_frame(series_id, frame)
+        trace.frame_taken()
+        trace.frame_buffered(0, "block")
+
+
+def stage_events(trace: FrameTrace, stage: str):
+    return [
+        event
+        for event in trace.chrome_trace()["traceEvents"]
+        if event["ph"] == "X" and event["name"] == stage
+    ]
+
+
+def test_frames_are_in_flight_until_sent():
+    trace = FrameTrace(capacity=8)
+    trace_frames(trace, 3)
+    assert trace.frames_in_flight == 3
+    trace.consumed(2)
+    assert trace.frames_in_flight == 3
+    trace.sent()
+    assert trace.frames_in_flight == 1
+    trace.consumed(1)
+    trace.sent()
+    assert trace.frames_in_flight == 0
+
+
+def test_every_stage_is_recorded():
+    trace = FrameTrace(capacity=8)
+    trace_frames(trace, 4)
+    trace.consumed(4)
+    trace.sent()
+    status = trace.summarize()
+    assert status.stages == STAGES
+    assert status.frames_traced == 4
+    assert len(status.stage_latency) == len(STAGES)
+    for stage in STAGES:
+        assert [event["args"]["frame"] for event in stage_events(trace, stage)] == [
+            0,
+            1,
+            2,
+            3,
+        ]
+
+
+def test_ring_keeps_latest_frames():
+    trace = FrameTrace(capacity=4)
+    trace_frames(trace, 10)
+    trace.consumed(10)
+    trace.sent()
+    assert trace.summarize().frames_traced == 10
+    frames = [event["args"]["frame"] for event in stage_events(trace, "send")]
+    assert frames == [6, 7, 8, 9]
+
+
+def test_dropped_newest_frame_is_not_sent():
+    trace = FrameTrace(capacity=8)
+    trace_frames(trace, 2)
+    trace.begin_frame(1, 2)
+    trace.frame_buffered(1, "drop_newest")
+    assert trace.frames_in_flight == 2
+    trace.consumed(2)
+    trace.sent()
+    frames = [event["args"]["frame"] for event in stage_events(trace, "send")]
+    assert frames == [0, 1]
+
+
+def test_dropped_oldest_frame_is_not_sent():
+    trace = FrameTrace(capacity=8)
+    trace_frames(trace, 2)
+    trace.begin_frame(1, 2)
+    trace.frame_buffered(1, "drop_oldest")
+    trace.consumed(2)
+    trace.sent()
+    frames = [event["args"]["frame"] for event in stage_events(trace, "send")]
+    assert frames == [1, 2]
+
+
+def test_empty_trace_has_no_latency():
+    status = FrameTrace().summarize()
+    assert status.stage_latency == [[0.0, 0.0] for _ in STAGES]
+    assert status.frames_in_flight == 0
+
+
+def test_dump_chrome_trace(tmp_path: Path):
+    trace = FrameTrace(capacity=8)
+    trace_frames(trace, 2)
+    path = tmp_path / "trace.json"
+    trace.dump(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    names = {event["args"]["name"] for event in events if event["ph"] == "M"}
+    assert names == set(STAGES)
+    assert {event["name"] for event in events if event["ph"] == "X"} == {
+        "acquire",
+        "frame",
+        "header",
+    }
+
+
+@pytest.mark.asyncio
+async def test_series_is_traced_through_stream_and_adapter():
+    trace = FrameTrace(capacity=16)
+    device = EigerDevice(stream=EigerStream(trace=trace), trace=trace)
+    adapter = EigerZMQAdapter(device)
+    await device.initialize()
+    device.settings.trigger_mode = "ints"
+    device.settings.nimages = 5
+    device.settings.frame_time = 0.001
+    await device.arm()
+    await device.trigger()
+
+    time = SimTime(0)
+    while True:
+        update = device.update(time, {})
+        adapter.after_update()
+        while not adapter._ensure_queue().empty():
+            await adapter.next_message()
+        if update.call_at is None:
+            break
+        time = update.call_at
+    # The last message is sent once the io asks for the next one
+    adapter.add_message_to_stream([])
+    await adapter.next_message()
+
+    status = trace.summarize()
+    assert status.frames_traced == 5
+    assert status.frames_in_flight == 0
+    assert len(stage_events(trace, "send")) == 5
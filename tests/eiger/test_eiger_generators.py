@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from tickit_devices.eiger.data.generators import (
+    GENERATORS,
+    FlatImageGenerator,
+    PoissonImageGenerator,
+    RingImageGenerator,
+    centre_crop,
+)
+
+# # # # # Eiger Image Generator Tests # # # # #
+
+SHAPE = (120, 100)
+
+
+@pytest.mark.parametrize("name", list(GENERATORS))
+@pytest.mark.parametrize("dtype", ["uint8", "uint16", "uint32"])
+def test_generators_make_requested_shape_and_type(name: str, dtype: str):
+    image = GENERATORS[name]().generate(0, SHAPE, dtype)
+    assert image.shape == SHAPE
+    assert image.dtype == np.dtype(dtype)
+
+
+def test_flat_image():
+    image = FlatImageGenerator(value=7).generate(3, SHAPE, "uint16")
+    assert (image == 7).all()
+
+
+def test_poisson_images_differ_by_index_and_repeat():
+    generator = PoissonImageGenerator(mean=5.0)
+    first = generator.generate(0, SHAPE, "uint16")
+    assert not (first == generator.generate(1, SHAPE, "uint16")).all()
+    assert (first == generator.generate(0, SHAPE, "uint16")).all()
+    assert abs(first.mean() - 5.0) < 0.5
+
+
+def test_poisson_clips_to_dtype():
+    image = PoissonImageGenerator(mean=1000.0).generate(0, SHAPE, "uint8")
+    assert image.max() == 255
+
+
+def test_rings_are_brighter_than_background():
+    generator = RingImageGenerator(
+        radii=[30.0], width=2.0, peak=100.0, background=0.5, centre=(50.0, 60.0)
+    )
+    image = generator.generate(0, SHAPE, "uint16")
+    on_ring = image[60, 80]
+    off_ring = image[60, 50:60]
+    assert on_ring > 50
+    assert off_ring.mean() < 5
+
+
+def test_centre_crop_is_a_view_of_the_centre():
+    image = np.arange(8 * 6).reshape(8, 6)
+    region = centre_crop(image, (4, 2))
+    assert np.shares_memory(region, image)
+    assert (region == image[2:6, 2:4]).all()
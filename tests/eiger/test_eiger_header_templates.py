@@ -0,0 +1,83 @@
+import pytest
+
+from tickit_devices.eiger.data.schema import (
+    ImageCharacteristicsHeader,
+    ImageConfigHeader,
+    ImageHeader,
+)
+from tickit_devices.eiger.data.templates import (
+    HeaderTemplate,
+    HeaderTemplateCache,
+    ImageHeaderTemplates,
+)
+
+
+@pytest.fixture
+def templates() -> ImageHeaderTemplates:
+    return ImageHeaderTemplates.for_series(3, (4148, 4362), "bs16-lz4<", "uint16")
+
+
+@pytest.mark.parametrize(
+    "frame,hsh", [(0, ""), (17, "123456"), (4, 'quo"te'), (5, "ünïcode")]
+)
+def test_image_header_matches_model(
+    templates: ImageHeaderTemplates, frame: int, hsh: str
+) -> None:
+    expected = ImageHeader(frame=frame, hash=hsh, series=3).json().encode()
+    assert templates.image.render(frame=frame, hash=hsh) == expected
+
+
+def test_characteristics_header_matches_model(
+    templates: ImageHeaderTemplates,
+) -> None:
+    expected = ImageCharacteristicsHeader(
+        encoding="bs16-lz4<", shape=(4148, 4362), size=515, type="uint16"
+    )
+    assert templates.characteristics.render(size=515) == expected.json().encode()
+
+
+def test_config_header_matches_model(templates: ImageHeaderTemplates) -> None:
+    expected = ImageConfigHeader(real_time=0.01, start_time=1.5, stop_time=1.51)
+    rendered = templates.config.render(real_time=0.01, start_time=1.5, stop_time=1.51)
+    assert rendered == expected.json().encode()
+
+
+@pytest.mark.parametrize(
+    "real_time", [0.0, 1e-7, 123456789.125, float("inf"), float("nan")]
+)
+def test_config_header_float_encoding_matches_model(
+    templates: ImageHeaderTemplates, real_time: float
+) -> None:
+    expected = ImageConfigHeader(real_time=real_time, start_time=0.0, stop_time=0.0)
+    rendered = templates.config.render(
+        real_time=real_time, start_time=0.0, stop_time=0.0
+    )
+    assert rendered == expected.json().encode()
+
+
+def test_template_without_variable_fields() -> None:
+    model = ImageHeader(frame=1, hash="abc", series=2)
+    assert HeaderTemplate(model, []).render() == model.json().encode()
+
+
+def test_render_requires_all_variable_fields(templates: ImageHeaderTemplates) -> None:
+    with pytest.raises(KeyError):
+        templates.image.render(frame=1)
+
+
+def test_cache_builds_templates_once() -> None:
+    cache = HeaderTemplateCache()
+    templates = cache.get(3, (4148, 4362), "bs16-lz4<", "uint16")
+    assert cache.get(3, (4148, 4362), "bs16-lz4<", "uint16") is templates
+    assert cache.get(4, (4148, 4362), "bs16-lz4<", "uint16") is not templates
+    assert len(cache) == 2
+
+
+def test_cache_drops_least_recently_used() -> None:
+    cache = HeaderTemplateCache(size=2)
+    first = cache.get(1, (10, 10), "none", "uint16")
+    cache.get(2, (10, 10), "none", "uint16")
+    assert cache.get(1, (10, 10), "none", "uint16") is first
+    cache.get(3, (10, 10), "none", "uint16")
+    assert len(cache) == 2
+    assert cache.get(1, (10, 10), "none", "uint16") is first
@@ -0,0 +1,83 @@
+import pytest
+
+from tickit_devices.eiger.data.schema import AcquisitionSeriesFooter
+from tickit_devices.eiger.metrics import (
+    LATENCY_BUCKETS,
+    SCRAPED_METRICS,
+    EigerMetrics,
+    LatencyHistogram,
+)
+
+
+@pytest.fixture
+def scraped():
+    return {name: 0 for name in SCRAPED_METRICS}
+
+
+def samples(text: str):
+    return dict(
+        line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#")
+    )
+
+
+def test_histogram_buckets_latencies():
+    histogram = LatencyHistogram()
+    for seconds in [0.0001, 0.0005, 0.003, 2.0]:
+        histogram.observe(seconds)
+    assert histogram.counts[0] == 2
+    assert histogram.counts[LATENCY_BUCKETS.index(0.005)] == 1
+    assert histogram.counts[-1] == 1
+    assert histogram.total == pytest.approx(2.0036)
+
+
+def test_render_counters(scraped):
+    metrics = EigerMetrics()
+    metrics.frames_acquired = 12
+    metrics.series = 3
+    metrics.dropped_messages[1] += 2
+    metrics.dropped_images[1] += 6
+    scraped["eiger_stream_buffered_images"] = 5
+    values = samples(metrics.render(scraped))
+    assert values["eiger_frames_acquired_total"] == "12"
+    assert values["eiger_series_total"] == "3"
+    assert values["eiger_stream_buffered_images"] == "5"
+    assert values['eiger_stream_dropped_messages_total{subscriber="1"}'] == "2"
+    assert values['eiger_stream_subscriber_dropped_images_total{subscriber="1"}'] == (
+        "6"
+    )
+
+
+def test_render_declares_every_metric(scraped):
+    text = EigerMetrics().render(scraped)
+    types = [line.split()[2] for line in text.splitlines() if line.startswith("# TYPE")]
+    assert set(SCRAPED_METRICS) <= set(types)
+    assert "eiger_http_request_duration_seconds" in types
+
+
+def test_render_cumulative_histogram(scraped):
+    metrics = EigerMetrics()
+    histogram = metrics.request_latency("GET", '/detector/"{param}"')
+    assert metrics.request_latency("GET", '/detector/"{param}"') is histogram
+    histogram.observe(0.0002)
+    histogram.observe(0.02)
+    values = samples(metrics.render(scraped))
+    labels = 'method="GET",path="/detector/\\"{param}\\""'
+    name = "eiger_http_request_duration_seconds"
+    assert values[f'{name}_bucket{{{labels},le="0.0005"}}'] == "1"
+    assert values[f'{name}_bucket{{{labels},le="0.025"}}'] == "2"
+    assert values[f'{name}_bucket{{{labels},le="+Inf"}}'] == "2"
+    assert values[f"{name}_count{{{labels}}}"] == "2"
+
+
+def test_message_streamed_counts_encoded_bytes():
+    metrics = EigerMetrics()
+    metrics.message_streamed([b"header", memoryview(b"data")])
+    footer = AcquisitionSeriesFooter(series=1)
+    metrics.message_streamed([footer, {"htype": "x"}])
+    assert metrics.messages_streamed == 2
+    assert metrics.bytes_streamed == (
+        len(b"header")
+        + len(b"data")
+        + len(footer.json().encode())
+        + len(b'{"htype": "x"}')
+    )
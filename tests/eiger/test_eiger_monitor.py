@@ -0,0 +1,61 @@
+import pytest
+
+from tickit_devices.eiger.data.dummy_image import Image
+from tickit_devices.eiger.monitor.eiger_monitor import EigerMonitor
+
+
+@pytest.fixture
+def monitor() -> EigerMonitor:
+    return EigerMonitor()
+
+
+def make_image(index: int) -> Image:
+    return Image.create_dummy_image(index, (4148, 4362))
+
+
+def test_empty_monitor_has_no_images(monitor: EigerMonitor):
+    assert monitor.next_image() is None
+    assert monitor.latest_image() is None
+    assert monitor.image_ids() == []
+
+
+def test_monitor_keeps_images_without_copying(monitor: EigerMonitor):
+    image = make_image(0)
+    monitor.insert_image(image, 1)
+    entry = monitor.latest_image()
+    assert entry is not None
+    series_id, latest = entry
+    assert series_id == 1
+    assert latest is image
+    assert latest.data is image.data
+
+
+def test_next_image_takes_oldest(monitor: EigerMonitor):
+    for index in range(3):
+        monitor.insert_image(make_image(index), 2)
+    entries = [monitor.next_image(), monitor.next_image(), monitor.latest_image()]
+    assert all(entry is not None for entry in entries)
+    assert [entry[1].index for entry in entries if entry is not None] == [0, 1, 2]
+    assert monitor.image_ids() == [(2, 2)]
+
+
+def test_ring_keeps_most_recent_images(monitor: EigerMonitor):
+    monitor.config.buffer_size = 2
+    monitor.begin_series()
+    for index in range(5):
+        monitor.insert_image(make_image(index), 1)
+    assert monitor.image_ids() == [(1, 3), (1, 4)]
+
+
+def test_resizing_keeps_most_recent_images(monitor: EigerMonitor):
+    for index in range(5):
+        monitor.insert_image(make_image(index), 1)
+    monitor.config.buffer_size = 3
+    monitor.begin_series()
+    assert monitor.image_ids() == [(1, 2), (1, 3), (1, 4)]
+
+
+def test_disabled_monitor_keeps_nothing(monitor: EigerMonitor):
+    monitor.config.mode = "disabled"
+    monitor.insert_image(make_image(0), 1)
+    assert monitor.latest_image() is None
@@ -16,3 +16,10 @@ def test_eiger_monitor_config_constructor():
 
 def test_eiger_monitor_config_getitem(monitor_config):
     assert "enabled" == monitor_config["mode"]["value"]
+
+
+def test_eiger_monitor_config_rejects_negative_buffer_size(monitor_config):
+    monitor_config["buffer_size"] = 0
+    with pytest.raises(ValueError):
+        monitor_config["buffer_size"] = -1
+    assert monitor_config.buffer_size == 0
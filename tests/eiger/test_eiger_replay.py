@@ -0,0 +1,222 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+from tickit.core.typedefs import SimTime
+
+from tickit_devices.eiger.data.capture import CaptureReader, CaptureWriter
+from tickit_devices.eiger.data.dummy_image import Image
+from tickit_devices.eiger.data.schema import AcquisitionSeriesFooter
+from tickit_devices.eiger.eiger import EigerDevice
+from tickit_devices.eiger.eiger_settings import EigerSettings
+from tickit_devices.eiger.stream.eiger_stream import EigerStream
+from tickit_devices.eiger.stream.replay import StreamReplay
+from tickit_devices.eiger.trigger_schedule import RecordedSchedule, TriggerSchedule
+
+CAPTURED_SERIES = 41
+# Images received 0, 10 and 25 microseconds after the first
+IMAGE_TIMES = [1_000, 11_000, 26_000]
+
+
+def _json(**header: Any) -> bytes:
+    return json.dumps(header).encode("utf_8")
+
+
+def _image_message(frame: int) -> List[bytes]:
+    return [
+        _json(htype="dimage-1.0", series=CAPTURED_SERIES, frame=frame, hash=""),
+        _json(htype="dimage_d-1.0", shape=[2, 2], type="uint16", encoding="<"),
+        bytes([frame]) * 8,
+        _json(htype="dconfig-1.0", start_time=0, stop_time=0, real_time=0),
+    ]
+
+
+@pytest.fixture
+def capture_path(tmp_path: Path) -> Path:
+    path = tmp_path / "series.capture"
+    with CaptureWriter(path) as capture:
+        capture.write(
+            [
+                _json(
+                    htype="dheader-1.0", series=CAPTURED_SERIES, header_detail="basic"
+                ),
+                _json(beam_center_x=1.0),
+            ],
+            timestamp=0,
+        )
+        for frame, time in enumerate(IMAGE_TIMES):
+            capture.write(_image_message(frame), timestamp=time)
+        capture.write([_json(htype="dseries_end-1.0", series=CAPTURED_SERIES)], 30_000)
+    return path
+
+
+@pytest.fixture
+def replay(capture_path: Path) -> Iterator[StreamReplay]:
+    replay = StreamReplay(capture_path)
+    yield replay
+    replay.close()
+
+
+def _header(parts: List[bytes]) -> Dict[str, Any]:
+    return json.loads(parts[0])
+
+
+def test_capture_round_trip(capture_path: Path):
+    reader = CaptureReader(capture_path)
+    records = list(reader)
+    reader.close()
+    assert [record.timestamp for record in records] == [0, *IMAGE_TIMES, 30_000]
+    assert records[2].parts == _image_message(1)
+
+
+def test_reader_rejects_other_files(tmp_path: Path):
+    path = tmp_path / "frames.bin"
+    path.write_bytes(b"not a capture")
+    with pytest.raises(ValueError, match="not a stream capture"):
+        CaptureReader(path)
+
+
+def test_replay_rejects_capture_without_images(tmp_path: Path):
+    path = tmp_path / "empty.capture"
+    with CaptureWriter(path) as capture:
+        capture.write([_json(htype="dheader-1.0", series=1)])
+    with pytest.raises(ValueError, match="No images"):
+        StreamReplay(path)
+
+
+def test_replay_rejects_other_stream_formats(tmp_path: Path):
+    path = tmp_path / "cbor.capture"
+    with CaptureWriter(path) as capture:
+        capture.write([b"\xa1\x64type\x65start"])
+    with pytest.raises(ValueError, match="legacy stream format"):
+        StreamReplay(path)
+
+
+def test_replay_rejects_unknown_cadence(capture_path: Path):
+    with pytest.raises(ValueError, match="cadence"):
+        StreamReplay(capture_path, cadence="slow")
+
+
+def test_begin_rewrites_series_of_headers(replay: StreamReplay):
+    messages = replay.begin(7)
+    assert len(messages) == 1
+    assert _header(messages[0]) == {
+        "htype": "dheader-1.0",
+        "series": 7,
+        "header_detail": "basic",
+    }
+    assert messages[0][1] == _json(beam_center_x=1.0)
+
+
+def test_images_are_rewritten_and_loop(replay: StreamReplay):
+    assert replay.images == 3
+    replay.begin(7)
+    messages = [replay.next_image(7, frame) for frame in range(5)]
+    assert [_header(message)["frame"] for message in messages] == list(range(5))
+    assert {_header(message)["series"] for message in messages} == {7}
+    assert [message[2] for message in messages] == [
+        bytes([frame % 3]) * 8 for frame in range(5)
+    ]
+
+
+def test_next_series_begins_from_first_image(replay: StreamReplay):
+    replay.begin(1)
+    replay.next_image(1, 0)
+    replay.begin(2)
+    assert replay.next_image(2, 0)[2] == bytes([0]) * 8
+
+
+def test_recorded_schedule_follows_capture_and_loops(replay: StreamReplay):
+    replay.begin(1)
+    replay.next_image(1, 0)
+    schedule = replay.schedule(frames=4, exposure=5.0)
+    assert isinstance(schedule, RecordedSchedule)
+    # Images 1, 2 then 0, 1 of the next lap, which follows a median period later
+    assert schedule.offsets.tolist() == [0, 15_000, 27_500, 37_500, 52_500]
+
+
+def test_fast_schedule_has_every_frame_due(capture_path: Path):
+    replay = StreamReplay(capture_path, cadence="fast")
+    schedule = replay.schedule(frames=4, exposure=5.0)
+    replay.close()
+    assert type(schedule) is TriggerSchedule
+    schedule.start(SimTime(0))
+    assert schedule.due(SimTime(0)) == 4
+
+
+def test_stream_sends_captured_messages(replay: StreamReplay):
+    stream = EigerStream(replay=replay)
+    stream.config.format = "cbor"
+    stream.begin_series(EigerSettings(), 3)
+    stream.insert_image(Image.create_dummy_image(0, (2, 2)), 3)
+    stream.end_series(3)
+    parts = stream.drain()
+    assert isinstance(parts[0], bytes) and isinstance(parts[2], bytes)
+    assert isinstance(parts[-1], AcquisitionSeriesFooter)
+    assert json.loads(parts[0])["series"] == 3
+    assert json.loads(parts[2]) == {
+        "htype": "dimage-1.0",
+        "series": 3,
+        "frame": 0,
+        "hash": "",
+    }
+    assert parts[4] == bytes([0]) * 8
+    assert parts[-1].series == 3
+
+
+def test_capture_cut_short_while_replaying(capture_path: Path):
+    # A small buffer, so the reads see the file as it is now
+    replay = StreamReplay(capture_path, buffer_size=16)
+    first_image = replay._first_image
+    with capture_path.open("r+b") as capture:
+        capture.truncate(first_image)
+    assert len(replay.begin(1)) == 1
+    with pytest.raises(ValueError, match="ended before its last image"):
+        replay.next_image(1, 0)
+    with capture_path.open("r+b") as capture:
+        capture.truncate(first_image - 1)
+    with pytest.raises(ValueError, match="ended before its first image"):
+        replay.begin(2)
+    replay.close()
+
+
+@pytest.mark.asyncio
+async def test_device_acquires_at_recorded_cadence(replay: StreamReplay):
+    eiger = EigerDevice(stream=EigerStream(replay=replay))
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    eiger.settings.nimages = 3
+    await eiger.arm()
+    await eiger.trigger()
+
+    calls = [eiger.update(SimTime(0), {}).call_at]
+    for _ in range(2):
+        calls.append(eiger.update(calls[-1], {}).call_at)
+    assert calls == [10_000, 25_000, 37_500]
+    assert eiger.status.frames_acquired == 3
+
+
+@pytest.mark.asyncio
+async def test_fast_replay_waits_for_full_dcu_buffer(capture_path: Path):
+    replay = StreamReplay(capture_path, cadence="fast")
+    sizes = StreamReplay(capture_path)
+    sizes.begin(1)
+    nbytes = [sum(map(len, sizes.next_image(1, frame))) for frame in range(3)]
+    sizes.close()
+    # Any frame fills the buffer, which drains a byte a nanosecond
+    eiger = EigerDevice(
+        stream=EigerStream(replay=replay), network_bandwidth=1e9, dcu_buffer_size=1
+    )
+    await eiger.initialize()
+    eiger.settings.trigger_mode = "ints"
+    eiger.settings.nimages = 3
+    await eiger.arm()
+    await eiger.trigger()
+
+    calls = [eiger.update(SimTime(0), {}).call_at]
+    while eiger.status.frames_acquired < 3 and len(calls) < 10:
+        calls.append(eiger.update(calls[-1], {}).call_at)
+    replay.close()
+    # Each frame waits for the replayed frame before it to drain
+    assert calls == [nbytes[0], nbytes[0] + nbytes[1], nbytes[0] + nbytes[1]]
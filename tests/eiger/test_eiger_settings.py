@@ -1,6 +1,17 @@
+from dataclasses import fields
+
+import numpy as np
 import pytest
 
-from tickit_devices.eiger.eiger_settings import EigerSettings, KA_Energy
+from tickit_devices.eiger.data.darray import encode_darray
+from tickit_devices.eiger.eiger_settings import (
+    FRAME_HEIGHT,
+    FRAME_WIDTH,
+    FULL_FRAME_RATE,
+    ROI_4M_FRAME_RATE,
+    EigerSettings,
+    KA_Energy,
+)
 
 # # # # # EigerStatus Tests # # # # #
 
@@ -20,6 +31,24 @@ def test_eiger_settings_getitem(eiger_settings):
     assert 0.1 == value
 
 
+def test_eiger_settings_getitem_matches_fields(eiger_settings):
+    for field_ in fields(eiger_settings):
+        parameter = eiger_settings[field_.name]
+        assert parameter["value"] is getattr(eiger_settings, field_.name)
+        assert parameter["metadata"] == field_.metadata
+
+
+def test_eiger_settings_getitem_follows_changes(eiger_settings):
+    eiger_settings["count_time"] = 0.5
+    assert 0.5 == eiger_settings["count_time"]["value"]
+    assert pytest.approx(0.51) == eiger_settings["frame_time"]["value"]
+
+
+def test_eiger_settings_getitem_unknown_parameter_raises(eiger_settings):
+    with pytest.raises(KeyError):
+        eiger_settings["doesnt_exist"]
+
+
 def test_eiger_settings_get_element(eiger_settings):
     assert "Co" == eiger_settings.element
 
@@ -59,3 +88,97 @@ def test_eiger_settings_set_count_time(eiger_settings):
         eiger_settings.count_time + eiger_settings.detector_readout_time
         == eiger_settings.frame_time
     )
+
+
+def test_eiger_settings_max_frame_rate_follows_readout(eiger_settings):
+    assert eiger_settings.max_frame_rate == pytest.approx(FULL_FRAME_RATE)
+    eiger_settings["bit_depth_readout"] = 32
+    assert eiger_settings.max_frame_rate == pytest.approx(FULL_FRAME_RATE / 2)
+    eiger_settings["y_pixels_in_detector"] = FRAME_HEIGHT // 4
+    assert eiger_settings.max_frame_rate == pytest.approx(FULL_FRAME_RATE * 2, rel=1e-3)
+
+
+def test_eiger_settings_frame_time_below_minimum_rejected(eiger_settings):
+    with pytest.raises(ValueError):
+        eiger_settings["frame_time"] = 0.5 / FULL_FRAME_RATE
+    assert eiger_settings.frame_time == 0.12
+
+
+@pytest.mark.parametrize("key", ["frame_time", "count_time"])
+def test_eiger_settings_non_numeric_times_rejected(eiger_settings, key):
+    with pytest.raises(ValueError):
+        eiger_settings[key] = "fast"
+    assert eiger_settings.frame_time == 0.12
+
+
+def test_eiger_settings_frame_time_shortens_count_time(eiger_settings):
+    eiger_settings["frame_time"] = 0.05
+
+    assert eiger_settings.frame_time == 0.05
+    assert eiger_settings.count_time == pytest.approx(0.04)
+
+
+def test_eiger_settings_count_time_limited_by_frame_rate(eiger_settings):
+    eiger_settings["detector_readout_time"] = 0.0001
+    eiger_settings["count_time"] = 0.001
+
+    assert eiger_settings.frame_time == pytest.approx(1 / FULL_FRAME_RATE)
+
+
+def test_eiger_settings_slower_readout_lengthens_frame_time(eiger_settings):
+    eiger_settings["count_time"] = 0.002
+    eiger_settings["bit_depth_readout"] = 32
+
+    assert eiger_settings.frame_time == pytest.approx(2 / FULL_FRAME_RATE)
+
+
+def test_eiger_settings_roi_mode_reads_out_centre_faster(eiger_settings):
+    eiger_settings["detector_readout_time"] = 0.0001
+    eiger_settings["roi_mode"] = "4M"
+
+    assert eiger_settings.x_pixels_in_detector == 2068
+    assert eiger_settings.y_pixels_in_detector == 2162
+    assert eiger_settings.sensor_shape == (FRAME_WIDTH, FRAME_HEIGHT)
+    assert eiger_settings.max_frame_rate == pytest.approx(ROI_4M_FRAME_RATE)
+    eiger_settings["frame_time"] = 1 / ROI_4M_FRAME_RATE
+    assert eiger_settings.frame_time == pytest.approx(1 / ROI_4M_FRAME_RATE)
+
+
+def test_eiger_settings_disabling_roi_mode_lengthens_frame_time(eiger_settings):
+    eiger_settings["detector_readout_time"] = 0.0001
+    eiger_settings["roi_mode"] = "4M"
+    eiger_settings["frame_time"] = 1 / ROI_4M_FRAME_RATE
+    eiger_settings["roi_mode"] = "disabled"
+
+    assert eiger_settings.sensor_shape == (FRAME_WIDTH, FRAME_HEIGHT)
+    assert eiger_settings.frame_time == pytest.approx(1 / FULL_FRAME_RATE)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        [[1, 0, 3], [0, 0, 1]],
+        encode_darray(np.array([[1, 0, 3], [0, 0, 1]], dtype="uint16")),
+        np.array([[1, 0, 3], [0, 0, 1]]),
+    ],
+)
+def test_eiger_settings_set_pixel_mask(eiger_settings, value):
+    eiger_settings["pixel_mask"] = value
+    mask = eiger_settings.pixel_mask
+    assert mask.dtype == np.uint32
+    assert mask.tolist() == [[1, 0, 3], [0, 0, 1]]
+    assert not mask.flags.writeable
+
+
+def test_eiger_settings_set_flatfield_leaves_given_array_writeable(eiger_settings):
+    flatfield = np.full((2, 2), 0.5, dtype="float32")
+    eiger_settings["flatfield"] = flatfield
+    assert np.shares_memory(eiger_settings.flatfield, flatfield)
+    assert flatfield.flags.writeable
+
+
+def test_eiger_settings_filtered_excludes_fields(eiger_settings):
+    filtered = eiger_settings.filtered(["flatfield", "pixel_mask"])
+    assert "flatfield" not in filtered
+    assert "pixel_mask" not in filtered
+    assert filtered["count_time"] == eiger_settings.count_time
@@ -1,7 +1,11 @@
-from typing import Any, List, Mapping, Union
+import json
+from typing import Any, Iterable, List, Mapping, Union, cast
 
+import cbor2
+import numpy as np
 import pytest
 from pydantic.v1 import BaseModel
+from pytest_mock import MockerFixture
 
 from tickit_devices.eiger.data.dummy_image import Image
 from tickit_devices.eiger.data.schema import (
@@ -12,6 +16,7 @@ from tickit_devices.eiger.data.schema import (
     ImageConfigHeader,
     ImageHeader,
 )
+from tickit_devices.eiger.data.stream2 import COMPRESSED_TAG, TYPED_ARRAY_TAGS
 from tickit_devices.eiger.eiger_settings import EigerSettings
 from tickit_devices.eiger.stream.eiger_stream import EigerStream
 
@@ -30,11 +35,12 @@ MINIMAL_HEADER = [
     )
 ]
 
-EIGER_SETTINGS_HEADER = EigerSettings().filtered(
-    ["flatfield", "pixelmask" "countrate_correction_table"]
+EIGER_SETTINGS = EigerSettings().filtered(
+    ["flatfield", "pixel_mask", "countrate_correction_table"]
 )
-X_SIZE = EIGER_SETTINGS_HEADER["x_pixels_in_detector"]
-Y_SIZE = EIGER_SETTINGS_HEADER["y_pixels_in_detector"]
+EIGER_SETTINGS_HEADER = json.dumps(EIGER_SETTINGS).encode()
+X_SIZE = EIGER_SETTINGS["x_pixels_in_detector"]
+Y_SIZE = EIGER_SETTINGS["y_pixels_in_detector"]
 
 BASIC_HEADERS = [
     AcquisitionSeriesHeader(
@@ -55,19 +61,19 @@ ALL_HEADERS = [
         shape=(X_SIZE, Y_SIZE),
         type="float32",
     ),
-    {"blob": "blob"},
+    np.ones((Y_SIZE, X_SIZE), dtype="float32").tobytes(),
     AcquisitionDetailsHeader(
         htype="dpixelmask-1.0",
         shape=(X_SIZE, Y_SIZE),
         type="uint32",
     ),
-    {"blob": "blob"},
+    np.zeros((Y_SIZE, X_SIZE), dtype="uint32").tobytes(),
     AcquisitionDetailsHeader(
         htype="dcountrate_table-1.0",
-        shape=(X_SIZE, Y_SIZE),
+        shape=(1001, 2),
         type="float32",
     ),
-    {"blob": "blob"},
+    np.arange(1001, dtype="float32").tobytes() * 2,
 ]
 
 
@@ -90,7 +96,7 @@ def test_begin_series_produces_correct_headers(
     settings = EigerSettings()
     stream.config.header_detail = header_detail
     stream.begin_series(settings, TEST_SERIES_ID)
-    blobs = list(stream.consume_data())
+    blobs = as_bytes(stream.drain())
     assert blobs == expected_headers
 
 
@@ -101,15 +107,41 @@ def test_insert_image_produces_correct_headers_and_blobs(
     for i in range(number_of_times):
         image = Image.create_dummy_image(i, (X_SIZE, Y_SIZE))
         stream.insert_image(image, TEST_SERIES_ID)
-        blobs = list(stream.consume_data())
+        blobs = stream.drain()
         assert blobs == expected_image_blobs(image)
 
 
+def test_insert_image_sends_frame_timing(stream: EigerStream) -> None:
+    image = Image.create_dummy_image(3, (X_SIZE, Y_SIZE))
+    image.real_time = 1000.0
+    image.start_time = 3000.0
+    image.stop_time = 4000.0
+    stream.insert_image(image, TEST_SERIES_ID)
+    config_header = stream.drain()[-1]
+    assert config_header == (
+        ImageConfigHeader(real_time=1000.0, start_time=3000.0, stop_time=4000.0)
+        .json()
+        .encode()
+    )
+
+
+def test_header_templates_rebuilt_for_new_series(stream: EigerStream) -> None:
+    settings = EigerSettings()
+    image = Image.create_dummy_image(0, (X_SIZE, Y_SIZE))
+    for series_id in [TEST_SERIES_ID, TEST_SERIES_ID + 1]:
+        stream.begin_series(settings, series_id)
+        stream.insert_image(image, series_id)
+        header = stream.drain()[-4]
+        assert header == (
+            ImageHeader(frame=0, hash=image.hash, series=series_id).json().encode()
+        )
+
+
 def test_end_series_produces_correct_headers(
     stream: EigerStream,
 ) -> None:
     stream.end_series(TEST_SERIES_ID)
-    blobs = list(stream.consume_data())
+    blobs = stream.drain()
     assert blobs == END_SERIES_FOOTER
 
 
@@ -120,27 +152,183 @@ def test_data_buffered(stream: EigerStream) -> None:
     image = Image.create_dummy_image(0, (X_SIZE, Y_SIZE))
     stream.insert_image(image, TEST_SERIES_ID)
     stream.end_series(TEST_SERIES_ID)
-    blobs = list(stream.consume_data())
+    blobs = as_bytes(stream.drain())
     assert blobs == ALL_HEADERS + expected_image_blobs(image) + END_SERIES_FOOTER
 
 
-def expected_image_blobs(image: Image) -> List[Union[bytes, BaseModel]]:
+@pytest.mark.parametrize(
+    "policy,expected_dropped,blocked",
+    [("block", 0, True), ("drop_oldest", 2, False), ("drop_newest", 2, False)],
+)
+def test_full_buffer_applies_policy(
+    stream: EigerStream, policy: str, expected_dropped: int, blocked: bool
+) -> None:
+    stream.config.buffer_size = 3
+    stream.config.buffer_policy = policy
+    stream.begin_series(EigerSettings(), TEST_SERIES_ID)
+    for i in range(5):
+        image = Image.create_dummy_image(i, (X_SIZE, Y_SIZE))
+        stream.insert_image(image, TEST_SERIES_ID)
+
+    assert stream.status.dropped == expected_dropped
+    assert stream.blocked is blocked
+    assert stream.buffer_free == 0.0
+    assert stream.pending
+
+    stream.drain()
+    assert not stream.blocked
+    assert stream.buffer_free == 1.0
+    assert not stream.pending
+
+
+def test_cbor_format_sends_one_message_per_image(stream: EigerStream) -> None:
+    stream.config.format = "cbor"
+    stream.begin_series(EigerSettings(), TEST_SERIES_ID)
+    image = Image.create_dummy_image(3, (X_SIZE, Y_SIZE))
+    image.start_time, image.stop_time, image.real_time = 1e6, 1.5e6, 0.5e6
+    stream.insert_image(image, TEST_SERIES_ID)
+    stream.end_series(TEST_SERIES_ID)
+
+    parts = stream.drain()
+    assert all(isinstance(part, bytes) for part in parts)
+    start, image_message, end = [cbor2.loads(cast(bytes, part)) for part in parts]
+    unique_id = start["series_unique_id"]
+    assert start["type"] == "start"
+    assert start["series_id"] == TEST_SERIES_ID
+    assert (start["image_size_x"], start["image_size_y"]) == (X_SIZE, Y_SIZE)
+    assert end == {
+        "type": "end",
+        "series_id": TEST_SERIES_ID,
+        "series_unique_id": unique_id,
+    }
+
+    assert image_message["type"] == "image"
+    assert image_message["series_unique_id"] == unique_id
+    assert image_message["image_id"] == 3
+    assert list(image_message["start_time"]) == [1_000_000, 1_000_000_000]
+    assert list(image_message["stop_time"]) == [1_500_000, 1_000_000_000]
+    array = image_message["data"]["threshold_1"]
+    assert array.tag == 40
+    dimensions, typed_array = array.value
+    assert list(dimensions) == [Y_SIZE, X_SIZE]
+    assert typed_array.tag == TYPED_ARRAY_TAGS["uint16"]
+    assert typed_array.value.tag == COMPRESSED_TAG
+    assert list(typed_array.value.value) == ["bslz4", 2, image.data]
+
+
+def test_format_is_fixed_for_series(stream: EigerStream) -> None:
+    stream.begin_series(EigerSettings(), TEST_SERIES_ID)
+    stream.config.format = "cbor"
+    stream.end_series(TEST_SERIES_ID)
+    assert stream.drain()[-1] == AcquisitionSeriesFooter(series=TEST_SERIES_ID)
+
+
+def test_config_header_encoded_once(stream: EigerStream, mocker: MockerFixture) -> None:
+    settings = EigerSettings()
+    filtered = mocker.spy(settings, "filtered")
+    for series_id in range(3):
+        stream.begin_series(settings, series_id)
+    assert filtered.call_count == 1
+    assert stream.drain()[1] == EIGER_SETTINGS_HEADER
+
+
+def test_config_header_follows_settings(stream: EigerStream) -> None:
+    settings = EigerSettings()
+    stream.begin_series(settings, TEST_SERIES_ID)
+    settings["count_time"] = 0.5
+    stream.begin_series(settings, TEST_SERIES_ID)
+    first, second = stream.drain()[1::2]
+    assert isinstance(first, bytes) and isinstance(second, bytes)
+    assert json.loads(first)["count_time"] == 0.1
+    assert json.loads(second)["count_time"] == 0.5
+    assert json.loads(second)["frame_time"] == settings.frame_time
+
+
+def test_config_header_kept_when_arrays_change(
+    stream: EigerStream, mocker: MockerFixture
+) -> None:
+    settings = EigerSettings()
+    filtered = mocker.spy(settings, "filtered")
+    stream.begin_series(settings, TEST_SERIES_ID)
+    settings["pixel_mask"] = [[1]]
+    stream.begin_series(settings, TEST_SERIES_ID)
+    assert filtered.call_count == 1
+
+
+def test_config_header_for_other_settings(stream: EigerStream) -> None:
+    settings = EigerSettings()
+    other = EigerSettings()
+    other.nimages = 7
+    stream.begin_series(settings, TEST_SERIES_ID)
+    stream.begin_series(other, TEST_SERIES_ID)
+    first, second = stream.drain()[1::2]
+    assert isinstance(first, bytes) and isinstance(second, bytes)
+    assert json.loads(first)["nimages"] == 1
+    assert json.loads(second)["nimages"] == 7
+
+
+def test_all_headers_send_detail_arrays_without_copying(stream: EigerStream) -> None:
+    settings = EigerSettings()
+    settings.x_pixels_in_detector, settings.y_pixels_in_detector = 3, 2
+    settings["pixel_mask"] = [[0, 1, 0], [4, 0, 0]]
+    stream.config.header_detail = "all"
+    stream.begin_series(settings, TEST_SERIES_ID)
+    flatfield_header, flatfield, mask_header, mask = stream.drain()[2:6]
+    assert isinstance(flatfield_header, AcquisitionDetailsHeader)
+    assert isinstance(mask_header, AcquisitionDetailsHeader)
+    assert isinstance(flatfield, memoryview)
+    assert isinstance(mask, memoryview)
+
+    assert flatfield_header.shape == (3, 2)
+    assert np.array_equal(np.frombuffer(flatfield, "float32"), np.ones(6))
+    assert mask_header.shape == (3, 2)
+    assert mask.obj is settings.pixel_mask
+    assert mask.readonly
+
+
+def test_data_available_while_data_is_buffered(stream: EigerStream) -> None:
+    assert not stream.data_available.is_set()
+    stream.begin_series(EigerSettings(), TEST_SERIES_ID)
+    assert stream.data_available.is_set()
+    stream.drain()
+    assert not stream.data_available.is_set()
+    stream.insert_image(Image.create_dummy_image(0, (X_SIZE, Y_SIZE)), TEST_SERIES_ID)
+    assert stream.data_available.is_set()
+
+
+def test_data_available_made_after_buffering_is_set(stream: EigerStream) -> None:
+    stream.end_series(TEST_SERIES_ID)
+    assert stream.data_available.is_set()
+
+
+def as_bytes(blobs: Iterable[Any]) -> List[Any]:
+    # Array blobs are sent as views, compared as the bytes they hold
+    return [bytes(blob) if isinstance(blob, memoryview) else blob for blob in blobs]
+
+
+def expected_image_blobs(image: Image) -> List[Union[bytes, memoryview, BaseModel]]:
     return [
         ImageHeader(
             frame=image.index,
             hash=image.hash,
             series=TEST_SERIES_ID,
-        ),
+        )
+        .json()
+        .encode(),
         ImageCharacteristicsHeader(
             encoding=image.encoding,
             shape=image.shape,
             size=len(image.data),
             type=image.dtype,
-        ),
+        )
+        .json()
+        .encode(),
         image.data,
         ImageConfigHeader(
-            real_time=0.0,
-            start_time=0.0,
-            stop_time=0.0,
-        ),
+            real_time=image.real_time,
+            start_time=image.start_time,
+            stop_time=image.stop_time,
+        )
+        .json()
+        .encode(),
     ]
@@ -0,0 +1,64 @@
+from typing import List
+
+import pytest
+
+from tickit_devices.eiger.stream.stream_buffer import StreamBuffer
+
+# # # # # Eiger StreamBuffer Tests # # # # #
+
+
+def image(index: int) -> List[bytes]:
+    return [f"header {index}".encode(), f"data {index}".encode()]
+
+
+def test_drain_returns_messages_in_order():
+    buffer: StreamBuffer[bytes] = StreamBuffer(size=4)
+    buffer.put([b"start"])
+    buffer.put_image(image(0))
+    buffer.put([b"end"])
+    assert buffer.drain() == [b"start", *image(0), b"end"]
+    assert not buffer
+    assert buffer.images == 0
+
+
+def test_free_tracks_images():
+    buffer: StreamBuffer[bytes] = StreamBuffer(size=4)
+    assert buffer.free == 1.0
+    buffer.put([b"start"])
+    assert buffer.free == 1.0
+    buffer.put_image(image(0))
+    assert buffer.free == 0.75
+    buffer.drain()
+    assert buffer.free == 1.0
+
+
+def test_block_policy_keeps_images():
+    buffer: StreamBuffer[bytes] = StreamBuffer(size=2, policy="block")
+    for i in range(3):
+        assert buffer.put_image(image(i)) == 0
+    assert buffer.full
+    assert buffer.images == 3
+    assert buffer.free == 0.0
+
+
+def test_drop_newest_policy():
+    buffer: StreamBuffer[bytes] = StreamBuffer(size=2, policy="drop_newest")
+    dropped = [buffer.put_image(image(i)) for i in range(4)]
+    assert dropped == [0, 0, 1, 1]
+    assert buffer.drain() == image(0) + image(1)
+
+
+def test_drop_oldest_policy_keeps_series_headers():
+    buffer: StreamBuffer[bytes] = StreamBuffer(size=2, policy="drop_oldest")
+    buffer.put([b"start"])
+    dropped = [buffer.put_image(image(i)) for i in range(4)]
+    assert dropped == [0, 0, 1, 1]
+    assert buffer.drain() == [b"start", *image(2), *image(3)]
+
+
+@pytest.mark.parametrize("policy", ["drop_oldest", "drop_newest"])
+def test_zero_size_drops_every_image(policy: str):
+    buffer: StreamBuffer[bytes] = StreamBuffer(size=0, policy=policy)
+    assert buffer.put_image(image(0)) == 1
+    assert not buffer
+    assert buffer.free == 0.0
@@ -16,3 +16,10 @@ def test_eiger_stream_config_constructor():
 
 def test_eiger_stream_config_getitem(stream_config):
     assert "enabled" == stream_config["mode"]["value"]
+
+
+@pytest.mark.parametrize("value", [0, -1, "many"])
+def test_eiger_stream_config_rejects_buffer_size_below_one(stream_config, value):
+    with pytest.raises(ValueError):
+        stream_config["buffer_size"] = value
+    assert stream_config.buffer_size == 512
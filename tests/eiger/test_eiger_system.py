@@ -1,6 +1,8 @@
 import aiohttp
 import pytest
 
+from tickit_devices.eiger.data.dummy_image import dummy_image_blob
+
 DETECTOR_URL = "http://localhost:8081/detector/api/1.8.0/"
 FILE_WRITER_URL = "http://localhost:8081/filewriter/api/1.8.0/"
 MONITOR_URL = "http://localhost:8081/monitor/api/1.8.0/"
@@ -53,7 +55,7 @@ async def test_eiger_system(tickit_task):
         await get_status(status="doesnt_exist", expected="None")
         await get_status(status="board_000/th0_temp", expected=24.5)
         await get_status(status="board_000/doesnt_exist", expected="None")
-        await get_status(status="builder/dcu_buffer_free", expected=0.5)
+        await get_status(status="builder/dcu_buffer_free", expected=1.0)
         await get_status(status="builder/doesnt_exist", expected="None")
 
         # Test Eiger in IDLE state
@@ -203,3 +205,32 @@ async def test_eiger_system(tickit_task):
             timeout=REQUEST_TIMEOUT,
         ) as response:
             assert {"sequence id": 4} == (await response.json())
+
+        # Test the monitor holds the acquired image
+        async with session.get(
+            MONITOR_URL + "images",
+            timeout=REQUEST_TIMEOUT,
+        ) as response:
+            assert [[1, 0]] == (await response.json())
+
+        async with session.get(
+            MONITOR_URL + "images/monitor",
+            timeout=REQUEST_TIMEOUT,
+        ) as response:
+            assert response.status == 200
+            assert response.headers["X-Frame"] == "0"
+            assert response.headers["X-Encoding"] == "bs16-lz4<"
+            assert (await response.read()) == dummy_image_blob()
+
+        async with session.get(
+            MONITOR_URL + "images/next",
+            timeout=REQUEST_TIMEOUT,
+        ) as response:
+            assert response.status == 200
+            assert response.headers["X-Series"] == "1"
+
+        async with session.get(
+            MONITOR_URL + "images/next",
+            timeout=REQUEST_TIMEOUT,
+        ) as response:
+            assert response.status == 404
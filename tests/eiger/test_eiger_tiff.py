@@ -0,0 +1,50 @@
+import struct
+
+import numpy as np
+import pytest
+
+from tickit_devices.eiger.data.tiff import read_tiff, write_tiff
+
+
+@pytest.mark.parametrize("dtype", ["uint8", "uint16", "uint32", "int32", "float32"])
+def test_round_trip(dtype: str) -> None:
+    array = np.arange(20, dtype=dtype).reshape(4, 5)
+    decoded = read_tiff(write_tiff(array))
+    assert decoded.dtype == np.dtype(dtype)
+    assert np.array_equal(decoded, array)
+
+
+def test_big_endian_array_written_little_endian() -> None:
+    array = np.arange(6, dtype=">u2").reshape(2, 3)
+    data = write_tiff(array)
+    assert data[:2] == b"II"
+    assert np.array_equal(read_tiff(data), array)
+
+
+def test_read_big_endian_file() -> None:
+    entries = [
+        (256, 3, 2),  # width
+        (257, 3, 1),  # length
+        (258, 3, 16),  # bits per sample
+        (273, 4, 8 + 2 + 5 * 12 + 4),  # strip offset
+        (279, 4, 4),  # strip byte count
+    ]
+    data = b"MM" + struct.pack(">HI", 42, 8) + struct.pack(">H", len(entries))
+    for tag, field_type, value in entries:
+        value_format = "H2x" if field_type == 3 else "I"
+        data += struct.pack(f">HHI{value_format}", tag, field_type, 1, value)
+    data += struct.pack(">I", 0) + struct.pack(">HH", 1, 258)
+    assert read_tiff(data).tolist() == [[1, 258]]
+
+
+def test_read_rejects_other_files() -> None:
+    with pytest.raises(ValueError):
+        read_tiff(b"\x89PNG\r\n\x1a\n")
+
+
+def test_read_rejects_compressed_images() -> None:
+    data = bytearray(write_tiff(np.zeros((2, 2), dtype="uint8")))
+    # The compression entry is the fourth in the directory
+    struct.pack_into("<H", data, 8 + 2 + 3 * 12 + 8, 5)
+    with pytest.raises(ValueError):
+        read_tiff(bytes(data))
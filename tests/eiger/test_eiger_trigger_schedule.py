@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from tickit.core.typedefs import SimTime
+
+from tickit_devices.eiger.trigger_schedule import RecordedSchedule, TriggerSchedule
+
+
+@pytest.fixture
+def schedule() -> TriggerSchedule:
+    schedule = TriggerSchedule(frames=5, period=100, exposure=50.0)
+    schedule.start(SimTime(1000))
+    return schedule
+
+
+def test_deadlines_follow_origin(schedule: TriggerSchedule):
+    assert [schedule.deadline(frame) for frame in range(3)] == [1000, 1100, 1200]
+    schedule.start(SimTime(2000))
+    assert schedule.next_deadline() == SimTime(1000)
+
+
+@pytest.mark.parametrize(
+    "time,window,due",
+    [(999, 0, 0), (1000, 0, 1), (1199, 0, 2), (1200, 0, 3), (1000, 250, 3)],
+)
+def test_due_counts_frames_by_time_and_window(
+    schedule: TriggerSchedule, time: int, window: int, due: int
+):
+    assert schedule.due(SimTime(time), window) == due
+
+
+def test_due_excludes_acquired_and_caps_at_frames(schedule: TriggerSchedule):
+    schedule.acquired = 2
+    assert schedule.due(SimTime(1250)) == 1
+    assert schedule.due(SimTime(10_000)) == 3
+    schedule.acquired = 5
+    assert schedule.complete
+    assert schedule.due(SimTime(10_000)) == 0
+
+
+def test_delay_pushes_next_frame_back(schedule: TriggerSchedule):
+    schedule.acquired = 1
+    schedule.delay(SimTime(1500), 10)
+    assert schedule.next_deadline() == SimTime(1600)
+    schedule.delay(SimTime(1000), 10)
+    assert schedule.next_deadline() == SimTime(1600)
+
+
+@pytest.fixture
+def recorded() -> RecordedSchedule:
+    schedule = RecordedSchedule(
+        frames=3, period=0, exposure=50.0, offsets=np.array([0, 100, 350, 400])
+    )
+    schedule.start(SimTime(1000))
+    return schedule
+
+
+def test_recorded_deadlines_follow_offsets(recorded: RecordedSchedule):
+    assert [recorded.deadline(frame) for frame in range(4)] == [1000, 1100, 1350, 1400]
+    recorded.acquired = 3
+    assert recorded.next_deadline() == SimTime(1400)
+
+
+@pytest.mark.parametrize(
+    "time,window,due",
+    [(999, 0, 0), (1000, 0, 1), (1349, 0, 2), (1350, 0, 3), (1000, 200, 2)],
+)
+def test_recorded_due_counts_frames_by_time_and_window(
+    recorded: RecordedSchedule, time: int, window: int, due: int
+):
+    assert recorded.due(SimTime(time), window) == due
+
+
+def test_recorded_delay_keeps_gap_to_next_frame(recorded: RecordedSchedule):
+    recorded.acquired = 2
+    recorded.delay(SimTime(1500), 10)
+    assert recorded.next_deadline() == SimTime(1750)
+
+
+def test_delay_without_period_waits():
+    schedule = TriggerSchedule(frames=3, period=0, exposure=5.0)
+    schedule.start(SimTime(0))
+    schedule.acquired = 1
+    schedule.delay(SimTime(0), 250)
+    assert schedule.next_deadline() == SimTime(250)
+    schedule.delay(SimTime(250), 0)
+    assert schedule.next_deadline() == SimTime(251)
+
+
+def test_recorded_delay_without_gap_waits():
+    recorded = RecordedSchedule(
+        frames=2, period=0, exposure=5.0, offsets=np.array([0, 0, 0])
+    )
+    recorded.start(SimTime(0))
+    recorded.delay(SimTime(0), 250)
+    assert recorded.next_deadline() == SimTime(250)
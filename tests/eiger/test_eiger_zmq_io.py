@@ -0,0 +1,230 @@
+import asyncio
+from typing import List
+
+import aiozmq
+import pytest
+import zmq
+import zmq.asyncio
+from mock import AsyncMock, MagicMock
+
+from tickit_devices.eiger.data.schema import ImageHeader
+from tickit_devices.eiger.eiger_zmq_io import (
+    EigerZeroMqBroadcastIo,
+    EigerZeroMqPushIo,
+    bind_zmq_push_socket,
+)
+
+TEST_HOST = "127.0.0.1"
+TEST_PORT = 5569
+
+
+@pytest.fixture
+def zmq_io() -> EigerZeroMqPushIo:
+    return EigerZeroMqPushIo(TEST_HOST, TEST_PORT)
+
+
+def test_serialize_passes_buffers_through(zmq_io: EigerZeroMqPushIo) -> None:
+    blob = b"\x00" * 1024
+    view = memoryview(blob)
+    frame = zmq.Frame(blob)
+    serialized = zmq_io._serialize([blob, view, frame])
+    assert serialized[0] is blob
+    assert serialized[1] is view
+    assert serialized[2] is frame
+
+
+def test_serialize_encodes_headers(zmq_io: EigerZeroMqPushIo) -> None:
+    header = ImageHeader(frame=0, hash="abc", series=1)
+    assert zmq_io._serialize([header, {"a": 1}, "text"]) == [
+        b'{"frame": 0, "hash": "abc", "series": 1, "htype": "dimage-1.0"}',
+        b'{"a": 1}',
+        b"text",
+    ]
+
+
+def test_serialize_rejects_unknown_types(zmq_io: EigerZeroMqPushIo) -> None:
+    with pytest.raises(TypeError):
+        zmq_io._serialize([1.0])
+
+
+@pytest.mark.asyncio
+async def test_send_message_without_copying(zmq_io: EigerZeroMqPushIo) -> None:
+    zmq_socket = MagicMock()
+    socket = MagicMock()
+    socket.transport.get_write_buffer_size.return_value = 0
+    socket.transport.get_extra_info.return_value = zmq_socket
+    zmq_io._socket = socket
+
+    blob = b"\x00" * 1024
+    await zmq_io.send_message([b"header", blob])
+
+    zmq_socket.send_multipart.assert_called_once_with(
+        [b"header", blob], zmq.DONTWAIT, copy=False
+    )
+    socket.write.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_send_message_buffers_when_socket_would_block(
+    zmq_io: EigerZeroMqPushIo,
+) -> None:
+    zmq_socket = MagicMock()
+    zmq_socket.send_multipart.side_effect = zmq.Again()
+
+    socket = MagicMock()
+    socket.drain = AsyncMock()
+    socket.transport.get_write_buffer_size.return_value = 0
+    socket.transport.get_extra_info.return_value = zmq_socket
+    zmq_io._socket = socket
+
+    frame = zmq.Frame(b"blob")
+    await zmq_io.send_message([b"header", frame])
+
+    (parts,), _ = socket.write.call_args
+    assert parts[0] == b"header"
+    assert bytes(parts[1]) == b"blob"
+
+
+async def connect_push_socket(host: str, port: int) -> aiozmq.ZmqStream:
+    return await aiozmq.create_zmq_stream(zmq.PUSH, connect=f"tcp://{host}:{port}")
+
+
+@pytest.mark.asyncio
+async def test_memoryview_received_by_consumer() -> None:
+    zmq_io = EigerZeroMqPushIo(TEST_HOST, TEST_PORT, connect_push_socket)
+    context = zmq.asyncio.Context()
+    pull = context.socket(zmq.PULL)
+    pull.bind(f"tcp://{TEST_HOST}:{TEST_PORT}")
+    try:
+        blob = bytes(range(256)) * 512
+        await zmq_io.send_message([b"header", memoryview(blob)])
+        received = await asyncio.wait_for(pull.recv_multipart(), timeout=1.0)
+        assert received == [b"header", blob]
+    finally:
+        pull.close(linger=0)
+        await zmq_io.shutdown()
+        context.term()
+
+
+@pytest.mark.asyncio
+async def test_message_sent_before_consumer_connects_is_received(
+    zmq_io: EigerZeroMqPushIo,
+) -> None:
+    context = zmq.asyncio.Context()
+    pull = context.socket(zmq.PULL)
+    try:
+        await zmq_io.send_message([b"header", b"blob"])
+        pull.connect(f"tcp://{TEST_HOST}:{TEST_PORT}")
+        received = await asyncio.wait_for(pull.recv_multipart(), timeout=1.0)
+        assert received == [b"header", b"blob"]
+    finally:
+        pull.close(linger=0)
+        await zmq_io.shutdown()
+        context.term()
+
+
+@pytest.mark.asyncio
+async def test_bound_socket_has_high_water_mark() -> None:
+    socket = await bind_zmq_push_socket(TEST_HOST, TEST_PORT, hwm=5)
+    try:
+        assert socket.transport.getsockopt(zmq.SNDHWM) == 5
+    finally:
+        socket.close()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_to_every_subscriber() -> None:
+    zmq_io = EigerZeroMqBroadcastIo(TEST_HOST, TEST_PORT, subscribers=2)
+    context = zmq.asyncio.Context()
+    pulls = [context.socket(zmq.PULL) for _ in range(2)]
+    try:
+        await zmq_io._ensure_socket()
+        for index, pull in enumerate(pulls):
+            pull.connect(f"tcp://{TEST_HOST}:{TEST_PORT + index}")
+        # Messages sent before a subscriber's consumer connects are missed
+        await _wait_for_peers(zmq_io, [1, 1])
+
+        await zmq_io.send_message([b"header", b"blob"])
+        for pull in pulls:
+            received = await asyncio.wait_for(pull.recv_multipart(), timeout=1.0)
+            assert received == [b"header", b"blob"]
+        assert zmq_io.dropped == [0, 0]
+    finally:
+        for pull in pulls:
+            pull.close(linger=0)
+        await zmq_io.shutdown()
+        context.term()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_does_not_drop_for_subscriber_without_consumer() -> None:
+    on_drop = MagicMock()
+    zmq_io = EigerZeroMqBroadcastIo(
+        TEST_HOST, TEST_PORT, subscribers=2, on_drop=on_drop
+    )
+    context = zmq.asyncio.Context()
+    pull = context.socket(zmq.PULL)
+    try:
+        await zmq_io._ensure_socket()
+        pull.connect(f"tcp://{TEST_HOST}:{TEST_PORT}")
+        await _wait_for_peers(zmq_io, [1, 0])
+
+        for index in range(5):
+            await zmq_io.send_message([str(index).encode()])
+        for index in range(5):
+            received = await asyncio.wait_for(pull.recv_multipart(), timeout=1.0)
+            assert received == [str(index).encode()]
+        assert zmq_io.dropped == [0, 0]
+        on_drop.assert_not_called()
+    finally:
+        pull.close(linger=0)
+        await zmq_io.shutdown()
+        context.term()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_counts_consumers_leaving() -> None:
+    zmq_io = EigerZeroMqBroadcastIo(TEST_HOST, TEST_PORT, subscribers=1)
+    context = zmq.asyncio.Context()
+    pull = context.socket(zmq.PULL)
+    try:
+        await zmq_io._ensure_socket()
+        pull.connect(f"tcp://{TEST_HOST}:{TEST_PORT}")
+        await _wait_for_peers(zmq_io, [1])
+        pull.close(linger=0)
+        await _wait_for_peers(zmq_io, [0])
+        await zmq_io.send_message([b"missed"])
+        assert zmq_io.dropped == [0]
+    finally:
+        pull.close(linger=0)
+        await zmq_io.shutdown()
+        context.term()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_drops_for_slow_subscriber_only() -> None:
+    on_drop = MagicMock()
+    zmq_io = EigerZeroMqBroadcastIo(TEST_HOST, TEST_PORT, on_drop=on_drop)
+    zmq_sockets = [MagicMock(), MagicMock()]
+    zmq_sockets[1].send_multipart.side_effect = zmq.Again()
+    sockets = [MagicMock(), MagicMock()]
+    for socket, zmq_socket in zip(sockets, zmq_sockets):
+        socket.transport.get_extra_info.return_value = zmq_socket
+    zmq_io._sockets = sockets
+    zmq_io._monitors = [MagicMock(peers=1), MagicMock(peers=1)]
+
+    message = [b"header", b"blob"]
+    await zmq_io.send_message(message)
+    await zmq_io.send_message(message)
+
+    assert zmq_sockets[0].send_multipart.call_count == 2
+    assert zmq_io.dropped == [0, 2]
+    on_drop.assert_called_with(1, message)
+
+
+async def _wait_for_peers(zmq_io: EigerZeroMqBroadcastIo, peers: List[int]) -> None:
+    for _ in range(200):
+        if zmq_io.peers == peers:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Subscribers have {zmq_io.peers} consumers, not {peers}")